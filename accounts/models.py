@@ -36,6 +36,7 @@ class Account(AccountBase, table=True):
     chunk_size: int = Field(default=1000, nullable=True)
     chunk_overlap: int = Field(default=500, nullable=True)
     webhook_url: str = Field(default=None, nullable=True)
+    auto_index_uploads: bool = Field(default=False, nullable=True) # Index each upload as soon as its conversion completes
 
 
 class UserBase(SQLModel):
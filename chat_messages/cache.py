@@ -0,0 +1,105 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import redis
+except ImportError:  # redis is optional, the in-process LRU works without it
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+VISITOR_SESSION_CACHE_SIZE = int(os.environ.get('VISITOR_SESSION_CACHE_SIZE', 10000))
+VISITOR_SESSION_CACHE_URL = os.environ.get('VISITOR_SESSION_CACHE_URL')
+VISITOR_SESSION_CACHE_TTL = int(os.environ.get('VISITOR_SESSION_CACHE_TTL', 60 * 60 * 24 * 30))
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache used for lookups that never change once created
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class VisitorSessionCache:
+    """
+    Maps (account_unique_id, visitor_uuid) to a ChatSession id.
+
+    Lookups hit the local LRU first, then the shared Redis layer when
+    VISITOR_SESSION_CACHE_URL is configured, so all workers benefit from
+    a session created by any one of them.
+    """
+    def __init__(self, max_size: int = VISITOR_SESSION_CACHE_SIZE, shared_url: Optional[str] = VISITOR_SESSION_CACHE_URL):
+        self.local = LRUCache(max_size)
+        self.shared = None
+        if shared_url and redis is not None:
+            self.shared = redis.Redis.from_url(shared_url, socket_timeout=0.2)
+
+    @staticmethod
+    def _key(account_unique_id: str, visitor_uuid: str) -> str:
+        return f"chat-session:{account_unique_id}:{visitor_uuid}"
+
+    def get(self, account_unique_id: str, visitor_uuid: str) -> Optional[int]:
+        key = self._key(account_unique_id, visitor_uuid)
+        chat_session_id = self.local.get(key)
+        if chat_session_id is not None or self.shared is None:
+            return chat_session_id
+
+        try:
+            shared_value = self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Visitor session cache: shared lookup failed: {e}")
+            return None
+        if shared_value is None:
+            return None
+
+        chat_session_id = int(shared_value)
+        self.local.set(key, chat_session_id)
+        return chat_session_id
+
+    def set(self, account_unique_id: str, visitor_uuid: str, chat_session_id: int):
+        key = self._key(account_unique_id, visitor_uuid)
+        self.local.set(key, chat_session_id)
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(key, chat_session_id, ex=VISITOR_SESSION_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Visitor session cache: shared write failed: {e}")
+
+    def clear(self):
+        self.local.clear()
+
+
+visitor_session_cache = VisitorSessionCache()
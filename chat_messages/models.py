@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import Optional, TYPE_CHECKING, List
 from sqlmodel import Field, SQLModel, Relationship, Column
-from sqlalchemy import JSON
+from sqlalchemy import JSON, UniqueConstraint
 import uuid
 # Conditional import for type checking
 if TYPE_CHECKING:
@@ -18,6 +18,10 @@ class ChatSession(ChatSessionBase, table=True):
     """
     Chat Session Model
     """
+    __table_args__ = (
+        UniqueConstraint("account_unique_id", "visitor_uuid", name="uq_chatsession_account_visitor"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     account: "Account" = Relationship(back_populates="chat_sessions")
     visitor_uuid: str = Field(default=None, nullable=False, index=True)
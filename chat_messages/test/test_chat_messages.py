@@ -0,0 +1,87 @@
+import unittest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+from file_management.models import SourceFile
+from accounts.models import Account
+from chat_messages.models import ChatSession
+from chat_messages.cache import LRUCache, visitor_session_cache
+from chat_messages.utils import create_or_identify_chat_session, get_session_id_by_visitor_uuid, \
+    get_or_create_chat_session_id, create_chat_turn_messages, get_chat_messages_by_session_id
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Tests for the LRU cache backing the visitor session cache
+    """
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """
+        Test eviction order
+        """
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+
+class TestChatSessionResolution(unittest.TestCase):
+    """
+    Tests for resolving a visitor to a chat session
+    """
+
+    def setUp(self):
+        """
+        Fresh in-memory DB and empty cache per test
+        """
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(Account(account_organisation="Test Organisation", account_unique_id="acc123"))
+        self.session.commit()
+        visitor_session_cache.clear()
+
+    def tearDown(self):
+        self.session.close()
+        visitor_session_cache.clear()
+
+    def test_create_or_identify_returns_same_session_for_same_visitor(self):
+        """
+        Test repeated calls reuse the existing row
+        """
+        first = create_or_identify_chat_session("acc123", "visitor-1", self.session)
+        second = create_or_identify_chat_session("acc123", "visitor-1", self.session)
+        self.assertEqual(first.id, second.id)
+        self.assertIsNotNone(second.end_time)
+        sessions = self.session.exec(select(ChatSession)).all()
+        self.assertEqual(len(sessions), 1)
+
+    def test_get_session_id_by_visitor_uuid_is_served_from_cache(self):
+        """
+        Test the cache is populated on creation
+        """
+        chat_session_id = create_or_identify_chat_session("acc123", "visitor-2", self.session).id
+        self.session.close()
+        self.assertEqual(get_session_id_by_visitor_uuid("acc123", "visitor-2", session=None), chat_session_id)
+
+    def test_get_or_create_chat_session_id_creates_session(self):
+        """
+        Test a new visitor gets a session
+        """
+        chat_session_id = get_or_create_chat_session_id("acc123", "visitor-3", self.session)
+        self.assertIsInstance(chat_session_id, int)
+        self.assertEqual(get_or_create_chat_session_id("acc123", "visitor-3", self.session), chat_session_id)
+
+    def test_create_chat_turn_messages_persists_question_then_answer(self):
+        """
+        Test a widget turn stores both messages in order
+        """
+        chat_session_id = get_or_create_chat_session_id("acc123", "visitor-4", self.session)
+        create_chat_turn_messages(chat_session_id, "What are your hours?", "9 to 5.", ["acc123/hours.pdf"], self.session)
+        chat_messages = get_chat_messages_by_session_id(chat_session_id, self.session)
+        self.assertEqual([msg.sender_type for msg in chat_messages], ["user", "bot"])
+        self.assertEqual(chat_messages[1].source_files, ["acc123/hours.pdf"])
+        self.assertIsNotNone(self.session.get(ChatSession, chat_session_id).end_time)
@@ -1,43 +1,84 @@
-from sqlmodel import select, Session, func
+import logging
+from sqlmodel import select, update, Session, func
 from chat_messages.models import ChatSession, ChatMessage, EmailMessage
+from chat_messages.cache import visitor_session_cache
 from accounts.models import Account
 from typing import Optional
 from datetime import datetime, timezone, timedelta
 
+logger = logging.getLogger(__name__)
+
+
+def _chat_session_upsert_statement(dialect_name: str, account_unique_id: str, visitor_uuid: str):
+    """
+    Builds a single INSERT ... ON CONFLICT statement for the (account, visitor) pair.
+    A new visitor gets a fresh row, a returning visitor just has end_time touched.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.now(timezone.utc)
+    statement = insert(ChatSession).values(
+        account_unique_id=account_unique_id,
+        visitor_uuid=visitor_uuid,
+        start_time=now,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[ChatSession.account_unique_id, ChatSession.visitor_uuid],
+        set_={"end_time": now},
+    )
+    return statement.returning(ChatSession)
+
 
 def create_or_identify_chat_session(account_unique_id: str, visitor_uuid: str, session: Session):
     """
     Create or Identify Chat Session
+
+    Uses one upsert round trip, so two simultaneous requests from a new visitor
+    resolve to the same row instead of racing to insert duplicates.
     """
-    chat_session = session.exec(
-        select(ChatSession).where(ChatSession.account_unique_id == account_unique_id, ChatSession.visitor_uuid == visitor_uuid)
-    ).first()
+    statement = _chat_session_upsert_statement(session.get_bind().dialect.name, account_unique_id, visitor_uuid)
+    chat_session = session.scalars(statement, execution_options={"populate_existing": True}).one()
+    chat_session_id = chat_session.id
+    session.commit()
 
-    if not chat_session:
-        chat_session = ChatSession(account_unique_id=account_unique_id, visitor_uuid=visitor_uuid)
-        session.add(chat_session)
-        session.commit()
-        session.refresh(chat_session)
-    else:
-        # Optionally, you can update the session's end time if needed
-        chat_session.end_time = datetime.now(timezone.utc)
-        session.add(chat_session)
-        session.commit()
-        session.refresh(chat_session)
+    visitor_session_cache.set(account_unique_id, visitor_uuid, chat_session_id)
 
     return chat_session
 
+
 def get_session_id_by_visitor_uuid(account_unique_id: str, visitor_uuid: str, session: Session) -> Optional[int]:
     """
     Get Chat Session ID by Visitor UUID
     """
+    cached_session_id = visitor_session_cache.get(account_unique_id, visitor_uuid)
+    if cached_session_id is not None:
+        return cached_session_id
+
     chat_session = session.exec(
         select(ChatSession.id).where(ChatSession.visitor_uuid == visitor_uuid, ChatSession.account_unique_id == account_unique_id)
     ).first()
+
+    if chat_session:
+        visitor_session_cache.set(account_unique_id, visitor_uuid, chat_session)
     
     return chat_session if chat_session else None
 
 
+def get_or_create_chat_session_id(account_unique_id: str, visitor_uuid: str, session: Session) -> int:
+    """
+    Resolve the Chat Session ID for a visitor, creating the session if needed.
+    Served from the visitor session cache without touching the DB when possible.
+    """
+    cached_session_id = visitor_session_cache.get(account_unique_id, visitor_uuid)
+    if cached_session_id is not None:
+        return cached_session_id
+
+    return create_or_identify_chat_session(account_unique_id, visitor_uuid, session).id
+
+
 def get_chat_messages_by_session_id(chat_session_id: int, session: Session) -> list[ChatMessage]:
     """
     Get Chat Messages by Session ID
@@ -49,7 +90,7 @@ def get_chat_messages_by_session_id(chat_session_id: int, session: Session) -> l
         return []
     
     chat_messages.sort(key=lambda x: x.timestamp)  # Sort messages by timestamp
-    print('chat_messages:', chat_messages)
+    logger.debug("Loaded chat messages", extra={"chat_session_id": chat_session_id, "message_count": len(chat_messages)})
     return chat_messages
 
 
@@ -73,6 +114,37 @@ def create_chat_message(chat_session_id: int, message_text: str, sender_type: st
     return chat_message
 
 
+def create_chat_turn_messages(chat_session_id: int, user_message_text: str, bot_message_text: str, sources: list, session: Session) -> list[ChatMessage]:
+    """
+    Persist a full widget turn (the visitor's question and the bot's answer)
+    in a single transaction, and mark the session as active.
+    """
+    now = datetime.now(timezone.utc)
+    user_message = ChatMessage(
+        chat_session_id=chat_session_id,
+        message_text=user_message_text,
+        sender_type='user',
+        source_files=[],
+        timestamp=now
+    )
+    bot_message = ChatMessage(
+        chat_session_id=chat_session_id,
+        message_text=bot_message_text,
+        sender_type='bot',
+        source_files=sources or [],
+        # Keep the bot reply strictly after the question when sorting by timestamp
+        timestamp=now + timedelta(microseconds=1)
+    )
+    session.add(user_message)
+    session.add(bot_message)
+    session.exec(
+        update(ChatSession).where(ChatSession.id == chat_session_id).values(end_time=now)
+    )
+    session.commit()
+
+    return [user_message, bot_message]
+
+
 def get_chat_session_count(account_unique_id: str, session: Session):
     """
     Returns the number of chat sessions for the account in the last 30 days
@@ -1,5 +1,6 @@
 import aiohttp
 import os
+import logging
 import chromadb
 from fastapi import HTTPException, status
 
@@ -23,6 +24,8 @@ async def create_render_chroma_db(chroma_endpoint: str, headers: dict = None, da
         print(f"Error occurred while trying to create ChromaDB database: {e}")
         
         
+logger = logging.getLogger(__name__)
+
 CHROMA_SERVER_AUTHN_CREDENTIALS = os.environ['CHROMA_SERVER_AUTHN_CREDENTIALS']
 chroma_headers = {'X-Chroma-Token': CHROMA_SERVER_AUTHN_CREDENTIALS}
 CHROMA_ENDPOINT = os.environ['CHROMA_ENDPOINT']
@@ -75,6 +78,66 @@ def clear_chroma_db_datastore_for_replace(account_unique_id: str):
                 detail="An error occurred while trying to clear the database."
             )
 
+# Sources per delete(where=...) call, keeps the $in filter and request size bounded
+CHROMA_DELETE_BATCH_SIZE = int(os.environ.get('CHROMA_DELETE_BATCH_SIZE', 100))
+# Chunks read per page when scanning a collection's metadata
+CHROMA_SCAN_PAGE_SIZE = int(os.environ.get('CHROMA_SCAN_PAGE_SIZE', 1000))
+
+
+def get_account_collection(account_unique_id: str):
+    """
+    The account's Chroma collection, or None if nothing has been indexed yet
+    """
+    chroma_client = chromadb.HttpClient(
+        host=CHROMA_ENDPOINT,
+        headers=chroma_headers
+    )
+    try:
+        return chroma_client.get_collection(name=f"collection-{account_unique_id}")
+    except Exception as e:
+        logger.warning(f"No Chroma collection for account: {e}", extra={"account_unique_id": account_unique_id})
+        return None
+
+
+def delete_chunks_for_sources(account_unique_id: str, sources: list[str], batch_size: int = CHROMA_DELETE_BATCH_SIZE) -> int:
+    """
+    Delete every chunk whose source metadata is one of `sources`, in batched
+    delete(where=...) calls. Returns the number of sources sent for deletion.
+    """
+    sources = list(dict.fromkeys(sources))
+    if not sources:
+        return 0
+    collection = get_account_collection(account_unique_id)
+    if collection is None:
+        return 0
+
+    for batch_start in range(0, len(sources), batch_size):
+        batch = sources[batch_start:batch_start + batch_size]
+        where = {"source": batch[0]} if len(batch) == 1 else {"source": {"$in": batch}}
+        collection.delete(where=where)
+    logger.info("Deleted chunks for sources", extra={"account_unique_id": account_unique_id, "source_count": len(sources)})
+    return len(sources)
+
+
+def list_chunk_sources(account_unique_id: str, page_size: int = CHROMA_SCAN_PAGE_SIZE) -> set[str]:
+    """
+    Every distinct source referenced by the account's chunks, read page by page
+    """
+    collection = get_account_collection(account_unique_id)
+    if collection is None:
+        return set()
+
+    sources = set()
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        metadatas = page.get("metadatas") or []
+        sources.update(metadata["source"] for metadata in metadatas if metadata and metadata.get("source"))
+        if len(page.get("ids") or []) < page_size:
+            return sources
+        offset += page_size
+
+
 # Example usage
 # CHROMA_ENDPOINT = 'https://fastapi-rag-chroma.onrender.com/api/v1'
 # CHROMA_SERVER_AUTHN_CREDENTIALS = os.environ.get('CHROMA_SERVER_AUTHN_CREDENTIALS')
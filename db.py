@@ -5,21 +5,23 @@ from sqlalchemy.ext.asyncio import create_async_engine
 
 load_dotenv()
 
+# SQL statement echo is off unless explicitly enabled, it is far too noisy for the request path
+SQL_ECHO = os.environ.get('SQL_ECHO', 'false').lower() in ('1', 'true', 'yes')
+
 if os.environ.get('ENVIRONMENT') == 'development':
 
     DB_FILE = "source_db.db"
 
-    engine = create_engine(f'sqlite:///{DB_FILE}', echo=True)
+    engine = create_engine(f'sqlite:///{DB_FILE}', echo=SQL_ECHO)
 
-    async_engine = create_async_engine(f'sqlite+aiosqlite:///{DB_FILE}', echo=True)
+    async_engine = create_async_engine(f'sqlite+aiosqlite:///{DB_FILE}', echo=SQL_ECHO)
 
 else:
 
     DATABASE_URL = os.environ.get('DATABASE_URL')
-    print(f"DATABASE_URL: {DATABASE_URL}")
 
     # Synchronous engine for PostgreSQL
-    engine = create_engine(DATABASE_URL.replace('postgres://', 'postgresql://'), echo=True)
+    engine = create_engine(DATABASE_URL.replace('postgres://', 'postgresql://'), echo=SQL_ECHO)
 
     # Asynchronous engine for PostgreSQL
-    async_engine = create_async_engine(DATABASE_URL.replace('postgres://', 'postgresql+asyncpg://'), echo=True)
+    async_engine = create_async_engine(DATABASE_URL.replace('postgres://', 'postgresql+asyncpg://'), echo=SQL_ECHO)
@@ -0,0 +1,246 @@
+import os
+import asyncio
+import logging
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from typing import Optional, AsyncIterator
+from urllib.parse import urljoin, urldefrag, urlparse
+import httpx
+from bs4 import BeautifulSoup
+from file_management.html_extraction import HTML_PARSER
+
+
+logger = logging.getLogger(__name__)
+
+# Crawl limits, the per host limit keeps us polite to customer sites while the total bounds our own load
+CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', 200))
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', 16))
+CRAWL_PER_HOST_CONCURRENCY = int(os.environ.get('CRAWL_PER_HOST_CONCURRENCY', 4))
+CRAWL_TIMEOUT_SECONDS = float(os.environ.get('CRAWL_TIMEOUT_SECONDS', 15))
+CRAWL_USER_AGENT = os.environ.get('CRAWL_USER_AGENT', 'YourDocsAI-Crawler/1.0')
+HTTP_MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', 64))
+
+# Links to files we can't ingest as pages are never queued
+SKIPPED_LINK_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js',
+    '.zip', '.gz', '.mp3', '.mp4', '.mov', '.avi', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared keep-alive HTTP client for fetching external pages
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=CRAWL_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+            headers={"User-Agent": CRAWL_USER_AGENT},
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """
+    Close the shared HTTP client, called on application shutdown
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class HostLimiter:
+    """
+    One semaphore per host so a single site never gets more than `per_host` concurrent requests
+    """
+    def __init__(self, per_host: int):
+        self._semaphores = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    def for_url(self, url: str) -> asyncio.Semaphore:
+        return self._semaphores[urlparse(url).netloc.lower()]
+
+
+def normalize_url(url: str) -> str:
+    """
+    Drops the fragment and gives the site root a trailing slash so the same page is only crawled once
+    """
+    url, _ = urldefrag(url.strip())
+    parsed_url = urlparse(url)
+    if not parsed_url.path:
+        url = parsed_url._replace(path='/').geturl()
+    return url
+
+
+def extract_links(html_content: str, base_url: str) -> list[str]:
+    """
+    Same-host page links found in an HTML document
+    """
+    host = urlparse(base_url).netloc.lower()
+    links = []
+    for anchor in BeautifulSoup(html_content, HTML_PARSER).find_all('a', href=True):
+        link = normalize_url(urljoin(base_url, anchor['href']))
+        parsed_link = urlparse(link)
+        if parsed_link.scheme not in ('http', 'https') or parsed_link.netloc.lower() != host:
+            continue
+        if parsed_link.path.lower().endswith(SKIPPED_LINK_EXTENSIONS):
+            continue
+        links.append(link)
+    return list(dict.fromkeys(links))
+
+
+def is_sitemap(page: dict) -> bool:
+    """
+    Whether a fetched page is an XML sitemap or sitemap index
+    """
+    content_type = (page.get('content_type') or '').lower()
+    content_start = (page.get('content') or '').lstrip()[:500]
+    if 'xml' not in content_type and not content_start.startswith('<?xml'):
+        return False
+    return '<urlset' in content_start or '<sitemapindex' in content_start
+
+
+def parse_sitemap(xml_content: str) -> tuple[list[str], list[str]]:
+    """
+    Returns the (page_urls, child_sitemap_urls) listed in a sitemap or sitemap index
+    """
+    try:
+        root = ET.fromstring(xml_content.encode('utf-8'))
+    except ET.ParseError as e:
+        logger.warning(f"Unable to parse sitemap: {e}")
+        return [], []
+
+    locations = [element.text.strip() for element in root.iter() if element.tag.endswith('loc') and element.text]
+    if root.tag.endswith('sitemapindex'):
+        return [], locations
+    return locations, []
+
+
+async def fetch_page(client: httpx.AsyncClient, url: str, limiter: HostLimiter, validators: Optional[dict] = None) -> dict:
+    """
+    Fetch one page, sending the ETag / Last-Modified from the previous crawl as
+    conditional request headers. Never raises, failures come back with status 'failed'.
+    """
+    request_headers = {}
+    if validators:
+        if validators.get('etag'):
+            request_headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            request_headers['If-Modified-Since'] = validators['last_modified']
+
+    try:
+        async with limiter.for_url(url):
+            response = await client.get(url, headers=request_headers)
+        if response.status_code == 304:
+            return {"url": url, "status": "not_modified"}
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Failed to fetch {url}: {e}")
+        return {"url": url, "status": "failed", "error": str(e)}
+
+    return {
+        "url": url,
+        "status": "fetched",
+        "content": response.text,
+        "content_type": response.headers.get('content-type', ''),
+        "etag": response.headers.get('etag'),
+        "last_modified": response.headers.get('last-modified'),
+    }
+
+
+async def collect_sitemap_urls(client: httpx.AsyncClient, sitemap_page: dict, limiter: HostLimiter, max_pages: int) -> list[str]:
+    """
+    Page URLs from a sitemap, following sitemap indexes until max_pages URLs are found
+    """
+    page_urls, child_sitemaps = parse_sitemap(sitemap_page['content'])
+    seen_sitemaps = {sitemap_page['url']}
+    while child_sitemaps and len(page_urls) < max_pages:
+        sitemap_urls = [url for url in child_sitemaps if url not in seen_sitemaps]
+        seen_sitemaps.update(sitemap_urls)
+        child_sitemaps = []
+        for child_page in await asyncio.gather(*(fetch_page(client, url, limiter) for url in sitemap_urls)):
+            if child_page['status'] != 'fetched':
+                continue
+            child_page_urls, nested_sitemaps = parse_sitemap(child_page['content'])
+            page_urls.extend(child_page_urls)
+            child_sitemaps.extend(nested_sitemaps)
+    return list(dict.fromkeys(normalize_url(url) for url in page_urls))[:max_pages]
+
+
+async def crawl_site(root_url: str,
+                     max_pages: int = CRAWL_MAX_PAGES,
+                     known_validators: Optional[dict[str, dict]] = None,
+                     client: Optional[httpx.AsyncClient] = None,
+                     concurrency: int = CRAWL_CONCURRENCY,
+                     per_host_concurrency: int = CRAWL_PER_HOST_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Crawl a site from a root page or a sitemap, yielding each page result as it completes.
+
+    Sitemap URLs are fetched as listed. For a root page, same-host links are followed
+    breadth first, and the pages known from the previous crawl are queued up front,
+    so discovery doesn't stop at pages that come back 304 Not Modified.
+    known_validators maps page URL to the {'etag', 'last_modified'} seen last time.
+    """
+    client = client or get_http_client()
+    known_validators = known_validators or {}
+    limiter = HostLimiter(per_host_concurrency)
+    root_url = normalize_url(root_url)
+
+    # The root is always fetched unconditionally, its links or sitemap entries drive the crawl
+    root_page = await fetch_page(client, root_url, limiter)
+    if root_page['status'] != 'fetched':
+        yield root_page
+        return
+
+    if is_sitemap(root_page):
+        seed_urls = await collect_sitemap_urls(client, root_page, limiter, max_pages)
+        follow_links = False
+    else:
+        root_host = urlparse(root_url).netloc.lower()
+        seed_urls = extract_links(root_page['content'], root_url) + [
+            url for url in known_validators if urlparse(url).netloc.lower() == root_host
+        ]
+        follow_links = True
+        max_pages -= 1
+        yield root_page
+
+    url_queue = asyncio.Queue()
+    results = asyncio.Queue()
+    seen_urls = {root_url}
+    pending_count = 0
+
+    def enqueue(url: str):
+        nonlocal pending_count
+        if url in seen_urls or pending_count >= max_pages:
+            return
+        seen_urls.add(url)
+        pending_count += 1
+        url_queue.put_nowait(url)
+
+    async def worker():
+        while True:
+            url = await url_queue.get()
+            page = await fetch_page(client, url, limiter, known_validators.get(url))
+            if follow_links and page['status'] == 'fetched' and 'html' in page['content_type'].lower():
+                for link in extract_links(page['content'], url):
+                    enqueue(link)
+            results.put_nowait(page)
+
+    for url in seed_urls:
+        enqueue(url)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        # Links are queued before their page's result is published, so the count never drops to zero early
+        yielded_count = 0
+        while yielded_count < pending_count:
+            yield await results.get()
+            yielded_count += 1
+    finally:
+        for worker_task in workers:
+            worker_task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
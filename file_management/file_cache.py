@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Local disk cache for viewed source documents, disabled unless a directory is configured
+FILE_VIEW_CACHE_DIR = os.environ.get('FILE_VIEW_CACHE_DIR')
+FILE_VIEW_CACHE_MAX_BYTES = int(os.environ.get('FILE_VIEW_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+FILE_VIEW_CACHE_MAX_OBJECT_BYTES = int(os.environ.get('FILE_VIEW_CACHE_MAX_OBJECT_BYTES', 50 * 1024 * 1024))
+
+
+class DiskLRUCache:
+    """
+    Size-capped, least-recently-used cache of S3 objects on local disk.
+
+    Each entry is stored as a data file plus a small JSON metadata file holding
+    the original S3 key, ETag, Last-Modified, content type and size. The LRU
+    order is kept in memory and rebuilt from file modification times on start.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int, max_object_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_existing_entries()
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.data"), os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _load_existing_entries(self):
+        existing_entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith('.json'):
+                continue
+            metadata_path = os.path.join(self.cache_dir, file_name)
+            try:
+                with open(metadata_path, encoding='utf-8') as metadata_file:
+                    metadata = json.load(metadata_file)
+                existing_entries.append((os.path.getmtime(metadata_path), metadata['key'], metadata['size']))
+            except (OSError, ValueError, KeyError):
+                continue
+        for _, key, size in sorted(existing_entries):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns the cached metadata (with the data file 'path') or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+
+        data_path, metadata_path = self._paths(key)
+        try:
+            with open(metadata_path, encoding='utf-8') as metadata_file:
+                metadata = json.load(metadata_file)
+            os.utime(metadata_path)
+        except (OSError, ValueError):
+            self.delete(key)
+            return None
+        if not os.path.exists(data_path):
+            self.delete(key)
+            return None
+        return {**metadata, "path": data_path}
+
+    def can_store(self, size: Optional[int]) -> bool:
+        return size is not None and size <= min(self.max_object_bytes, self.max_bytes)
+
+    def open_writer(self, key: str, metadata: dict) -> "DiskCacheWriter":
+        return DiskCacheWriter(self, key, metadata)
+
+    def _commit(self, key: str, temp_path: str, metadata: dict):
+        data_path, metadata_path = self._paths(key)
+        os.replace(temp_path, data_path)
+        with open(metadata_path, 'w', encoding='utf-8') as metadata_file:
+            json.dump({**metadata, "key": key}, metadata_file)
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = metadata['size']
+            self._total_bytes += metadata['size']
+        self._evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._entries:
+                    return
+                key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+class DiskCacheWriter:
+    """
+    Collects an object into a temporary file while it is streamed to the client.
+    The entry only becomes visible once commit() is called with the complete body.
+    """
+    def __init__(self, cache: DiskLRUCache, key: str, metadata: dict):
+        self.cache = cache
+        self.key = key
+        self.metadata = metadata
+        self.bytes_written = 0
+        temp_fd, self.temp_path = tempfile.mkstemp(dir=cache.cache_dir, suffix='.tmp')
+        self._file = os.fdopen(temp_fd, 'wb')
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self.bytes_written += len(chunk)
+
+    def commit(self):
+        self._file.close()
+        if self.bytes_written != self.metadata.get('size'):
+            self.discard()
+            return
+        try:
+            self.cache._commit(self.key, self.temp_path, self.metadata)
+        except OSError as e:
+            logger.warning(f"Failed to store {self.key} in the file view cache: {e}")
+            self.discard()
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+file_view_cache = DiskLRUCache(FILE_VIEW_CACHE_DIR, FILE_VIEW_CACHE_MAX_BYTES, FILE_VIEW_CACHE_MAX_OBJECT_BYTES) if FILE_VIEW_CACHE_DIR else None
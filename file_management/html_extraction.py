@@ -0,0 +1,108 @@
+import re
+import math
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:  # lxml is much faster, html.parser keeps extraction working without it
+    HTML_PARSER = 'html.parser'
+
+
+# Must match the splitter used by the document processor
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Elements that never hold page content
+NON_CONTENT_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object', 'button', 'select', 'input']
+# Site chrome repeated on every page, headers and footers are kept inside an <article>
+BOILERPLATE_TAGS = ['nav', 'aside', 'form', 'dialog']
+SECTION_TAGS = ['header', 'footer']
+BOILERPLATE_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'search', 'dialog', 'alertdialog'}
+# Matched against whole id / class tokens split on - and _, so "nav" doesn't match "canvas"
+BOILERPLATE_NAME_PATTERN = re.compile(
+    r'(?:^|[-_\s])(?:nav|navbar|navigation|menu|footer|header|masthead|sidebar|cookies?|consent|gdpr|banner|'
+    r'breadcrumbs?|social|share|sharing|newsletter|subscribe|popup|modal|promo|ads?|advert|advertisement|skip-link)(?:$|[-_\s])',
+    re.IGNORECASE
+)
+
+
+def is_boilerplate_element(element) -> bool:
+    if element.attrs is None:
+        return False
+    if element.get('role', '').lower() in BOILERPLATE_ROLES:
+        return True
+    if element.get('aria-hidden') == 'true' or element.has_attr('hidden'):
+        return True
+    style = element.get('style', '').replace(' ', '').lower()
+    if 'display:none' in style or 'visibility:hidden' in style:
+        return True
+    names = ' '.join(element.get('class', [])) + ' ' + element.get('id', '')
+    return bool(BOILERPLATE_NAME_PATTERN.search(names))
+
+
+def find_main_content(soup: BeautifulSoup):
+    """
+    The element holding the page's main content, falling back to the body
+    """
+    main_element = soup.find('main') or soup.find(attrs={'role': 'main'})
+    if main_element:
+        return main_element
+    articles = soup.find_all('article')
+    if articles:
+        return max(articles, key=lambda article: len(article.get_text(strip=True)))
+    return soup.body or soup
+
+
+def estimate_chunk_count(text_length: int) -> int:
+    """
+    Number of chunks the document processor's splitter produces for text of this length
+    """
+    if text_length <= 0:
+        return 0
+    if text_length <= CHUNK_SIZE:
+        return 1
+    return math.ceil((text_length - CHUNK_OVERLAP) / (CHUNK_SIZE - CHUNK_OVERLAP))
+
+
+def extract_main_content(html_content: str) -> dict:
+    """
+    Extract the title and main content text of an HTML page, dropping scripts,
+    navigation, headers, footers, cookie banners and other site chrome.
+
+    Also reports the size of the whole-page text the old extraction indexed,
+    so the reduction can be returned with the ingestion result.
+    """
+    soup = BeautifulSoup(html_content, HTML_PARSER)
+    title = soup.title.get_text(strip=True) if soup.title else ''
+
+    # What the whole-page extraction used to index
+    full_page_chars = len(soup.get_text(separator="\n", strip=True))
+
+    for element in soup.find_all(NON_CONTENT_TAGS):
+        element.decompose()
+    page_text = soup.get_text(separator="\n", strip=True)
+
+    content_root = find_main_content(soup)
+    for element in content_root.find_all(BOILERPLATE_TAGS):
+        element.decompose()
+    for element in content_root.find_all(SECTION_TAGS):
+        if element.find_parent('article') is None:
+            element.decompose()
+    for element in content_root.find_all(is_boilerplate_element):
+        element.decompose()
+
+    text = content_root.get_text(separator="\n", strip=True)
+    if not text:
+        # The heuristics removed everything, index the page without scripts rather than nothing
+        text = page_text
+    return {
+        "title": title or "No Title Found",
+        "text": text,
+        "stats": {
+            "full_page_chars": full_page_chars,
+            "text_chars": len(text),
+            "full_page_chunks": estimate_chunk_count(full_page_chars),
+            "text_chunks": estimate_chunk_count(len(text)),
+        },
+    }
@@ -1,4 +1,5 @@
 from typing import Optional, List
+from datetime import datetime, timezone
 from sqlmodel import SQLModel, Field, Relationship
 
 class SourceFile(SQLModel, table=True):
@@ -14,6 +15,11 @@ class SourceFile(SQLModel, table=True):
     processing_status: Optional[str] = Field(default="PENDING") # PENDING, PROCESSING, COMPLETED, FAILED
     processing_error: Optional[str] = Field(default=None) # To store error messages from Lambda
     already_processed_to_source_data: bool = Field(default=False, nullable=True)
+    content_hash: Optional[str] = Field(default=None, nullable=True, index=True) # SHA-256 of the uploaded bytes, used to skip re-processing duplicates
+    source_url: Optional[str] = Field(default=None, nullable=True, index=True) # Page URL for files created by the website crawler
+    source_etag: Optional[str] = Field(default=None, nullable=True) # ETag / Last-Modified from the last crawl, sent back as validators on re-crawl
+    source_last_modified: Optional[str] = Field(default=None, nullable=True)
+    text_file_name: Optional[str] = Field(default=None, nullable=True) # Extracted text indexed directly, the PDF at file_name is only rendered when first viewed
     account_unique_id: str = Field(default=None, foreign_key="account.account_unique_id")
     account: "Account" = Relationship(back_populates="source_files")
     folder_id: Optional[int] = Field(default=None, foreign_key="folder.id")
@@ -31,5 +37,52 @@ class Folder(SQLModel, table=True):
     account: "Account" = Relationship(back_populates="folders")
     source_files: List["SourceFile"] = Relationship(back_populates="folder")
 
+class IngestionJob(SQLModel, table=True):
+    """
+    DB Table for bulk indexing runs, one per generate-chroma-db request
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    account_unique_id: str = Field(foreign_key="account.account_unique_id", index=True)
+    status: str = Field(default="QUEUED") # QUEUED, RUNNING, COMPLETED, FAILED
+    replace: bool = Field(default=False)
+    total_files: int = Field(default=0)
+    dispatched_files: int = Field(default=0)
+    failed_files: int = Field(default=0)
+    error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = Field(default=None, nullable=True)
+    finished_at: Optional[datetime] = Field(default=None, nullable=True)
+
+
+class IngestionEvent(SQLModel, table=True):
+    """
+    DB Table for one file's way from upload to searchable, a timestamp per stage.
+    source_file_id has no foreign key so events outlive deleted files for metrics.
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    account_unique_id: str = Field(foreign_key="account.account_unique_id", index=True)
+    source_file_id: Optional[int] = Field(default=None, index=True)
+    ingestion_job_id: Optional[int] = Field(default=None, foreign_key="ingestionjob.id", index=True)
+    status: str = Field(default="UPLOADED") # Latest stage reached: UPLOADED ... INDEXED, or FAILED
+    uploaded_at: Optional[datetime] = Field(default=None, nullable=True)
+    staged_at: Optional[datetime] = Field(default=None, nullable=True)
+    converted_at: Optional[datetime] = Field(default=None, nullable=True)
+    parsed_at: Optional[datetime] = Field(default=None, nullable=True)
+    chunked_at: Optional[datetime] = Field(default=None, nullable=True)
+    embedded_at: Optional[datetime] = Field(default=None, nullable=True)
+    indexed_at: Optional[datetime] = Field(default=None, nullable=True, index=True)
+    failed_at: Optional[datetime] = Field(default=None, nullable=True)
+    original_bytes: Optional[int] = Field(default=None, nullable=True) # Uploaded file
+    converted_bytes: Optional[int] = Field(default=None, nullable=True) # Converted PDF
+    text_bytes: Optional[int] = Field(default=None, nullable=True) # Parsed text
+    chunk_count: Optional[int] = Field(default=None, nullable=True)
+    embedded_chunk_count: Optional[int] = Field(default=None, nullable=True) # New or changed chunks that were embedded
+    chunks_per_second: Optional[float] = Field(default=None, nullable=True) # Embed + upsert throughput reported by the processor
+    embedding_cache_hits: Optional[int] = Field(default=None, nullable=True) # Embedded chunks served from the embedding cache
+    error: Optional[str] = Field(default=None, nullable=True)
+
+
 from accounts.models import Account
 
@@ -0,0 +1,22 @@
+import unittest
+from sqlmodel import SQLModel, Session, create_engine
+# Imported so their tables are part of SQLModel.metadata
+from file_management.models import SourceFile, Folder, IngestionJob, IngestionEvent
+from chat_messages.models import ChatSession
+
+
+class DBTestCase(unittest.TestCase):
+    """
+    Base for tests that need the database, gives every test a fresh in-memory DB and a session on it
+    """
+
+    def setUp(self):
+        """
+        Fresh in-memory DB per test
+        """
+        self.engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+
+    def tearDown(self):
+        self.session.close()
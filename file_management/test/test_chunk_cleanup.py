@@ -0,0 +1,56 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+from file_management.models import SourceFile, Folder
+from file_management.test.db_test_case import DBTestCase
+from sqlmodel import select
+from file_management.utils import get_unshared_files, delete_source_files, find_orphaned_chunk_sources
+
+
+class TestChunkCleanup(DBTestCase):
+    """
+    Tests for removing deleted files' chunks and finding orphaned chunks
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.session.add(Folder(id=1, folder_name="Docs", account_unique_id="acc"))
+        self.session.add_all([
+            SourceFile(id=1, file_name="a.pdf", file_path="p", account_unique_id="acc", folder_id=1),
+            SourceFile(id=2, file_name="shared.pdf", file_path="p", account_unique_id="acc", folder_id=1,
+                       text_file_name="shared.txt"),
+            # Deduplicated copy outside the folder, keeps shared.pdf and its chunks alive
+            SourceFile(id=3, file_name="shared.pdf", file_path="p", account_unique_id="acc"),
+        ])
+        self.session.commit()
+
+    def test_shared_files_are_kept(self):
+        """
+        Test only files no other record points at are returned
+        """
+        folder_files = self.session.exec(select(SourceFile).where(SourceFile.folder_id == 1)).all()
+        self.assertEqual([file.id for file in get_unshared_files(folder_files, self.session)], [1])
+
+        all_files = self.session.exec(select(SourceFile)).all()
+        self.assertEqual(sorted(file.id for file in get_unshared_files(all_files, self.session)), [1, 2, 3])
+
+    def test_delete_source_files(self):
+        """
+        Test rows are deleted and only unshared objects and chunks are removed
+        """
+        folder_files = self.session.exec(select(SourceFile).where(SourceFile.folder_id == 1)).all()
+        with patch("file_management.utils.s3", MagicMock()) as mock_s3:
+            chunk_sources = asyncio.run(delete_source_files(folder_files, self.session))
+
+        self.assertEqual(chunk_sources, ["acc/a.pdf", "a.pdf"])
+        mock_s3.delete_objects.assert_called_once()
+        self.assertEqual(mock_s3.delete_objects.call_args.kwargs["Delete"]["Objects"], [{"Key": "acc/a.pdf"}])
+        self.assertEqual([file.id for file in self.session.exec(select(SourceFile)).all()], [3])
+
+    def test_find_orphaned_chunk_sources(self):
+        """
+        Test sources without a SourceFile are orphaned, in either source format
+        """
+        indexed_sources = {"acc/a.pdf", "shared.pdf", "acc/gone.pdf", "gone.xlsx.pdf"}
+        self.assertEqual(find_orphaned_chunk_sources("acc", indexed_sources, self.session),
+                         ["acc/gone.pdf", "gone.xlsx.pdf"])
+        self.assertEqual(find_orphaned_chunk_sources("other", {"acc/a.pdf"}, self.session), ["acc/a.pdf"])
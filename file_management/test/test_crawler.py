@@ -0,0 +1,177 @@
+import unittest
+import asyncio
+import hashlib
+from unittest.mock import MagicMock, patch
+import httpx
+from file_management.models import SourceFile
+from file_management.test.db_test_case import DBTestCase
+from sqlmodel import select
+from file_management.crawler import crawl_site, parse_sitemap, extract_links
+from file_management.utils import ingest_crawled_pages
+
+
+def page(links: list[str], body: str = "content") -> str:
+    return "<html><head><title>Page</title></head><body><p>{}</p>{}</body></html>".format(
+        body, "".join(f'<a href="{link}">link</a>' for link in links))
+
+
+async def collect_pages(root_url: str, handler, **kwargs) -> list[dict]:
+    """
+    Run a crawl against a mocked transport and collect every page result
+    """
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        return [crawled_page async for crawled_page in crawl_site(root_url, client=client, **kwargs)]
+
+
+class TestCrawler(unittest.TestCase):
+    """
+    Tests for the website crawler
+    """
+
+    def test_extract_links_keeps_same_host_pages(self):
+        """
+        Test external links, fragments and file links are dropped
+        """
+        html = page(["/about#team", "https://other.com/x", "/brochure.pdf", "contact", "mailto:a@b.com"])
+        self.assertEqual(extract_links(html, "https://site.com/"),
+                         ["https://site.com/about", "https://site.com/contact"])
+
+    def test_follows_links_up_to_max_pages(self):
+        """
+        Test same-host links are followed breadth first and the page cap is respected
+        """
+        site = {
+            "/": page(["/a", "/b"]),
+            "/a": page(["/c"]),
+            "/b": page(["/", "/c"]),
+            "/c": page(["/d"]),
+            "/d": page([]),
+        }
+
+        def handler(request):
+            return httpx.Response(200, text=site[request.url.path], headers={"content-type": "text/html"})
+
+        crawled = asyncio.run(collect_pages("https://site.com", handler))
+        self.assertEqual(sorted(p["url"] for p in crawled),
+                         ["https://site.com/", "https://site.com/a", "https://site.com/b", "https://site.com/c", "https://site.com/d"])
+
+        capped = asyncio.run(collect_pages("https://site.com", handler, max_pages=3))
+        self.assertEqual(len(capped), 3)
+
+    def test_recrawl_sends_validators(self):
+        """
+        Test known pages are requested conditionally and 304s are reported as not modified
+        """
+        def handler(request):
+            if request.url.path == "/":
+                return httpx.Response(200, text=page([]), headers={"content-type": "text/html"})
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text=page([]), headers={"content-type": "text/html"})
+
+        crawled = asyncio.run(collect_pages("https://site.com/", handler,
+                                            known_validators={"https://site.com/old": {"etag": '"v1"', "last_modified": None}}))
+        statuses = {p["url"]: p["status"] for p in crawled}
+        self.assertEqual(statuses, {"https://site.com/": "fetched", "https://site.com/old": "not_modified"})
+
+    def test_sitemap_index_is_expanded(self):
+        """
+        Test sitemap indexes are followed and listed pages are fetched without following links
+        """
+        namespace = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+        responses = {
+            "/sitemap.xml": f'<?xml version="1.0"?><sitemapindex {namespace}><sitemap><loc>https://site.com/pages.xml</loc></sitemap></sitemapindex>',
+            "/pages.xml": f'<?xml version="1.0"?><urlset {namespace}><url><loc>https://site.com/a</loc></url><url><loc>https://site.com/b</loc></url></urlset>',
+        }
+
+        def handler(request):
+            if request.url.path.endswith(".xml"):
+                return httpx.Response(200, text=responses[request.url.path], headers={"content-type": "application/xml"})
+            return httpx.Response(200, text=page(["/not-in-sitemap"]), headers={"content-type": "text/html"})
+
+        crawled = asyncio.run(collect_pages("https://site.com/sitemap.xml", handler))
+        self.assertEqual(sorted(p["url"] for p in crawled), ["https://site.com/a", "https://site.com/b"])
+        self.assertEqual(parse_sitemap("not xml"), ([], []))
+
+
+class TestIngestCrawledPages(DBTestCase):
+    """
+    Tests for batch ingestion of crawled pages
+    """
+
+    def fetched(self, url: str, body: str, etag: str = None) -> dict:
+        return {"url": url, "status": "fetched", "content": page([], body), "content_type": "text/html",
+                "etag": etag, "last_modified": None}
+
+    def test_only_new_and_changed_pages_are_converted(self):
+        """
+        Test unchanged text is skipped, changed pages replace their PDF and new pages are created
+        """
+        unchanged_hash = hashlib.sha256("same".encode('utf-8')).hexdigest()
+        self.session.add_all([
+            SourceFile(file_name="same.pdf", file_path="p", account_unique_id="acc", source_url="https://site.com/same",
+                       content_hash=unchanged_hash, already_processed_to_source_data=True),
+            SourceFile(file_name="changed_old.pdf", file_path="p", account_unique_id="acc", source_url="https://site.com/changed",
+                       content_hash="old", already_processed_to_source_data=True),
+        ])
+        self.session.commit()
+
+        pages = [
+            self.fetched("https://site.com/same", "same", etag='"v2"'),
+            self.fetched("https://site.com/changed", "new text"),
+            self.fetched("https://site.com/new", "brand new"),
+            {"url": "https://site.com/cached", "status": "not_modified"},
+        ]
+        removed_chunk_sources = []
+
+        async def remove_chunk_sources(chunk_sources):
+            removed_chunk_sources.extend(chunk_sources)
+
+        with patch("file_management.utils.s3", MagicMock()) as mock_s3:
+            counts = asyncio.run(ingest_crawled_pages(pages, "acc", 1, self.session, remove_chunk_sources))
+
+        self.assertEqual({key: counts[key] for key in ("created", "updated", "unchanged", "failed")},
+                         {"created": 1, "updated": 1, "unchanged": 2, "failed": 0})
+        self.assertEqual(counts["text_chars"], len("new text") + len("brand new"))
+        # Only the text is stored, no PDF is rendered at ingestion time
+        self.assertEqual([c.kwargs["ContentType"] for c in mock_s3.put_object.call_args_list], ["text/plain; charset=utf-8"] * 2)
+        mock_s3.delete_objects.assert_called_once()
+        self.assertEqual(mock_s3.delete_objects.call_args.kwargs["Delete"]["Objects"], [{"Key": "acc/changed_old.pdf"}])
+        # The changed page's old chunks cite its previous file name
+        self.assertEqual(removed_chunk_sources, ["acc/changed_old.pdf", "changed_old.pdf"])
+
+        files = {f.source_url: f for f in self.session.exec(select(SourceFile)).all()}
+        self.assertEqual(files["https://site.com/same"].source_etag, '"v2"')
+        self.assertTrue(files["https://site.com/same"].already_processed_to_source_data)
+        self.assertFalse(files["https://site.com/changed"].already_processed_to_source_data)
+        self.assertNotEqual(files["https://site.com/changed"].file_name, "changed_old.pdf")
+        self.assertEqual(files["https://site.com/new"].processing_status, "COMPLETED")
+        self.assertTrue(files["https://site.com/new"].text_file_name.endswith(".txt"))
+
+    def test_objects_shared_with_a_deduplicated_upload_are_kept(self):
+        """
+        Test a changed page keeps its old text, PDF and chunks while an upload deduplicated against it still uses them
+        """
+        self.session.add_all([
+            SourceFile(file_name="page_old.pdf", text_file_name="page_old.txt", file_path="p", account_unique_id="acc",
+                       source_url="https://site.com/page", content_hash="old", already_processed_to_source_data=True),
+            # Upload deduplicated against the crawled page, it points at the same objects
+            SourceFile(file_name="page_old.pdf", text_file_name="page_old.txt", file_path="p", account_unique_id="acc",
+                       content_hash="old", already_processed_to_source_data=True),
+        ])
+        self.session.commit()
+        removed_chunk_sources = []
+
+        async def remove_chunk_sources(chunk_sources):
+            removed_chunk_sources.extend(chunk_sources)
+
+        with patch("file_management.utils.s3", MagicMock()) as mock_s3:
+            counts = asyncio.run(ingest_crawled_pages([self.fetched("https://site.com/page", "new text")], "acc", 1,
+                                                      self.session, remove_chunk_sources))
+
+        self.assertEqual(counts["updated"], 1)
+        mock_s3.delete_objects.assert_not_called()
+        mock_s3.delete_object.assert_not_called()
+        self.assertEqual(removed_chunk_sources, [])
+        duplicate = self.session.exec(select(SourceFile).where(SourceFile.source_url.is_(None))).one()
+        self.assertEqual((duplicate.file_name, duplicate.text_file_name), ("page_old.pdf", "page_old.txt"))
@@ -0,0 +1,236 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from io import BytesIO
+from unittest.mock import ANY, AsyncMock, patch
+from fastapi import HTTPException
+from datetime import datetime, timezone
+from file_management.models import SourceFile
+from file_management.test.db_test_case import DBTestCase
+from file_management.utils import parse_range_header, build_s3_object_headers, iter_s3_body, etag_matches, \
+    resolve_byte_range, iter_file_range, generate_presigned_source_urls, render_text_source_pdf, prepare_for_s3_upload
+from file_management.file_cache import DiskLRUCache
+
+
+class FakeStreamingBody:
+    """
+    Minimal stand-in for botocore's StreamingBody
+    """
+    def __init__(self, content: bytes):
+        self.content = content
+        self.closed = False
+
+    def iter_chunks(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class TestFileView(unittest.TestCase):
+    """
+    Tests for streaming source documents from S3
+    """
+
+    def test_parse_range_header_accepts_single_ranges(self):
+        """
+        Test the supported Range forms
+        """
+        self.assertEqual(parse_range_header("bytes=0-99"), "bytes=0-99")
+        self.assertEqual(parse_range_header("bytes=100-"), "bytes=100-")
+        self.assertEqual(parse_range_header("bytes=-500"), "bytes=-500")
+
+    def test_parse_range_header_ignores_unsupported_ranges(self):
+        """
+        Test malformed and multi-range headers fall back to the full object
+        """
+        self.assertIsNone(parse_range_header(None))
+        self.assertIsNone(parse_range_header("bytes=0-10,20-30"))
+        self.assertIsNone(parse_range_header("bytes=50-10"))
+        self.assertIsNone(parse_range_header("items=0-10"))
+
+    def test_build_s3_object_headers_forwards_validators(self):
+        """
+        Test ETag, Last-Modified and Content-Range are forwarded
+        """
+        s3_object = {
+            "ContentLength": 100,
+            "ContentRange": "bytes 0-99/1000",
+            "ETag": '"abc123"',
+            "LastModified": datetime(2025, 7, 1, 12, 0, tzinfo=timezone.utc),
+        }
+        headers = build_s3_object_headers(s3_object, "report.pdf", "application/pdf")
+        self.assertEqual(headers["Content-Range"], "bytes 0-99/1000")
+        self.assertEqual(headers["ETag"], '"abc123"')
+        self.assertEqual(headers["Last-Modified"], "Tue, 01 Jul 2025 12:00:00 GMT")
+        self.assertEqual(headers["Accept-Ranges"], "bytes")
+
+    def test_iter_s3_body_streams_chunks_and_closes(self):
+        """
+        Test the body is streamed in chunks and released afterwards
+        """
+        body = FakeStreamingBody(b"a" * 10)
+        self.assertEqual(list(iter_s3_body(body, chunk_size=4)), [b"aaaa", b"aaaa", b"aa"])
+        self.assertTrue(body.closed)
+
+    def test_etag_matches_uses_weak_comparison(self):
+        """
+        Test If-None-Match lists, wildcards and weak validators
+        """
+        self.assertTrue(etag_matches('"abc123"', '"abc123"'))
+        self.assertTrue(etag_matches('W/"abc123", "other"', '"abc123"'))
+        self.assertTrue(etag_matches('*', '"abc123"'))
+        self.assertFalse(etag_matches('"other"', '"abc123"'))
+        self.assertFalse(etag_matches(None, '"abc123"'))
+
+    def test_resolve_byte_range(self):
+        """
+        Test ranges are resolved against the object size
+        """
+        self.assertIsNone(resolve_byte_range(None, 100))
+        self.assertEqual(resolve_byte_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(resolve_byte_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(resolve_byte_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(resolve_byte_range("bytes=50-500", 100), (50, 99))
+        with self.assertRaises(ValueError):
+            resolve_byte_range("bytes=100-", 100)
+
+
+class TestFileViewCache(unittest.TestCase):
+    """
+    Tests for the local disk cache of viewed source documents
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = DiskLRUCache(self.temp_dir.name, max_bytes=20, max_object_bytes=15)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def store(self, key: str, content: bytes):
+        writer = self.cache.open_writer(key, {"etag": '"e"', "last_modified": None,
+                                              "content_type": "application/pdf", "size": len(content)})
+        writer.write(content)
+        writer.commit()
+
+    def test_streamed_body_is_cached_and_served_by_range(self):
+        """
+        Test a fully streamed S3 body is cached and can be read back in ranges
+        """
+        writer = self.cache.open_writer("acc/doc.pdf", {"etag": '"e"', "last_modified": None,
+                                                        "content_type": "application/pdf", "size": 10})
+        list(iter_s3_body(FakeStreamingBody(b"0123456789"), chunk_size=4, cache_writer=writer))
+
+        cached_file = self.cache.get("acc/doc.pdf")
+        self.assertEqual(cached_file["etag"], '"e"')
+        self.assertEqual(b"".join(iter_file_range(cached_file["path"], (2, 5), chunk_size=3)), b"2345")
+
+    def test_interrupted_stream_is_not_cached(self):
+        """
+        Test a body the client stopped reading is discarded
+        """
+        writer = self.cache.open_writer("acc/doc.pdf", {"etag": '"e"', "last_modified": None,
+                                                        "content_type": "application/pdf", "size": 10})
+        body_iterator = iter_s3_body(FakeStreamingBody(b"0123456789"), chunk_size=4, cache_writer=writer)
+        next(body_iterator)
+        body_iterator.close()
+
+        self.assertIsNone(self.cache.get("acc/doc.pdf"))
+        self.assertEqual([name for name in os.listdir(self.temp_dir.name) if name.endswith('.tmp')], [])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """
+        Test the size cap evicts the least recently read entry and survives a restart
+        """
+        self.store("acc/a.pdf", b"a" * 8)
+        self.store("acc/b.pdf", b"b" * 8)
+        self.cache.get("acc/a.pdf")
+        self.store("acc/c.pdf", b"c" * 8)
+
+        self.assertIsNotNone(self.cache.get("acc/a.pdf"))
+        self.assertIsNone(self.cache.get("acc/b.pdf"))
+        self.assertFalse(self.cache.can_store(16))
+
+        reloaded_cache = DiskLRUCache(self.temp_dir.name, max_bytes=20, max_object_bytes=15)
+        self.assertIsNotNone(reloaded_cache.get("acc/c.pdf"))
+
+
+class TestPresignedSourceUrls(unittest.TestCase):
+    """
+    Tests for presigned GET links returned with query sources
+    """
+
+    def test_only_account_sources_are_signed_once(self):
+        """
+        Test sources are de-duplicated and keys outside the account prefix are skipped
+        """
+        with patch("file_management.utils.s3") as mock_s3:
+            mock_s3.generate_presigned_url.side_effect = lambda method, Params, ExpiresIn: f"https://signed/{Params['Key']}"
+            source_urls = generate_presigned_source_urls(
+                ["acc/a.pdf", "acc/a.pdf", "other/b.pdf", "acc/../other/c.pdf", None], "acc")
+
+        self.assertEqual(source_urls, {"acc/a.pdf": "https://signed/acc/a.pdf"})
+        params = mock_s3.generate_presigned_url.call_args.kwargs["Params"]
+        self.assertEqual(params["ResponseContentDisposition"], 'inline; filename="a.pdf"')
+
+    def test_bare_excel_sources_are_signed_in_the_account_prefix(self):
+        """
+        Test Excel row sources, a bare file name, are signed under the account prefix and keyed as returned
+        """
+        with patch("file_management.utils.s3") as mock_s3:
+            mock_s3.generate_presigned_url.side_effect = lambda method, Params, ExpiresIn: f"https://signed/{Params['Key']}"
+            source_urls = generate_presigned_source_urls(["orders.pdf", "acc/a.pdf", ""], "acc")
+
+        self.assertEqual(source_urls, {"orders.pdf": "https://signed/acc/orders.pdf", "acc/a.pdf": "https://signed/acc/a.pdf"})
+
+
+class TestTextSourcePdfRendering(DBTestCase):
+    """
+    Tests for rendering the PDF of a text-native source on first view
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.session.add(SourceFile(file_name="page_1.pdf", text_file_name="page_1.txt", file_path="p", account_unique_id="acc"))
+        self.session.add(SourceFile(file_name="upload.pdf", file_path="p", account_unique_id="acc"))
+        self.session.commit()
+
+    def test_pdf_is_rendered_from_stored_text(self):
+        """
+        Test the stored text is converted and uploaded under the PDF key
+        """
+        with patch("file_management.utils.s3") as mock_s3, \
+                patch("file_management.utils.get_pdf_conversion_service") as mock_service:
+            mock_s3.get_object.return_value = {"Body": BytesIO("page text".encode('utf-8'))}
+            mock_service.return_value.convert_text_to_pdf = AsyncMock(return_value=b"%PDF")
+            rendered = asyncio.run(render_text_source_pdf("acc", "page_1.pdf", self.session))
+
+        self.assertTrue(rendered)
+        mock_s3.get_object.assert_called_once_with(Bucket=ANY, Key="acc/page_1.txt")
+        mock_service.return_value.convert_text_to_pdf.assert_awaited_once_with("page text")
+        self.assertEqual(mock_s3.put_object.call_args.kwargs["Key"], "acc/page_1.pdf")
+
+    def test_other_files_are_not_rendered(self):
+        """
+        Test uploaded files and other accounts' files are left alone
+        """
+        with patch("file_management.utils.s3") as mock_s3:
+            self.assertFalse(asyncio.run(render_text_source_pdf("acc", "upload.pdf", self.session)))
+            self.assertFalse(asyncio.run(render_text_source_pdf("other", "page_1.pdf", self.session)))
+        mock_s3.get_object.assert_not_called()
+
+    def test_failed_db_write_removes_the_text_and_fails(self):
+        """
+        Test a text source whose DB record can't be saved is deleted from S3 and the request fails
+        """
+        with patch("file_management.utils.s3") as mock_s3, \
+                patch.object(self.session, "commit", side_effect=RuntimeError("db down")):
+            with self.assertRaises(HTTPException) as raised:
+                asyncio.run(prepare_for_s3_upload("page text", "Page", "acc", 1, self.session))
+
+        self.assertEqual(raised.exception.status_code, 500)
+        text_s3_key = mock_s3.put_object.call_args.kwargs["Key"]
+        mock_s3.delete_object.assert_called_once_with(Bucket=ANY, Key=text_s3_key)
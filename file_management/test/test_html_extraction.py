@@ -0,0 +1,49 @@
+import unittest
+from file_management.html_extraction import extract_main_content, estimate_chunk_count
+
+
+PAGE = """<html><head><title>Pricing | Acme</title><script>var tracking = 1;</script></head><body>
+<header class="site-header"><a href="/">Acme</a><nav><a href="/">Home</a><a href="/about">About</a></nav></header>
+<div class="cookie-banner">We use cookies to improve your experience. Accept all?</div>
+<main><article><header><h1>Pricing</h1></header><p>Our plans start at $10 per month.</p>
+<div class="share-buttons">Share on social media</div></article></main>
+<aside>Related links</aside>
+<footer class="site-footer">Copyright Acme. Privacy. Terms.</footer></body></html>"""
+
+
+class TestHTMLExtraction(unittest.TestCase):
+    """
+    Tests for main-content extraction of ingested web pages
+    """
+
+    def test_site_chrome_is_dropped(self):
+        """
+        Test navigation, banners, footers and scripts are removed and the article kept
+        """
+        extracted = extract_main_content(PAGE)
+        self.assertEqual(extracted["title"], "Pricing | Acme")
+        self.assertEqual(extracted["text"], "Pricing\nOur plans start at $10 per month.")
+        self.assertLess(extracted["stats"]["text_chars"], extracted["stats"]["full_page_chars"])
+
+    def test_class_names_match_whole_tokens(self):
+        """
+        Test boilerplate class names don't match inside longer words
+        """
+        extracted = extract_main_content('<body><div class="canvas-panel"><p>Kept</p></div><div class="nav-links">Dropped</div></body>')
+        self.assertEqual(extracted["text"], "Kept")
+
+    def test_falls_back_to_page_text(self):
+        """
+        Test a page made only of boilerplate-looking markup still yields its text
+        """
+        extracted = extract_main_content('<body><div class="modal"><p>Only content</p></div></body>')
+        self.assertEqual(extracted["text"], "Only content")
+
+    def test_estimate_chunk_count_matches_splitter(self):
+        """
+        Test the estimate follows the 1000 character / 200 overlap splitter
+        """
+        self.assertEqual(estimate_chunk_count(0), 0)
+        self.assertEqual(estimate_chunk_count(1000), 1)
+        self.assertEqual(estimate_chunk_count(1800), 2)
+        self.assertEqual(estimate_chunk_count(1801), 3)
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from file_management.models import SourceFile, IngestionJob, IngestionEvent
+from file_management.test.db_test_case import DBTestCase
+from sqlmodel import select
+from file_management.utils import get_or_create_ingestion_job, record_ingestion_batch, update_ingestion_job, \
+    create_pending_files_in_db, record_ingestion_stages, get_ingestion_job_progress, get_time_to_searchable_metrics
+
+
+class TestIngestionJobs(DBTestCase):
+    """
+    Tests for queued ingestion jobs and their batched status updates
+    """
+
+    def test_active_job_is_reused(self):
+        """
+        Test a second request while a job is queued returns the same job
+        """
+        first_job, first_created = get_or_create_ingestion_job("acc", False, self.session)
+        second_job, second_created = get_or_create_ingestion_job("acc", False, self.session)
+        other_job, other_created = get_or_create_ingestion_job("other", True, self.session)
+        replace_job, replace_created = get_or_create_ingestion_job("other", False, self.session)
+
+        self.assertTrue(first_created)
+        self.assertFalse(second_created)
+        self.assertEqual(second_job.id, first_job.id)
+        self.assertTrue(other_created)
+        # A replace job covers a plain request
+        self.assertFalse(replace_created)
+        self.assertEqual(replace_job.id, other_job.id)
+
+    def test_replace_conflicts_with_active_plain_job(self):
+        """
+        Test a replace request isn't silently answered with a job that won't replace the index
+        """
+        job, _ = get_or_create_ingestion_job("acc", False, self.session)
+        with self.assertRaises(HTTPException) as raised:
+            get_or_create_ingestion_job("acc", True, self.session)
+        self.assertEqual(raised.exception.status_code, 409)
+        self.assertEqual(raised.exception.detail["job_id"], job.id)
+
+    def test_finished_or_stale_jobs_do_not_block(self):
+        """
+        Test completed jobs and jobs lost to a restart don't block a new one
+        """
+        job, _ = get_or_create_ingestion_job("acc", False, self.session)
+        update_ingestion_job(job.id, self.session, status="COMPLETED")
+        self.assertTrue(get_or_create_ingestion_job("acc", False, self.session)[1])
+
+        self.session.add(IngestionJob(account_unique_id="stale", status="RUNNING",
+                                      created_at=datetime.now(timezone.utc) - timedelta(days=1)))
+        self.session.commit()
+        self.assertTrue(get_or_create_ingestion_job("stale", False, self.session)[1])
+
+    def test_record_ingestion_batch(self):
+        """
+        Test dispatched files are flagged and the job counters accumulate across batches
+        """
+        files = [SourceFile(file_name=f"{index}.pdf", file_path="p", account_unique_id="acc") for index in range(3)]
+        self.session.add_all(files)
+        self.session.commit()
+        job, _ = get_or_create_ingestion_job("acc", False, self.session)
+
+        record_ingestion_batch(job.id, [files[0].id, files[1].id], 0, self.session)
+        record_ingestion_batch(job.id, [], 1, self.session)
+
+        self.session.expire_all()
+        job = self.session.get(IngestionJob, job.id)
+        self.assertEqual((job.dispatched_files, job.failed_files), (2, 1))
+        flags = {f.file_name: f.already_processed_to_source_data for f in self.session.exec(select(SourceFile)).all()}
+        self.assertEqual(flags, {"0.pdf": True, "1.pdf": True, "2.pdf": False})
+
+
+class TestIngestionEvents(DBTestCase):
+    """
+    Tests for per-file ingestion stage tracking and time to searchable metrics
+    """
+
+    def test_stages_are_recorded_against_the_open_event(self):
+        """
+        Test an upload's event moves through the stages and is linked to the job that indexes it
+        """
+        file_ids = [created["db_file_id"] for created in create_pending_files_in_db(["a.docx", "b.docx"], "acc", None, self.session)]
+        now = datetime.now(timezone.utc)
+        record_ingestion_stages(file_ids, self.session, stages={"staged": now},
+                                counts={file_ids[0]: {"original_bytes": 100}, file_ids[1]: {"original_bytes": 200}})
+        record_ingestion_stages([file_ids[0]], self.session, stages={"converted": now})
+        record_ingestion_stages([file_ids[1]], self.session, error="conversion failed")
+
+        job, _ = get_or_create_ingestion_job("acc", False, self.session)
+        record_ingestion_batch(job.id, [file_ids[0]], 0, self.session)
+        record_ingestion_stages([file_ids[0]], self.session,
+                                stages={"parsed": now, "chunked": now, "embedded": now, "indexed": now},
+                                counts={file_ids[0]: {"chunk_count": 4, "embedded_chunk_count": 3, "text_bytes": 900,
+                                                     "embedding_cache_hits": 2}})
+
+        events = {event.source_file_id: event for event in self.session.exec(select(IngestionEvent)).all()}
+        self.assertEqual(len(events), 2)
+        self.assertEqual((events[file_ids[0]].status, events[file_ids[0]].original_bytes), ("INDEXED", 100))
+        self.assertEqual((events[file_ids[1]].status, events[file_ids[1]].error), ("FAILED", "conversion failed"))
+
+        progress = get_ingestion_job_progress(job.id, self.session)
+        self.assertEqual(progress["files"], 1)
+        self.assertEqual(progress["stages"]["indexed"], 1)
+        self.assertEqual((progress["chunk_count"], progress["embedded_chunk_count"]), (4, 3))
+        self.assertEqual(progress["embedding_cache_hit_rate"], 0.6667)
+
+        # A later re-index of a finished file opens a new event
+        record_ingestion_stages([file_ids[0]], self.session, stages={"parsed": now})
+        self.assertEqual(len(self.session.exec(select(IngestionEvent).where(IngestionEvent.source_file_id == file_ids[0])).all()), 2)
+
+        with self.assertRaises(ValueError):
+            record_ingestion_stages(file_ids, self.session, stages={"unknown": now})
+
+    def test_time_to_searchable_percentiles(self):
+        """
+        Test percentiles are computed over recently indexed uploads only
+        """
+        now = datetime.now(timezone.utc)
+        for seconds in range(1, 11):
+            self.session.add(IngestionEvent(account_unique_id="acc", uploaded_at=now - timedelta(seconds=seconds),
+                                            converted_at=now - timedelta(seconds=seconds / 2), indexed_at=now))
+        # Re-index without an upload time, and an upload indexed too long ago
+        self.session.add(IngestionEvent(account_unique_id="acc", indexed_at=now))
+        self.session.add(IngestionEvent(account_unique_id="acc", uploaded_at=now - timedelta(days=3, seconds=60),
+                                        indexed_at=now - timedelta(days=3)))
+        self.session.commit()
+
+        metrics = get_time_to_searchable_metrics(self.session, "acc", hours=24)
+        time_to_searchable = metrics["time_to_searchable_seconds"]
+        self.assertEqual(time_to_searchable["count"], 10)
+        self.assertAlmostEqual(time_to_searchable["p50"], 5)
+        self.assertAlmostEqual(time_to_searchable["p90"], 9)
+        self.assertAlmostEqual(time_to_searchable["p99"], 10)
+        self.assertEqual(metrics["stage_seconds"]["uploaded_to_staged"]["count"], 0)
+        self.assertEqual(get_time_to_searchable_metrics(self.session, "other")["time_to_searchable_seconds"]["count"], 0)
@@ -0,0 +1,78 @@
+import sys
+import types
+import pickle
+import unittest
+import asyncio
+import time
+from unittest.mock import patch
+from fastapi import HTTPException
+from pdf_conversion_service import PDFConversionService, render_text_to_pdf
+
+
+def raise_http_exception():
+    """Raises in the worker an exception the parent can't unpickle"""
+    raise HTTPException(status_code=500, detail="render failed")
+
+
+class TestPDFConversionService(unittest.TestCase):
+    """
+    Tests for the process pool used to render PDFs off the event loop
+    """
+
+    def setUp(self):
+        self.service = PDFConversionService(max_workers=1, max_queue=1, queue_timeout=0.2, timeout=5)
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_runs_in_worker_process(self):
+        """
+        Test a function runs in the pool and its result is returned
+        """
+        self.assertEqual(asyncio.run(self.service.run(pow, 2, 10)), 1024)
+
+    def test_slow_conversion_times_out(self):
+        """
+        Test a conversion exceeding the timeout is answered with a 504
+        """
+        self.service.timeout = 0.2
+        with self.assertRaises(HTTPException) as context:
+            asyncio.run(self.service.run(time.sleep, 2))
+        self.assertEqual(context.exception.status_code, 504)
+
+    def test_full_queue_is_rejected(self):
+        """
+        Test callers beyond the queue bound get a 503 instead of piling up
+        """
+        async def run_two():
+            first = asyncio.create_task(self.service.run(time.sleep, 1))
+            await asyncio.sleep(0)
+            try:
+                await self.service.run(pow, 2, 2)
+            finally:
+                await first
+
+        with self.assertRaises(HTTPException) as context:
+            asyncio.run(run_two())
+        self.assertEqual(context.exception.status_code, 503)
+
+    def test_broken_pool_is_replaced(self):
+        """
+        Test a worker error that breaks the pool is answered with a 500 and the next conversion gets a fresh pool
+        """
+        with self.assertRaises(HTTPException) as context:
+            asyncio.run(self.service.run(raise_http_exception))
+        self.assertEqual(context.exception.status_code, 500)
+        self.assertEqual(asyncio.run(self.service.run(pow, 2, 3)), 8)
+
+    def test_render_failure_is_picklable(self):
+        """
+        Test a failed render reaches the parent as a picklable RuntimeError instead of an HTTPException
+        """
+        def convert_text_to_pdf(text_content):
+            raise HTTPException(status_code=500, detail="Failed to convert text to PDF: bad page")
+
+        with patch.dict(sys.modules, {"convert_to_pdf": types.SimpleNamespace(convert_text_to_pdf=convert_text_to_pdf)}):
+            with self.assertRaises(RuntimeError) as context:
+                render_text_to_pdf("text")
+        self.assertIn("bad page", str(pickle.loads(pickle.dumps(context.exception))))
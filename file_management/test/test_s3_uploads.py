@@ -0,0 +1,177 @@
+import unittest
+import asyncio
+import hashlib
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+from starlette.datastructures import UploadFile
+from file_management.models import SourceFile
+from file_management.test.db_test_case import DBTestCase
+from file_management.utils import stream_upload_to_s3, generate_presigned_upload, is_staging_s3_key_for_account, \
+    PRESIGNED_MULTIPART_THRESHOLD, create_pending_files_in_db, update_files_processing_status, \
+    apply_content_hash_deduplication, is_s3_object_shared
+
+
+class TestStreamUploadToS3(unittest.TestCase):
+    """
+    Tests for streaming uploads into S3
+    """
+
+    def _create_upload_file(self, content: bytes):
+        """
+        Create an UploadFile backed by an in-memory buffer
+        """
+        return UploadFile(filename="report.pdf", file=BytesIO(content))
+
+    def test_small_file_uses_single_put_object(self):
+        """
+        Test a file smaller than one part is sent with put_object
+        """
+        content = b"small file content"
+        with patch("file_management.utils.s3", MagicMock()) as mock_s3:
+            result = asyncio.run(stream_upload_to_s3(self._create_upload_file(content), "acc/raw/report.pdf", bucket="bucket", part_size=1024))
+
+        mock_s3.put_object.assert_called_once()
+        mock_s3.create_multipart_upload.assert_not_called()
+        self.assertEqual(result["size"], len(content))
+        self.assertEqual(result["content_hash"], hashlib.sha256(content).hexdigest())
+
+    def test_large_file_is_uploaded_in_parts(self):
+        """
+        Test a file larger than one part uses a multipart upload
+        """
+        content = b"x" * 2500
+        mock_s3 = MagicMock()
+        mock_s3.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        mock_s3.upload_part.side_effect = lambda **kwargs: {"ETag": f"etag-{kwargs['PartNumber']}"}
+        with patch("file_management.utils.s3", mock_s3):
+            result = asyncio.run(stream_upload_to_s3(self._create_upload_file(content), "acc/raw/report.pdf", bucket="bucket", part_size=1024))
+
+        self.assertEqual(mock_s3.upload_part.call_count, 3)
+        parts = mock_s3.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+        self.assertEqual([part["PartNumber"] for part in parts], [1, 2, 3])
+        self.assertEqual(result["size"], len(content))
+        self.assertEqual(result["content_hash"], hashlib.sha256(content).hexdigest())
+
+    def test_failed_part_aborts_multipart_upload(self):
+        """
+        Test a failure mid-upload aborts the multipart upload
+        """
+        mock_s3 = MagicMock()
+        mock_s3.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        mock_s3.upload_part.side_effect = RuntimeError("network down")
+        with patch("file_management.utils.s3", mock_s3):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(stream_upload_to_s3(self._create_upload_file(b"y" * 2048), "acc/raw/report.pdf", bucket="bucket", part_size=1024))
+
+        mock_s3.abort_multipart_upload.assert_called_once()
+
+
+class TestPresignedUploads(unittest.TestCase):
+    """
+    Tests for the direct-to-S3 presigned upload helpers
+    """
+
+    def test_small_file_gets_single_presigned_put(self):
+        """
+        Test a small file is presigned as a single PUT
+        """
+        mock_s3 = MagicMock()
+        mock_s3.generate_presigned_url.return_value = "https://example.com/put"
+        with patch("file_management.utils.s3", mock_s3):
+            presigned_upload = generate_presigned_upload("acc/raw/abc-report.pdf", 1024, "application/pdf", bucket="bucket")
+
+        self.assertEqual(presigned_upload["upload_method"], "PUT")
+        self.assertEqual(presigned_upload["upload_url"], "https://example.com/put")
+        mock_s3.create_multipart_upload.assert_not_called()
+
+    def test_large_file_gets_presigned_parts(self):
+        """
+        Test a file over the threshold is presigned as a multipart upload
+        """
+        mock_s3 = MagicMock()
+        mock_s3.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        mock_s3.generate_presigned_url.return_value = "https://example.com/part"
+        size = PRESIGNED_MULTIPART_THRESHOLD + 1
+        with patch("file_management.utils.s3", mock_s3):
+            presigned_upload = generate_presigned_upload("acc/raw/abc-report.pdf", size, bucket="bucket")
+
+        self.assertEqual(presigned_upload["upload_method"], "MULTIPART")
+        self.assertEqual(presigned_upload["upload_id"], "upload-1")
+        self.assertGreaterEqual(len(presigned_upload["part_urls"]) * presigned_upload["part_size"], size)
+
+    def test_staging_key_must_belong_to_account(self):
+        """
+        Test staging keys issued for another account are rejected
+        """
+        self.assertTrue(is_staging_s3_key_for_account("acc/raw/abc-report.pdf", "acc", "report.pdf"))
+        self.assertFalse(is_staging_s3_key_for_account("other/raw/abc-report.pdf", "acc", "report.pdf"))
+        self.assertFalse(is_staging_s3_key_for_account("acc/raw/../abc-report.pdf", "acc", "report.pdf"))
+
+
+class TestBatchedUploadRecords(DBTestCase):
+    """
+    Tests for the batched SourceFile writes used by multi-file uploads
+    """
+
+    def test_create_pending_files_in_db_returns_ids_in_order(self):
+        """
+        Test all pending rows are created and returned in upload order
+        """
+        pending_files = create_pending_files_in_db(["a.pdf", "b.docx", "c.xlsx"], "acc", 1, self.session)
+        self.assertEqual([pending_file["original_filename"] for pending_file in pending_files], ["a.pdf", "b.docx", "c.xlsx"])
+        self.assertTrue(all(isinstance(pending_file["db_file_id"], int) for pending_file in pending_files))
+
+    def test_update_files_processing_status_updates_only_given_files(self):
+        """
+        Test the batched status update
+        """
+        pending_files = create_pending_files_in_db(["a.pdf", "b.pdf"], "acc", 1, self.session)
+        update_files_processing_status([pending_files[0]["db_file_id"]], "FAILED", self.session, processing_error="boom")
+        first = self.session.get(SourceFile, pending_files[0]["db_file_id"])
+        second = self.session.get(SourceFile, pending_files[1]["db_file_id"])
+        self.assertEqual((first.processing_status, first.processing_error), ("FAILED", "boom"))
+        self.assertEqual(second.processing_status, "PENDING")
+
+    def test_apply_content_hash_deduplication_reuses_completed_file(self):
+        """
+        Test an upload with known bytes is linked to the existing converted file
+        """
+        existing = SourceFile(file_name="report_abc.pdf", file_path="https://bucket/acc/report_abc.pdf", original_filename="report.pdf",
+                              processing_status="COMPLETED", account_unique_id="acc", content_hash="hash-1",
+                              already_processed_to_source_data=True)
+        self.session.add(existing)
+        self.session.commit()
+        pending_files = create_pending_files_in_db(["report-copy.pdf", "new.pdf"], "acc", 2, self.session)
+        staged_files = [
+            {**pending_files[0], "status": "STAGED", "content_hash": "hash-1"},
+            {**pending_files[1], "status": "STAGED", "content_hash": "hash-2"},
+        ]
+
+        staged_files = apply_content_hash_deduplication(staged_files, "acc", self.session)
+
+        self.assertEqual([staged_file["status"] for staged_file in staged_files], ["DEDUPLICATED", "STAGED"])
+        duplicate = self.session.get(SourceFile, pending_files[0]["db_file_id"])
+        self.assertEqual(duplicate.file_name, "report_abc.pdf")
+        self.assertEqual(duplicate.processing_status, "COMPLETED")
+        self.assertTrue(duplicate.already_processed_to_source_data)
+        self.assertTrue(staged_files[0]["duplicate_indexed"])
+        self.assertTrue(is_s3_object_shared(duplicate, self.session))
+        self.assertEqual(self.session.get(SourceFile, pending_files[1]["db_file_id"]).content_hash, "hash-2")
+
+    def test_duplicate_of_unindexed_file_waits_for_ingestion(self):
+        """
+        Test a duplicate of a converted but not yet indexed file is left for the next ingestion job
+        """
+        self.session.add(SourceFile(file_name="report_abc.pdf", file_path="p", processing_status="COMPLETED",
+                                    account_unique_id="acc", content_hash="hash-1", already_processed_to_source_data=False))
+        self.session.commit()
+        pending_files = create_pending_files_in_db(["report-copy.pdf"], "acc", 2, self.session)
+
+        staged_files = apply_content_hash_deduplication([{**pending_files[0], "status": "STAGED", "content_hash": "hash-1"}],
+                                                        "acc", self.session)
+
+        self.assertEqual(staged_files[0]["status"], "DEDUPLICATED")
+        self.assertFalse(staged_files[0]["duplicate_indexed"])
+        duplicate = self.session.get(SourceFile, pending_files[0]["db_file_id"])
+        self.assertEqual((duplicate.file_name, duplicate.processing_status), ("report_abc.pdf", "COMPLETED"))
+        self.assertFalse(duplicate.already_processed_to_source_data)
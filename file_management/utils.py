@@ -1,18 +1,27 @@
 import os
+import math
+import asyncio
+import hashlib
 import boto3
 import tempfile
 from botocore.exceptions import ClientError
 import logging
-import convert_to_pdf
-from sqlmodel import Session, func
+from pdf_conversion_service import get_pdf_conversion_service
+from sqlmodel import Session, func, update, delete
 from sqlmodel.sql.expression import select
-from file_management.models import SourceFile, Folder
+from file_management.models import SourceFile, Folder, IngestionJob, IngestionEvent
+from file_management.file_cache import file_view_cache
+from file_management.crawler import get_http_client, crawl_site
+from file_management.html_extraction import extract_main_content
 from secrets import token_hex
-from fastapi import HTTPException, Request
+from fastapi import HTTPException, Request, UploadFile
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+import re
+from typing import Awaitable, Callable, Optional
+from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime
 import httpx
-from bs4 import BeautifulSoup
 
 
 # Initialize the S3 client
@@ -20,6 +29,39 @@ s3 = boto3.client('s3')
 
 # The name of your S3 bucket
 BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
+
+# Uploads are streamed to S3 in parts of this size (S3 requires at least 5 MB for all but the last part)
+S3_UPLOAD_PART_SIZE = max(int(os.environ.get('S3_UPLOAD_PART_SIZE', 8 * 1024 * 1024)), 5 * 1024 * 1024)
+
+# Direct-to-S3 uploads: presigned URL lifetime and the size above which the client uploads in parts
+PRESIGNED_UPLOAD_EXPIRY_SECONDS = int(os.environ.get('PRESIGNED_UPLOAD_EXPIRY_SECONDS', 3600))
+PRESIGNED_MULTIPART_THRESHOLD = int(os.environ.get('PRESIGNED_MULTIPART_THRESHOLD', 100 * 1024 * 1024))
+
+# Presigned GET links for the sources returned with query answers, off unless enabled or requested
+PRESIGN_QUERY_SOURCES = os.environ.get('PRESIGN_QUERY_SOURCES', 'false').lower() in ('1', 'true', 'yes')
+PRESIGNED_SOURCE_EXPIRY_SECONDS = int(os.environ.get('PRESIGNED_SOURCE_EXPIRY_SECONDS', 900))
+S3_MAX_PARTS = 10000
+
+# Crawled pages are converted and written to the DB in batches of this size
+CRAWL_INGEST_BATCH_SIZE = int(os.environ.get('CRAWL_INGEST_BATCH_SIZE', 20))
+CRAWL_STORE_CONCURRENCY = int(os.environ.get('CRAWL_STORE_CONCURRENCY', 8))
+# Page counts plus the extraction size of the ingested pages, see extract_main_content
+CRAWL_RESULT_KEYS = ("created", "updated", "unchanged", "failed",
+                     "full_page_chars", "text_chars", "full_page_chunks", "text_chunks")
+
+# A queued or running ingestion job older than this is assumed lost (e.g. the worker restarted)
+INGESTION_JOB_STALE_SECONDS = int(os.environ.get('INGESTION_JOB_STALE_SECONDS', 60 * 60))
+# The stages a file goes through from upload to searchable, in order
+INGESTION_STAGES = ("uploaded", "staged", "converted", "parsed", "chunked", "embedded", "indexed")
+INGESTION_EVENT_COUNTS = ("original_bytes", "converted_bytes", "text_bytes", "chunk_count", "embedded_chunk_count", "chunks_per_second",
+                          "embedding_cache_hits")
+INGESTION_METRIC_PERCENTILES = (50, 90, 95, 99)
+
+# Chunk size used when streaming objects from S3 to the client
+S3_STREAM_CHUNK_SIZE = int(os.environ.get('S3_STREAM_CHUNK_SIZE', 64 * 1024))
+
+# Source document keys carry a random token and are never overwritten, so viewers may cache them
+FILE_VIEW_CACHE_CONTROL = os.environ.get('FILE_VIEW_CACHE_CONTROL', 'private, max-age=86400')
         
 logger = logging.getLogger(__name__)
 
@@ -84,10 +126,9 @@ async def fetch_html_content(url: str):
     """
     print(f"Fetching HTML content from URL: {url}")
     try:
-        # Step 2: Fetch the HTML content
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()  # Raise an error for bad responses
+        # Step 2: Fetch the HTML content over the shared keep-alive client
+        response = await get_http_client().get(url)
+        response.raise_for_status()  # Raise an error for bad responses
         
         return response.text
     
@@ -101,71 +142,118 @@ async def fetch_html_content(url: str):
 async def extract_text_from_html(html_content):
     """
     Extract Text from HTML
+
+    Only the page's main content is kept, see extract_main_content. 'stats' reports
+    the characters and estimated chunks saved compared to indexing the whole page.
     """
-    print("Extracting text from HTML content...")
-    # Step 3: Parse the Text from the HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
-    # Extract the page title
-    title = soup.title.string if soup.title else "No Title Found"
-    text = soup.get_text(separator="\n", strip=True)
-    content = {"title": title, "text": text}
-    return content
+    # Step 3: Parse the main content Text from the HTML, off the event loop
+    return await run_in_threadpool(extract_main_content, html_content)
 
 
-async def prepare_for_s3_upload(extracted_text: str, file_name: str, account_unique_id: str, folder_id: int, session: Session):
+def text_source_file_names(title: str) -> tuple[str, str]:
     """
-    Prepare File for S3 Upload
+    Unique, S3 key safe (pdf_file_name, text_file_name) pair for text-native sources
     """
-    print("Preparing file for S3 upload...")
+    base_name = re.sub(r'[^a-z0-9_-]+', '_', title.lower()).strip('_')[:80] or 'page'
+    base_name = f'{base_name}_{token_hex(8)}'
+    return f'{base_name}.pdf', f'{base_name}.txt'
 
-    # Generate unique file name
-    unique_file_name = f'{file_name}_{token_hex(8)}.pdf'.lower().replace(" ", "_")
-    file_account = account_unique_id
-
-    # Simulate the subfolder by including account_unique_id in the S3 key
-    s3_key = f"{account_unique_id}/{unique_file_name}"
-
-    # Step 2: Convert the extracted text to PDF bytes
-    try:
-        pdf_content_bytes = convert_to_pdf.convert_text_to_pdf(extracted_text)
-    except HTTPException: # Re-raise if convert_text_to_pdf_bytes raised it
-        raise
-    except Exception as e: # Catch any other unexpected errors from conversion
-        print(f"Unexpected error during PDF conversion: {e}")
-        raise HTTPException(status_code=500, detail="Failed to prepare PDF content for upload.")
 
-    # Step 4: Upload PDF file to S3
-    print(f"Uploading to S3. Bucket: {BUCKET_NAME}, Key: {s3_key}, ContentType: application/pdf")
+async def store_text_source(extracted_text: str, title: str, account_unique_id: str) -> dict:
+    """
+    Upload extracted text as the indexing source. The viewable PDF is not rendered
+    here, render_text_source_pdf creates it the first time someone opens the file.
+    """
+    file_name, text_file_name = text_source_file_names(title)
+    text_s3_key = f"{account_unique_id}/{text_file_name}"
     try:
-        s3.put_object(
+        await run_in_threadpool(
+            s3.put_object,
             Bucket=BUCKET_NAME,
-            Key=s3_key,
-            Body=pdf_content_bytes,
-            ContentType="application/pdf" # CRITICAL: Set to PDF
+            Key=text_s3_key,
+            Body=extracted_text.encode('utf-8'),
+            ContentType="text/plain; charset=utf-8"
         )
-    except Exception as e: # Catch Boto3 ClientError or other S3 upload issues
-        print(f"Failed to upload {s3_key} to S3: {e}")
+    except Exception as e:
+        logger.error(f"Failed to upload {text_s3_key} to S3: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to upload file to S3 storage: {e}")
 
-    # Get the S3 file URL
-    file_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    return {
+        "file_name": file_name,
+        "text_file_name": text_file_name,
+        "file_path": f"https://{BUCKET_NAME}.s3.amazonaws.com/{account_unique_id}/{file_name}",
+        "content_hash": hashlib.sha256(extracted_text.encode('utf-8')).hexdigest(),
+    }
+
+
+async def prepare_for_s3_upload(extracted_text: str, file_name: str, account_unique_id: str, folder_id: int, session: Session,
+                                source_url: Optional[str] = None):
+    """
+    Prepare File for S3 Upload
 
-    # Step 6: Save file information to the database
-    # Ensure save_file_to_db stores unique_pdf_file_name
+    The extracted text is stored and indexed as is, skipping the PDF round trip.
+    """
+    text_source = await store_text_source(extracted_text, file_name, account_unique_id)
+    s3_key = f"{account_unique_id}/{text_source['file_name']}"
+
+    # Save file information to the database
     try:
-        db_file = save_file_to_db(unique_file_name, file_url, account_unique_id, folder_id, session)
-        # Make sure this function commits the session or the calling function does.
+        db_file = SourceFile(**text_source,
+                             original_filename=file_name,
+                             source_url=source_url,
+                             account_unique_id=account_unique_id,
+                             folder_id=folder_id,
+                             included_in_source_data=True,
+                             processing_status="COMPLETED")
+        session.add(db_file)
+        session.commit()
     except Exception as e:
-        print(f"Failed to save file metadata for {unique_file_name} to DB: {e}")
-        # CRITICAL: If DB save fails after S3 upload, you have an orphaned S3 object.
-        # Consider deleting the S3 object if DB save fails:
+        session.rollback()
+        logger.error(f"Failed to save file metadata to DB: {e}",
+                     extra={"account_unique_id": account_unique_id, "file_name": text_source['file_name']})
+        # The text object would be orphaned without its DB record, remove it
+        text_s3_key = f"{account_unique_id}/{text_source['text_file_name']}"
         try:
-            s3.delete_object(Bucket=BUCKET_NAME, Key=s3_key)
-            print(f"Rolled back S3 upload for {s3_key} due to DB error.")
+            s3.delete_object(Bucket=BUCKET_NAME, Key=text_s3_key)
         except Exception as s3_del_err:
-            print(f"Failed to rollback S3 upload for {s3_key}: {s3_del_err}")
-            
-    return {"message": "File successfully converted to PDF and uploaded to S3", "file_name_on_s3": unique_file_name, "s3_key": s3_key}
+            logger.error(f"Failed to roll back S3 upload {text_s3_key}: {s3_del_err}")
+        raise HTTPException(status_code=500, detail="Failed to save file metadata")
+
+    return {"message": "Text successfully stored for indexing, the PDF is rendered when first viewed",
+            "file_name_on_s3": text_source['file_name'], "s3_key": s3_key}
+
+
+async def render_text_source_pdf(account_unique_id: str, file_name: str, session: Session) -> bool:
+    """
+    Render and upload the PDF for a text-native source on first view.
+    Returns False when file_name is not a text-native source of the account.
+    """
+    source_file = session.exec(select(SourceFile).where(
+        SourceFile.account_unique_id == account_unique_id,
+        SourceFile.file_name == file_name,
+        SourceFile.text_file_name.is_not(None)
+    )).first()
+    if not source_file:
+        return False
+
+    text_s3_key = f"{account_unique_id}/{source_file.text_file_name}"
+    try:
+        text_object = await run_in_threadpool(s3.get_object, Bucket=BUCKET_NAME, Key=text_s3_key)
+        extracted_text = (await run_in_threadpool(text_object['Body'].read)).decode('utf-8')
+    except ClientError as e:
+        logger.error(f"Unable to read text source {text_s3_key}: {e}")
+        return False
+
+    pdf_content_bytes = await get_pdf_conversion_service().convert_text_to_pdf(extracted_text)
+    await run_in_threadpool(
+        s3.put_object,
+        Bucket=BUCKET_NAME,
+        Key=f"{account_unique_id}/{file_name}",
+        Body=pdf_content_bytes,
+        ContentType="application/pdf"
+    )
+    logger.info("Rendered PDF for text source on first view", extra={"account_unique_id": account_unique_id, "file_name": file_name})
+    return True
 
 
 async def load_documents_from_s3(account_unique_id: str, replace: bool, session: Session):
@@ -187,7 +275,7 @@ async def load_documents_from_s3(account_unique_id: str, replace: bool, session:
         
     result = session.exec(statement)
     documents_from_db = result.all()
-    print("**********documents from s3: ", documents_from_db)
+    logger.debug("Loaded documents to index", extra={"account_unique_id": account_unique_id, "document_count": len(documents_from_db)})
 
     return documents_from_db
             
@@ -203,6 +291,11 @@ async def delete_file_from_s3(account_unique_id: str, file, session: Session):
     
     s3_object_key = f"{file.account_unique_id}/{file.file_name}"
     original_file_name_for_logging = file.file_name # For logging/response
+
+    # Deduplicated uploads share the converted PDF, only delete it once nothing else points at it
+    if is_s3_object_shared(file, session):
+        logger.info(f"Keeping {s3_object_key} in S3, it is still used by another file record")
+        return True
     
     if not s3 or not BUCKET_NAME: # Basic check
         # Log this critical misconfiguration
@@ -211,6 +304,10 @@ async def delete_file_from_s3(account_unique_id: str, file, session: Session):
 
     try:
         s3.delete_object(Bucket=BUCKET_NAME, Key=s3_object_key)
+        if file.text_file_name:
+            s3.delete_object(Bucket=BUCKET_NAME, Key=f"{file.account_unique_id}/{file.text_file_name}")
+        if file_view_cache:
+            file_view_cache.delete(s3_object_key)
         logger.info(f"Successfully deleted {s3_object_key} from bucket {BUCKET_NAME}")
         return True
 
@@ -348,6 +445,892 @@ def create_pending_file_in_db(
         folder_id=folder_id
     )
     session.add(pending_file)
+    session.flush()
+    session.add(IngestionEvent(account_unique_id=account_unique_id, source_file_id=pending_file.id,
+                               uploaded_at=datetime.now(timezone.utc)))
     session.commit()
     session.refresh(pending_file)
     return pending_file
+
+
+def create_pending_files_in_db(
+    original_filenames: list[str],
+    account_unique_id: str,
+    folder_id: int,
+    session: Session
+) -> list[dict]:
+    """
+    Creates pending SourceFile records for a batch of uploads in a single transaction.
+    Returns plain dicts with the new ids, so nothing needs reloading after the commit.
+    """
+    pending_files = [
+        SourceFile(
+            file_name="pending_conversion...",
+            file_path="processing...",
+            original_filename=original_filename,
+            processing_status="PENDING",
+            already_processed_to_source_data=False,
+            account_unique_id=account_unique_id,
+            folder_id=folder_id
+        )
+        for original_filename in original_filenames
+    ]
+    session.add_all(pending_files)
+    session.flush()
+    uploaded_at = datetime.now(timezone.utc)
+    session.add_all([IngestionEvent(account_unique_id=account_unique_id, source_file_id=pending_file.id, uploaded_at=uploaded_at)
+                     for pending_file in pending_files])
+    created_files = [
+        {"db_file_id": pending_file.id, "original_filename": pending_file.original_filename}
+        for pending_file in pending_files
+    ]
+    session.commit()
+    return created_files
+
+
+def update_files_processing_status(file_ids: list[int], processing_status: str, session: Session, processing_error: Optional[str] = None):
+    """
+    Set the processing status of many SourceFile records with one UPDATE
+    """
+    if not file_ids:
+        return
+    values = {"processing_status": processing_status}
+    if processing_error is not None:
+        values["processing_error"] = processing_error
+    session.exec(update(SourceFile).where(SourceFile.id.in_(file_ids)).values(**values))
+    session.commit()
+
+
+def update_files_processed_flag(file_ids: list[int], session: Session):
+    """
+    Flag files as sent to the document processor with one UPDATE
+    """
+    if not file_ids:
+        return
+    session.exec(update(SourceFile).where(SourceFile.id.in_(file_ids)).values(already_processed_to_source_data=True))
+    session.commit()
+
+
+def get_or_create_ingestion_job(account_unique_id: str, replace: bool, session: Session) -> tuple[IngestionJob, bool]:
+    """
+    Queue an ingestion job for the account, or return the one already queued or running.
+    Returns the job and whether it was created by this call. A replace request
+    while a job that doesn't replace is active raises a 409, the running job
+    would not rebuild the index and it can be requested again once it finished.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=INGESTION_JOB_STALE_SECONDS)
+    active_job = session.exec(
+        select(IngestionJob).where(
+            IngestionJob.account_unique_id == account_unique_id,
+            IngestionJob.status.in_(("QUEUED", "RUNNING")),
+            IngestionJob.created_at >= stale_before
+        ).order_by(IngestionJob.id.desc())
+    ).first()
+    if active_job:
+        if replace and not active_job.replace:
+            raise HTTPException(status_code=409, detail={"error": "An ingestion job that doesn't replace the index is in progress",
+                                                         "job_id": active_job.id})
+        return active_job, False
+
+    ingestion_job = IngestionJob(account_unique_id=account_unique_id, replace=replace)
+    session.add(ingestion_job)
+    session.commit()
+    session.refresh(ingestion_job)
+    return ingestion_job, True
+
+
+def update_ingestion_job(job_id: int, session: Session, **values):
+    """
+    Update an ingestion job's status fields
+    """
+    session.exec(update(IngestionJob).where(IngestionJob.id == job_id).values(**values))
+    session.commit()
+
+
+def record_ingestion_batch(job_id: int, dispatched_file_ids: list[int], failed_count: int, session: Session):
+    """
+    Flag a dispatched batch of files as processed, link their ingestion events to the
+    job and add the batch to the job's counters, in one commit
+    """
+    if dispatched_file_ids:
+        session.exec(update(SourceFile).where(SourceFile.id.in_(dispatched_file_ids)).values(already_processed_to_source_data=True))
+        # Link each file's ingestion event to the job, the processor reports the later stages against it
+        get_open_ingestion_events(dispatched_file_ids, session, ingestion_job_id=job_id)
+    session.exec(update(IngestionJob).where(IngestionJob.id == job_id).values(
+        dispatched_files=IngestionJob.dispatched_files + len(dispatched_file_ids),
+        failed_files=IngestionJob.failed_files + failed_count
+    ))
+    session.commit()
+
+
+def get_open_ingestion_events(file_ids: list[int], session: Session, ingestion_job_id: Optional[int] = None) -> dict[int, IngestionEvent]:
+    """
+    The in-progress ingestion event of each file, keyed by file id. Files without
+    one (e.g. being re-indexed after an earlier run finished) get a new event.
+    """
+    file_ids = list(dict.fromkeys(file_ids))
+    if not file_ids:
+        return {}
+    statement = select(IngestionEvent).where(
+        IngestionEvent.source_file_id.in_(file_ids),
+        IngestionEvent.indexed_at.is_(None),
+        IngestionEvent.failed_at.is_(None)
+    ).order_by(IngestionEvent.id)
+    open_events = {event.source_file_id: event for event in session.exec(statement).all()}
+
+    missing_file_ids = [file_id for file_id in file_ids if file_id not in open_events]
+    if missing_file_ids:
+        account_ids = session.exec(select(SourceFile.id, SourceFile.account_unique_id).where(SourceFile.id.in_(missing_file_ids))).all()
+        for file_id, account_unique_id in account_ids:
+            open_events[file_id] = IngestionEvent(account_unique_id=account_unique_id, source_file_id=file_id)
+            session.add(open_events[file_id])
+
+    if ingestion_job_id is not None:
+        for event in open_events.values():
+            event.ingestion_job_id = ingestion_job_id
+    return open_events
+
+
+def record_ingestion_stages(file_ids: list[int], session: Session, stages: Optional[dict[str, datetime]] = None,
+                            ingestion_job_id: Optional[int] = None, error: Optional[str] = None,
+                            counts: Optional[dict[int, dict]] = None):
+    """
+    Record stage timestamps for a batch of files in one commit.
+
+    stages maps stage name to when it was reached, counts maps file id to the
+    byte / chunk counts measured for it. With an error the events are closed as FAILED.
+    """
+    stages = stages or {}
+    unknown_stages = set(stages) - set(INGESTION_STAGES)
+    if unknown_stages:
+        raise ValueError(f"Unknown ingestion stages: {sorted(unknown_stages)}")
+    if not file_ids:
+        return
+
+    events = get_open_ingestion_events(file_ids, session, ingestion_job_id=ingestion_job_id)
+    for file_id, event in events.items():
+        for stage, occurred_at in stages.items():
+            setattr(event, f"{stage}_at", occurred_at)
+        for key, value in ((counts or {}).get(file_id) or {}).items():
+            if key in INGESTION_EVENT_COUNTS and value is not None:
+                setattr(event, key, value)
+        if error:
+            event.status = "FAILED"
+            event.error = error[:1024]
+            event.failed_at = datetime.now(timezone.utc)
+        else:
+            reached_stages = [stage for stage in INGESTION_STAGES if getattr(event, f"{stage}_at") is not None]
+            if reached_stages:
+                event.status = reached_stages[-1].upper()
+        session.add(event)
+    session.commit()
+
+
+def get_ingestion_job_progress(job_id: int, session: Session) -> dict:
+    """
+    Files of an ingestion job that reached each stage, with chunk and byte totals
+    """
+    stage_counts = [func.count(getattr(IngestionEvent, f"{stage}_at")) for stage in INGESTION_STAGES]
+    row = session.exec(
+        select(func.count(IngestionEvent.id), func.count(IngestionEvent.failed_at), *stage_counts,
+               func.coalesce(func.sum(IngestionEvent.chunk_count), 0),
+               func.coalesce(func.sum(IngestionEvent.embedded_chunk_count), 0),
+               func.coalesce(func.sum(IngestionEvent.embedding_cache_hits), 0),
+               func.coalesce(func.sum(IngestionEvent.text_bytes), 0))
+        .where(IngestionEvent.ingestion_job_id == job_id)
+    ).one()
+    total_files, failed_files, *reached, chunk_count, embedded_chunk_count, embedding_cache_hits, text_bytes = row
+    return {
+        "files": total_files,
+        "failed": failed_files,
+        "stages": dict(zip(INGESTION_STAGES, reached)),
+        "chunk_count": chunk_count,
+        "embedded_chunk_count": embedded_chunk_count,
+        "embedding_cache_hits": embedding_cache_hits,
+        "embedding_cache_hit_rate": embedding_cache_hit_rate(embedding_cache_hits, embedded_chunk_count),
+        "text_bytes": text_bytes,
+    }
+
+
+def embedding_cache_hit_rate(cache_hits: int, embedded_chunk_count: int) -> Optional[float]:
+    """
+    Share of the chunks needing an embedding that the embedding cache already had
+    """
+    if not embedded_chunk_count:
+        return None
+    return round(cache_hits / embedded_chunk_count, 4)
+
+
+def percentile(sorted_values: list[float], percent: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def get_time_to_searchable_metrics(session: Session, account_unique_id: Optional[str] = None, hours: int = 24) -> dict:
+    """
+    Percentiles, in seconds, of upload to searchable and of each stage transition,
+    over files indexed in the last `hours`
+    """
+    indexed_after = datetime.now(timezone.utc) - timedelta(hours=hours)
+    statement = select(IngestionEvent).where(IngestionEvent.indexed_at >= indexed_after,
+                                             IngestionEvent.uploaded_at.is_not(None))
+    if account_unique_id:
+        statement = statement.where(IngestionEvent.account_unique_id == account_unique_id)
+    events = session.exec(statement).all()
+
+    def summarize(durations: list[float]) -> dict:
+        durations = sorted(durations)
+        return {"count": len(durations),
+                **{f"p{percent}": percentile(durations, percent) for percent in INGESTION_METRIC_PERCENTILES}}
+
+    stage_durations = {}
+    for from_stage, to_stage in zip(INGESTION_STAGES, INGESTION_STAGES[1:]):
+        stage_durations[f"{from_stage}_to_{to_stage}"] = summarize([
+            (getattr(event, f"{to_stage}_at") - getattr(event, f"{from_stage}_at")).total_seconds()
+            for event in events
+            if getattr(event, f"{from_stage}_at") and getattr(event, f"{to_stage}_at")
+        ])
+    return {
+        "window_hours": hours,
+        "time_to_searchable_seconds": summarize([(event.indexed_at - event.uploaded_at).total_seconds() for event in events]),
+        "stage_seconds": stage_durations,
+        "embedding_chunks_per_second": summarize([event.chunks_per_second for event in events if event.chunks_per_second]),
+        "embedding_cache_hit_rate": embedding_cache_hit_rate(sum(event.embedding_cache_hits or 0 for event in events),
+                                                             sum(event.embedded_chunk_count or 0 for event in events)),
+    }
+
+
+async def stream_upload_to_s3(upload_file: UploadFile, s3_key: str, bucket: str = BUCKET_NAME, part_size: int = S3_UPLOAD_PART_SIZE) -> dict:
+    """
+    Stream an uploaded file into S3 in fixed-size parts, hashing it on the fly.
+
+    Only one part is held in memory at a time. Files smaller than a single part
+    are sent with a plain put_object, larger ones use an S3 multipart upload.
+    Returns the S3 key, the total size in bytes and the SHA-256 of the content.
+    """
+    content_hash = hashlib.sha256()
+    size = 0
+
+    first_part = await upload_file.read(part_size)
+    content_hash.update(first_part)
+    size += len(first_part)
+
+    if len(first_part) < part_size:
+        await run_in_threadpool(s3.put_object, Bucket=bucket, Key=s3_key, Body=first_part)
+        return {"s3_key": s3_key, "size": size, "content_hash": content_hash.hexdigest()}
+
+    multipart_upload = await run_in_threadpool(s3.create_multipart_upload, Bucket=bucket, Key=s3_key)
+    upload_id = multipart_upload['UploadId']
+    parts = []
+
+    try:
+        part = first_part
+        part_number = 1
+        while part:
+            uploaded_part = await run_in_threadpool(
+                s3.upload_part,
+                Bucket=bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=part
+            )
+            parts.append({"ETag": uploaded_part['ETag'], "PartNumber": part_number})
+
+            part = await upload_file.read(part_size)
+            content_hash.update(part)
+            size += len(part)
+            part_number += 1
+
+        await run_in_threadpool(
+            s3.complete_multipart_upload,
+            Bucket=bucket,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts}
+        )
+    except Exception:
+        # Don't leave orphaned parts behind, they are billed until aborted
+        try:
+            await run_in_threadpool(s3.abort_multipart_upload, Bucket=bucket, Key=s3_key, UploadId=upload_id)
+        except Exception as abort_error:
+            logger.error(f"Failed to abort multipart upload {upload_id} for {s3_key}: {abort_error}")
+        raise
+
+    return {"s3_key": s3_key, "size": size, "content_hash": content_hash.hexdigest()}
+
+
+async def copy_s3_object(source_key: str, destination_key: str, bucket: str = BUCKET_NAME):
+    """
+    Server-side copy of an object within the bucket, no bytes pass through the API
+    """
+    await run_in_threadpool(
+        s3.copy_object,
+        Bucket=bucket,
+        Key=destination_key,
+        CopySource={"Bucket": bucket, "Key": source_key}
+    )
+
+
+def generate_staging_s3_key(account_unique_id: str, original_filename: str) -> str:
+    """
+    S3 key for a raw upload in the staging prefix, picked up by the file upload processor
+    """
+    return f"{account_unique_id}/raw/{token_hex(16)}-{original_filename}"
+
+
+def is_staging_s3_key_for_account(s3_key: str, account_unique_id: str, original_filename: str) -> bool:
+    """
+    Checks a client supplied staging key was issued for this account and file
+    """
+    prefix = f"{account_unique_id}/raw/"
+    return s3_key.startswith(prefix) and s3_key.endswith(f"-{original_filename}") and ".." not in s3_key
+
+
+def generate_presigned_upload(staging_s3_key: str, size: int, content_type: Optional[str] = None, bucket: str = BUCKET_NAME) -> dict:
+    """
+    Presign a direct-to-S3 upload for the client.
+
+    Files up to PRESIGNED_MULTIPART_THRESHOLD get a single presigned PUT URL.
+    Larger files get a multipart upload id with one presigned URL per part.
+    Presigning is done locally by boto3, only creating the multipart upload calls S3.
+    """
+    if size <= PRESIGNED_MULTIPART_THRESHOLD:
+        params = {"Bucket": bucket, "Key": staging_s3_key}
+        if content_type:
+            params["ContentType"] = content_type
+        upload_url = s3.generate_presigned_url(
+            "put_object",
+            Params=params,
+            ExpiresIn=PRESIGNED_UPLOAD_EXPIRY_SECONDS
+        )
+        return {"upload_method": "PUT", "upload_url": upload_url, "staging_s3_key": staging_s3_key}
+
+    # Grow the part size if needed to stay within S3's part count limit
+    part_size = max(S3_UPLOAD_PART_SIZE, -(-size // S3_MAX_PARTS))
+    part_count = -(-size // part_size)
+
+    create_params = {"Bucket": bucket, "Key": staging_s3_key}
+    if content_type:
+        create_params["ContentType"] = content_type
+    multipart_upload = s3.create_multipart_upload(**create_params)
+    upload_id = multipart_upload['UploadId']
+
+    part_urls = [
+        {
+            "part_number": part_number,
+            "upload_url": s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket, "Key": staging_s3_key, "UploadId": upload_id, "PartNumber": part_number},
+                ExpiresIn=PRESIGNED_UPLOAD_EXPIRY_SECONDS
+            ),
+        }
+        for part_number in range(1, part_count + 1)
+    ]
+    return {
+        "upload_method": "MULTIPART",
+        "upload_id": upload_id,
+        "part_size": part_size,
+        "part_urls": part_urls,
+        "staging_s3_key": staging_s3_key,
+    }
+
+
+async def complete_presigned_upload(staging_s3_key: str, upload_id: Optional[str] = None, parts: Optional[list] = None, bucket: str = BUCKET_NAME) -> dict:
+    """
+    Finish a direct-to-S3 upload and confirm the object exists.
+    Multipart uploads are completed with the ETags the client collected for each part.
+    """
+    if upload_id:
+        await run_in_threadpool(
+            s3.complete_multipart_upload,
+            Bucket=bucket,
+            Key=staging_s3_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts or [], key=lambda part: part["PartNumber"])}
+        )
+    return await run_in_threadpool(s3.head_object, Bucket=bucket, Key=staging_s3_key)
+
+
+def is_s3_object_shared(file: SourceFile, session: Session) -> bool:
+    """
+    True if another SourceFile in the account points at the same converted file
+    """
+    statement = (
+        select(func.count())
+        .select_from(SourceFile)
+        .where(
+            SourceFile.account_unique_id == file.account_unique_id,
+            SourceFile.file_name == file.file_name,
+            SourceFile.id != file.id
+        )
+    )
+    return session.exec(statement).one() > 0
+
+
+def chunk_sources_for_file(file: SourceFile) -> list[str]:
+    """
+    The source metadata values the document processor writes for a file's chunks.
+    Documents cite "<account>/<file_name>", Excel rows cite the bare converted file name.
+    """
+    return [f"{file.account_unique_id}/{file.file_name}", file.file_name]
+
+
+def get_unshared_files(files: list[SourceFile], session: Session) -> list[SourceFile]:
+    """
+    The files whose converted object (and so whose chunks) no SourceFile outside
+    `files` still points at, these are safe to remove from S3 and Chroma
+    """
+    if not files:
+        return []
+    file_ids = [file.id for file in files]
+    statement = select(SourceFile.account_unique_id, SourceFile.file_name).where(
+        SourceFile.account_unique_id.in_({file.account_unique_id for file in files}),
+        SourceFile.file_name.in_({file.file_name for file in files}),
+        SourceFile.id.not_in(file_ids)
+    )
+    still_used = set(session.exec(statement).all())
+    return [file for file in files if (file.account_unique_id, file.file_name) not in still_used]
+
+
+async def delete_source_files(files: list[SourceFile], session: Session) -> list[str]:
+    """
+    Delete many source files: their S3 objects with batched delete_objects calls
+    (skipping objects still shared with other files) and their rows with one DELETE.
+
+    Returns the chunk sources to remove from Chroma.
+    """
+    if not files:
+        return []
+    unshared_files = get_unshared_files(files, session)
+
+    s3_keys = []
+    chunk_sources = []
+    for file in unshared_files:
+        s3_keys.append(f"{file.account_unique_id}/{file.file_name}")
+        if file.text_file_name:
+            s3_keys.append(f"{file.account_unique_id}/{file.text_file_name}")
+        chunk_sources.extend(chunk_sources_for_file(file))
+    s3_keys = list(dict.fromkeys(s3_keys))
+    await delete_s3_objects(s3_keys)
+    if file_view_cache:
+        for s3_key in s3_keys:
+            file_view_cache.delete(s3_key)
+
+    session.exec(delete(SourceFile).where(SourceFile.id.in_([file.id for file in files])))
+    session.commit()
+    return list(dict.fromkeys(chunk_sources))
+
+
+def find_orphaned_chunk_sources(account_unique_id: str, indexed_sources: set[str], session: Session) -> list[str]:
+    """
+    Chunk sources in the account's collection that no SourceFile produces any more
+    """
+    statement = select(SourceFile.file_name).where(SourceFile.account_unique_id == account_unique_id).distinct()
+    live_sources = set()
+    for file_name in session.exec(statement).all():
+        live_sources.update((f"{account_unique_id}/{file_name}", file_name))
+    return sorted(indexed_sources - live_sources)
+
+
+def apply_content_hash_deduplication(staged_files: list[dict], account_unique_id: str, session: Session) -> list[dict]:
+    """
+    Records the content hash of each staged upload and links uploads whose bytes
+    the account already has to the existing converted PDF and chunks.
+
+    Duplicates are marked COMPLETED, reusing the existing file_name (and so the
+    same Chroma source), and come back with status DEDUPLICATED so they are not
+    sent for conversion. They are only marked already processed when the original
+    is, otherwise the next ingestion job indexes them ("duplicate_indexed" tells
+    which). All rows are written with one bulk UPDATE.
+
+    Only files the account still has are matched. Bytes uploaded again after their
+    file was deleted are converted and embedded again, the deleted file's PDF and
+    chunks are gone by then. The embedding cache keeps the re-embedding cheap.
+    """
+    hashed_files = [staged_file for staged_file in staged_files if staged_file["status"] == "STAGED" and staged_file.get("content_hash")]
+    if not hashed_files:
+        return staged_files
+
+    statement = select(SourceFile).where(
+        SourceFile.account_unique_id == account_unique_id,
+        SourceFile.content_hash.in_({hashed_file["content_hash"] for hashed_file in hashed_files}),
+        SourceFile.processing_status == "COMPLETED"
+    )
+    existing_by_hash = {}
+    for existing_file in session.exec(statement).all():
+        existing_by_hash.setdefault(existing_file.content_hash, existing_file)
+
+    file_updates = []
+    for hashed_file in hashed_files:
+        file_update = {"id": hashed_file["db_file_id"], "content_hash": hashed_file["content_hash"]}
+        existing_file = existing_by_hash.get(hashed_file["content_hash"])
+        if existing_file:
+            file_update.update({
+                "file_name": existing_file.file_name,
+                "file_path": existing_file.file_path,
+                "text_file_name": existing_file.text_file_name,
+                "processing_status": "COMPLETED",
+                "already_processed_to_source_data": bool(existing_file.already_processed_to_source_data),
+            })
+            hashed_file["status"] = "DEDUPLICATED"
+            hashed_file["duplicate_of"] = existing_file.id
+            hashed_file["duplicate_indexed"] = bool(existing_file.already_processed_to_source_data)
+        file_updates.append(file_update)
+
+    session.execute(update(SourceFile), file_updates)
+    session.commit()
+
+    return staged_files
+
+
+async def delete_s3_objects(s3_keys: list[str], bucket: str = BUCKET_NAME):
+    """
+    Delete many objects with batched delete_objects calls (up to 1000 keys each)
+    """
+    for batch_start in range(0, len(s3_keys), 1000):
+        batch = s3_keys[batch_start:batch_start + 1000]
+        try:
+            await run_in_threadpool(
+                s3.delete_objects,
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": s3_key} for s3_key in batch], "Quiet": True}
+            )
+        except Exception as e:
+            logger.error(f"Failed to delete {len(batch)} objects from S3: {e}")
+
+
+RANGE_HEADER_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range_header(range_header: Optional[str]) -> Optional[str]:
+    """
+    Validates a single-range HTTP Range header ("bytes=0-99", "bytes=100-" or "bytes=-500")
+    and returns it in the form S3 accepts. Multi-range and malformed headers are ignored,
+    in which case the whole object is served, as allowed by RFC 9110.
+    """
+    if not range_header:
+        return None
+    match = RANGE_HEADER_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return f"bytes={start}-{end}"
+
+
+def build_s3_object_headers(s3_object: dict, file_identifier: str, content_type: str) -> dict:
+    """
+    Response headers for an S3 object (from get_object or head_object), forwarding
+    the validators and range information browsers and PDF.js rely on
+    """
+    response_headers = {
+        "Content-Disposition": f"inline; filename=\"{file_identifier}\"",
+        "Content-Type": content_type,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": FILE_VIEW_CACHE_CONTROL,
+    }
+    if s3_object.get('ContentLength') is not None:
+        response_headers["Content-Length"] = str(s3_object['ContentLength'])
+    if s3_object.get('ContentRange'):
+        response_headers["Content-Range"] = s3_object['ContentRange']
+    if s3_object.get('ETag'):
+        response_headers["ETag"] = s3_object['ETag']
+    if s3_object.get('LastModified'):
+        response_headers["Last-Modified"] = format_http_date(s3_object['LastModified'])
+    return response_headers
+
+
+def format_http_date(value) -> str:
+    """
+    Formats a datetime as an RFC 7231 HTTP date
+    """
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def build_not_modified_headers(etag: Optional[str], last_modified=None) -> dict:
+    """
+    Headers for a 304 response, only the validators and caching policy are sent
+    """
+    response_headers = {"Cache-Control": FILE_VIEW_CACHE_CONTROL}
+    if etag:
+        response_headers["ETag"] = etag
+    if last_modified:
+        response_headers["Last-Modified"] = format_http_date(last_modified)
+    return response_headers
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Checks an If-None-Match header against an ETag using the weak comparison RFC 9110 requires
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    normalised_etag = etag.strip().removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == normalised_etag for candidate in if_none_match.split(','))
+
+
+def is_not_modified_error(error: Exception) -> bool:
+    """
+    Whether a botocore error is S3 answering a conditional request with 304 Not Modified
+    """
+    if not isinstance(error, ClientError):
+        return False
+    return error.response.get('Error', {}).get('Code') in ('304', 'NotModified')
+
+
+def resolve_byte_range(s3_range: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Resolves a Range value from parse_range_header to inclusive (start, end) offsets
+    for an object of the given size. Returns None for the whole object and raises
+    ValueError when the range cannot be satisfied.
+    """
+    if not s3_range:
+        return None
+    start, end = RANGE_HEADER_PATTERN.match(s3_range).groups()
+    if not start:
+        suffix_length = int(end)
+        if suffix_length == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - suffix_length, 0), size - 1
+    if int(start) >= size:
+        raise ValueError("Range not satisfiable")
+    return int(start), min(int(end), size - 1) if end else size - 1
+
+
+def cached_file_to_s3_metadata(cached_file: dict, byte_range: Optional[tuple[int, int]] = None) -> dict:
+    """
+    Shapes a file view cache entry like a get_object response so the same header builder can be used
+    """
+    s3_metadata = {
+        "ETag": cached_file.get('etag'),
+        "LastModified": datetime.fromisoformat(cached_file['last_modified']) if cached_file.get('last_modified') else None,
+        "ContentLength": cached_file['size'],
+    }
+    if byte_range:
+        start, end = byte_range
+        s3_metadata["ContentLength"] = end - start + 1
+        s3_metadata["ContentRange"] = f"bytes {start}-{end}/{cached_file['size']}"
+    return s3_metadata
+
+
+def iter_s3_body(s3_body, chunk_size: int = S3_STREAM_CHUNK_SIZE, cache_writer=None):
+    """
+    Yields an S3 StreamingBody in chunks and always releases the connection.
+    With a cache_writer the body is also written to the local file view cache,
+    the entry is only kept if the whole body was streamed.
+    """
+    completed = False
+    try:
+        for chunk in s3_body.iter_chunks(chunk_size=chunk_size):
+            if cache_writer is not None:
+                cache_writer.write(chunk)
+            yield chunk
+        completed = True
+    finally:
+        s3_body.close()
+        if cache_writer is not None:
+            if completed:
+                cache_writer.commit()
+            else:
+                cache_writer.discard()
+
+
+def iter_file_range(file_path: str, byte_range: Optional[tuple[int, int]] = None, chunk_size: int = S3_STREAM_CHUNK_SIZE):
+    """
+    Yields a local file, or an inclusive byte range of it, in chunks
+    """
+    with open(file_path, 'rb') as cached_file:
+        if byte_range is None:
+            while chunk := cached_file.read(chunk_size):
+                yield chunk
+            return
+        start, end = byte_range
+        cached_file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = cached_file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def generate_presigned_source_urls(sources: list, account_unique_id: str, bucket: str = BUCKET_NAME,
+                                   expires_in: int = PRESIGNED_SOURCE_EXPIRY_SECONDS) -> dict[str, str]:
+    """
+    Presigned GET URLs for the de-duplicated query sources, keyed by source.
+
+    Signing happens locally in boto3 without a call to S3. Only keys inside the
+    account's own prefix are signed, anything else is left out of the result.
+    Excel row sources are a bare file name, they are signed as {account}/{name}.
+    """
+    prefix = f"{account_unique_id}/"
+    source_urls = {}
+    for source in dict.fromkeys(sources):
+        if not isinstance(source, str) or ".." in source:
+            continue
+        s3_key = source if "/" in source else f"{prefix}{source}"
+        if not s3_key.startswith(prefix) or s3_key == prefix:
+            continue
+        file_identifier = s3_key[len(prefix):]
+        source_urls[source] = s3.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": bucket,
+                "Key": s3_key,
+                "ResponseContentType": "application/pdf",
+                "ResponseContentDisposition": f"inline; filename=\"{file_identifier}\"",
+                "ResponseCacheControl": FILE_VIEW_CACHE_CONTROL,
+            },
+            ExpiresIn=expires_in
+        )
+    return source_urls
+
+
+async def store_crawled_page(page: dict, account_unique_id: str, semaphore) -> dict:
+    """
+    Store a crawled page's extracted text in S3
+    """
+    async with semaphore:
+        try:
+            text_source = await store_text_source(page["text"], page["title"], account_unique_id)
+        except Exception as e:
+            logger.error(f"Failed to store crawled page {page['url']}: {e}")
+            return {**page, "status": "failed", "error": str(e)}
+    return {**page, **text_source}
+
+
+async def ingest_crawled_pages(pages: list[dict], account_unique_id: str, folder_id: int, session: Session,
+                               remove_chunk_sources: Optional[Callable[[list[str]], Awaitable]] = None) -> dict:
+    """
+    Ingest one batch of crawl results.
+
+    Pages that came back 304, or whose extracted text hashes the same as last time,
+    are skipped. New pages get a SourceFile, changed pages have their existing
+    SourceFile pointed at the new text and flagged for re-processing. Uploads run
+    concurrently and the whole batch is written with one commit. A changed page's
+    old chunks cite its previous file name, after the commit they are passed to
+    remove_chunk_sources. Old objects and chunks another SourceFile still points
+    at are kept.
+    """
+    counts = dict.fromkeys(CRAWL_RESULT_KEYS, 0)
+    fetched_pages = [page for page in pages if page["status"] == "fetched" and 'html' in page["content_type"].lower()]
+    counts["unchanged"] += sum(1 for page in pages if page["status"] == "not_modified")
+    counts["failed"] += sum(1 for page in pages if page["status"] == "failed")
+    if not fetched_pages:
+        return counts
+
+    existing_files = {
+        existing_file.source_url: existing_file
+        for existing_file in session.exec(select(SourceFile).where(
+            SourceFile.account_unique_id == account_unique_id,
+            SourceFile.source_url.in_([page["url"] for page in fetched_pages])
+        )).all()
+    }
+
+    changed_pages = []
+    for page in fetched_pages:
+        extracted_text = await extract_text_from_html(page["content"])
+        content_hash = hashlib.sha256(extracted_text["text"].encode('utf-8')).hexdigest()
+        existing_file = existing_files.get(page["url"])
+        if existing_file and existing_file.content_hash == content_hash:
+            # Same text behind a new validator, keep the validators fresh for the next conditional request
+            existing_file.source_etag = page["etag"]
+            existing_file.source_last_modified = page["last_modified"]
+            session.add(existing_file)
+            counts["unchanged"] += 1
+            continue
+        changed_pages.append({**page, "title": extracted_text["title"] or page["url"], "text": extracted_text["text"],
+                              "content_hash": content_hash, "stats": extracted_text["stats"]})
+
+    semaphore = asyncio.Semaphore(CRAWL_STORE_CONCURRENCY)
+    stored_pages = await asyncio.gather(*(store_crawled_page(page, account_unique_id, semaphore) for page in changed_pages))
+
+    replaced_s3_keys = []
+    replaced_chunk_sources = []
+    for page in stored_pages:
+        if page["status"] == "failed":
+            counts["failed"] += 1
+            continue
+        for key, value in page["stats"].items():
+            counts[key] += value
+        crawled_fields = {
+            "file_name": page["file_name"],
+            "text_file_name": page["text_file_name"],
+            "file_path": page["file_path"],
+            "content_hash": page["content_hash"],
+            "source_etag": page["etag"],
+            "source_last_modified": page["last_modified"],
+            "processing_status": "COMPLETED",
+            "processing_error": None,
+            "already_processed_to_source_data": False,
+        }
+        existing_file = existing_files.get(page["url"])
+        if existing_file:
+            # A deduplicated upload may share the page's objects and chunks, they stay while it does
+            if not is_s3_object_shared(existing_file, session):
+                replaced_s3_keys.append(f"{account_unique_id}/{existing_file.file_name}")
+                if existing_file.text_file_name:
+                    replaced_s3_keys.append(f"{account_unique_id}/{existing_file.text_file_name}")
+                replaced_chunk_sources.extend(chunk_sources_for_file(existing_file))
+            for key, value in crawled_fields.items():
+                setattr(existing_file, key, value)
+            session.add(existing_file)
+            counts["updated"] += 1
+        else:
+            session.add(SourceFile(**crawled_fields, original_filename=page["title"], source_url=page["url"],
+                                   account_unique_id=account_unique_id, folder_id=folder_id,
+                                   included_in_source_data=True))
+            counts["created"] += 1
+    session.commit()
+
+    if replaced_s3_keys:
+        await delete_s3_objects(replaced_s3_keys)
+    if replaced_chunk_sources and remove_chunk_sources:
+        await remove_chunk_sources(replaced_chunk_sources)
+    return counts
+
+
+async def crawl_and_ingest_site(root_url: str, account_unique_id: str, folder_id: int, max_pages: int, session: Session,
+                                remove_chunk_sources: Optional[Callable[[list[str]], Awaitable]] = None) -> dict:
+    """
+    Crawl a site or sitemap and ingest the pages in batches as they arrive.
+    remove_chunk_sources removes the chunks of pages whose content changed.
+    """
+    known_validators = {
+        source_url: {"etag": source_etag, "last_modified": source_last_modified}
+        for source_url, source_etag, source_last_modified in session.exec(
+            select(SourceFile.source_url, SourceFile.source_etag, SourceFile.source_last_modified).where(
+                SourceFile.account_unique_id == account_unique_id,
+                SourceFile.source_url.is_not(None)
+            )
+        ).all()
+    }
+
+    totals = dict.fromkeys(CRAWL_RESULT_KEYS, 0)
+    batch = []
+    async for page in crawl_site(root_url, max_pages=max_pages, known_validators=known_validators):
+        batch.append(page)
+        if len(batch) >= CRAWL_INGEST_BATCH_SIZE:
+            for key, count in (await ingest_crawled_pages(batch, account_unique_id, folder_id, session,
+                                                           remove_chunk_sources)).items():
+                totals[key] += count
+            batch = []
+    if batch:
+        for key, count in (await ingest_crawled_pages(batch, account_unique_id, folder_id, session,
+                                                           remove_chunk_sources)).items():
+            totals[key] += count
+
+    logger.info("Website crawl finished", extra={"account_unique_id": account_unique_id, "root_url": root_url, **totals})
+    return totals
@@ -0,0 +1,85 @@
+"""
+Benchmark the PDF extraction backends on throughput and output quality.
+
+    python benchmark_pdf_extraction.py manual.pdf report.pdf --workers 1 4 --reference pypdf2
+
+For every file, backend and worker count it reports pages per second and
+characters extracted. Quality is compared with the reference backend's output
+per page: the share of the reference's words that the backend also extracted
+(word recall), and the pages it returned empty while the reference had text.
+"""
+import re
+import time
+import argparse
+from collections import Counter
+from pdf_extraction import extract_page_texts, available_backends
+
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def word_recall(reference_text: str, text: str) -> float:
+    reference_words = Counter(WORD_PATTERN.findall(reference_text.lower()))
+    if not reference_words:
+        return 1.0
+    words = Counter(WORD_PATTERN.findall(text.lower()))
+    return sum((reference_words & words).values()) / sum(reference_words.values())
+
+
+def time_extraction(pdf_bytes: bytes, backend: str, workers: int, repeats: int) -> tuple[list[str], float]:
+    """The page texts and the best wall-clock time over the repeats"""
+    best_seconds = None
+    page_texts = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        page_texts = extract_page_texts(pdf_bytes, backend=backend, workers=workers)
+        elapsed_seconds = time.perf_counter() - started
+        best_seconds = elapsed_seconds if best_seconds is None else min(best_seconds, elapsed_seconds)
+    return page_texts, best_seconds
+
+
+def benchmark_file(path: str, backends: list[str], worker_counts: list[int], reference: str, repeats: int) -> list[dict]:
+    with open(path, "rb") as pdf_file:
+        pdf_bytes = pdf_file.read()
+    reference_pages = extract_page_texts(pdf_bytes, backend=reference, workers=1)
+
+    results = []
+    for backend in backends:
+        for workers in worker_counts:
+            page_texts, seconds = time_extraction(pdf_bytes, backend, workers, repeats)
+            recalls = [word_recall(reference_page, page_text) for reference_page, page_text in zip(reference_pages, page_texts)]
+            results.append({
+                "file": path,
+                "backend": backend,
+                "workers": workers,
+                "pages": len(page_texts),
+                "seconds": seconds,
+                "pages_per_second": len(page_texts) / seconds if seconds else float("inf"),
+                "characters": sum(len(page_text) for page_text in page_texts),
+                "word_recall": sum(recalls) / len(recalls) if recalls else 1.0,
+                "empty_pages": sum(1 for reference_page, page_text in zip(reference_pages, page_texts)
+                                   if reference_page.strip() and not page_text.strip()),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+", help="PDF files to extract")
+    parser.add_argument("--backends", nargs="+", default=None, help="Backends to compare, defaults to all installed")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1], help="Worker process counts to try")
+    parser.add_argument("--reference", default="pypdf2", help="Backend whose output quality is measured against")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per combination, the fastest is reported")
+    args = parser.parse_args()
+
+    backends = args.backends or available_backends()
+    print(f"{'file':<30} {'backend':<8} {'workers':>7} {'pages':>6} {'seconds':>8} {'pages/s':>8} {'chars':>9} {'recall':>7} {'empty':>6}")
+    for path in args.pdfs:
+        for result in benchmark_file(path, backends, args.workers, args.reference, args.repeats):
+            print(f"{result['file'][-30:]:<30} {result['backend']:<8} {result['workers']:>7} {result['pages']:>6} "
+                  f"{result['seconds']:>8.3f} {result['pages_per_second']:>8.1f} {result['characters']:>9} "
+                  f"{result['word_recall']:>7.3f} {result['empty_pages']:>6}")
+
+
+if __name__ == "__main__":
+    main()
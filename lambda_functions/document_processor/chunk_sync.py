@@ -0,0 +1,69 @@
+import time
+import hashlib
+from typing import Callable, Iterable
+from streaming import iter_batches, bounded_prefetch
+
+
+def chunk_id(source_key: str, chunk_index: int, content: str) -> str:
+    """Deterministic chunk id from the source, the chunk's position and its content."""
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{source_key}\n{chunk_index}\n{content_hash}".encode('utf-8')).hexdigest()
+
+
+def sync_source_chunks(collection, chunks: Iterable, source_key: str, upsert_chunks: Callable[..., dict]) -> dict:
+    """
+    Syncs a source's chunks (LangChain Documents) into a Chroma collection.
+
+    Chunks whose id is already indexed for the source are skipped, new or changed
+    ones are passed to upsert_chunks(ids=, documents=, metadatas=), which embeds
+    and upserts them and returns embed_and_upsert's report. Indexed chunks the
+    stream no longer produced are deleted at the end, after their replacements
+    are in, unless the stream produced no chunks at all. Returns when the last chunks were embedded (None when nothing was),
+    how many chunks were embedded, how many came from the embedding cache, and at what rate.
+    """
+    # Ids still in here once every chunk has been seen are stale
+    unseen_existing_ids = set(collection.get(where={"source": source_key}, include=[])["ids"])
+
+    chunk_count = 0
+    embedded_chunk_count = 0
+    embedding_cache_hits = 0
+    embedding_seconds = 0.0
+    embedded_at = None
+    for batch in bounded_prefetch(iter_batches(chunks)):
+        new_chunks = []
+        for chunk in batch:
+            chunk_id_value = chunk_id(source_key, chunk_count, chunk.page_content)
+            if chunk_id_value in unseen_existing_ids:
+                unseen_existing_ids.discard(chunk_id_value)
+            else:
+                new_chunks.append((chunk_id_value, chunk_count, chunk))
+            chunk_count += 1
+        if not new_chunks:
+            continue
+        # Embedded here rather than inside upsert, so embedding and indexing are reported as separate stages
+        started = time.monotonic()
+        upsert_result = upsert_chunks(
+            ids=[chunk_id_value for chunk_id_value, _, _ in new_chunks],
+            documents=[chunk.page_content for _, _, chunk in new_chunks],
+            metadatas=[{**chunk.metadata, "chunk_index": index} for _, index, chunk in new_chunks]
+        )
+        embedding_seconds += time.monotonic() - started
+        embedded_at = upsert_result["embedded_at"]
+        embedded_chunk_count += len(new_chunks)
+        embedding_cache_hits += upsert_result["embedding_cache_hits"]
+
+    # Only reached once the stream completed, a parse failure raises out of the loop above and nothing is deleted
+    if not chunk_count:
+        # Almost always a failed extraction rather than an emptied document. Removing a source's
+        # chunks is left to the file deletion and orphan cleanup paths.
+        print(f"No chunks were generated for {source_key}, keeping the {len(unseen_existing_ids)} indexed chunks.")
+        return {"embedded_at": None, "embedded_chunk_count": 0, "chunks_per_second": None, "embedding_cache_hits": 0}
+    # Stale chunks go only after their replacements are in, so the source stays searchable
+    stale_ids = sorted(unseen_existing_ids)
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+    chunks_per_second = round(embedded_chunk_count / embedding_seconds, 2) if embedding_seconds > 0 else None
+    print(f"Synced {source_key}: {embedded_chunk_count} chunks embedded, "
+          f"{chunk_count - embedded_chunk_count} unchanged, {len(stale_ids)} removed.")
+    return {"embedded_at": embedded_at, "embedded_chunk_count": embedded_chunk_count,
+            "chunks_per_second": chunks_per_second, "embedding_cache_hits": embedding_cache_hits}
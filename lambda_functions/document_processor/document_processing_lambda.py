@@ -6,22 +6,36 @@ sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 import os
 import io
 import uuid
+import codecs
 import gc
+import json
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import boto3
 import openai
 import chromadb
+import tiktoken
+from embedding_cache import get_embedding_cache, lookup_cached_embeddings, text_hash
+from embedding_requests import pack_embedding_batches, is_retryable_embedding_error, retry_delay_seconds, \
+    EMBEDDING_MAX_INPUT_TOKENS
+from pdf_extraction import extract_page_texts, count_pdf_pages, resolve_backend, PAGE_SEPARATOR, PDF_STREAM_WINDOW_PAGES
+from textract_ocr import hybrid_extract_pages
+from excel_chunks import iter_excel_chunks
+from streaming import split_sections
+from chunk_sync import sync_source_chunks
 
 # Import all necessary parsing and langchain libraries
 from docx import Document as DocxDocument
-import PyPDF2
 import pypandoc
 import markdown
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from langchain_openai import OpenAIEmbeddings
 from chromadb.api.types import EmbeddingFunction
-from typing import Optional
-import pandas as pd
+from typing import Iterable, Iterator, Optional
 
 
 # --- Configuration (Loaded from Lambda Environment Variables) ---
@@ -36,6 +50,25 @@ textract_client = boto3.client('textract')
 CHROMA_SERVER_AUTHN_CREDENTIALS = os.environ['CHROMA_SERVER_AUTHN_CREDENTIALS']
 chroma_headers = {'X-Chroma-Token': CHROMA_SERVER_AUTHN_CREDENTIALS}
 
+# Asynchronous Textract reads scanned pages from S3, they are staged in this bucket
+OCR_STAGING_BUCKET = os.environ.get('OCR_STAGING_BUCKET', BUCKET_NAME)
+
+# Stage reporting back to the API, skipped when not configured
+INGESTION_CALLBACK_URL = os.environ.get('INGESTION_CALLBACK_URL')
+INTERNAL_API_KEY = os.environ.get('INTERNAL_API_KEY')
+
+# Must match the model the query side embeds with (the OpenAIEmbeddings default)
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'text-embedding-ada-002')
+EMBEDDING_CONCURRENCY = int(os.environ.get('EMBEDDING_CONCURRENCY', 4))
+EMBEDDING_MAX_RETRIES = int(os.environ.get('EMBEDDING_MAX_RETRIES', 6))
+# Chunks per Chroma upsert, keeps each HTTP payload bounded
+CHROMA_UPSERT_BATCH_SIZE = int(os.environ.get('CHROMA_UPSERT_BATCH_SIZE', 256))
+# Plain text is decoded and split in slices of this size
+TEXT_SECTION_BYTES = int(os.environ.get('TEXT_SECTION_BYTES', 65536))
+
+# Retries are handled by embed_with_retry so 429s and 5xx back off the same way
+openai_client = openai.OpenAI(max_retries=0)
+
 class ChromaEmbeddingFunction(EmbeddingFunction):
     """A wrapper for the LangChain OpenAIEmbeddings to be used by ChromaDB."""
     def __init__(self):
@@ -51,37 +84,213 @@ def handler(event, context):
     s3_key = event['s3_key']
     s3_pdf_file_key = event['s3_pdf_file_key']
     account_unique_id = event.get('account_unique_id', s3_key.split('/')[0])
+    # Text-native sources are indexed from their .txt object but cite the PDF rendered on view
+    source_key = event.get('source_key', s3_key)
+    source_metadata = {key: value for key, value in (event.get('source_metadata') or {}).items() if value is not None}
+    db_file_id = event.get('db_file_id')
     print(f"Starting processing for s3://{s3_bucket}/{s3_key}")
+    stage_report = {"stages": {}}
     try:
         file_content, file_extension = download_from_s3(s3_bucket, s3_key)
 
         # --- NEW LOGIC BRANCH FOR EXCEL FILES ---
         if file_extension in ['.xls', '.xlsx']:
-            # For Excel, we parse directly into final chunks, skipping the split_text step.
-            chunks = parse_excel_to_chunks(file_content, s3_key, s3_pdf_file_key)
-
-        else:
-            text = parse_file_content(file_content, file_extension, s3_key)
-            
-            if text:
-                source_document = Document(page_content=text, metadata={"source": s3_key})
-                chunks = split_text([source_document])
-            else:
-                print(f"Parsing returned no text for {s3_key}. No chunks generated.")
-
-        if chunks:
-            save_chunks_to_chroma(chunks, account_unique_id)
+            # For Excel, we parse directly into final chunks, skipping the split step.
+            chunks = count_text_bytes(iter_excel_documents(file_content, file_extension, s3_key, s3_pdf_file_key),
+                                      stage_report, lambda chunk: chunk.page_content)
+            # Excel rows cite the converted PDF file name
+            source_key = s3_pdf_file_key
         else:
-            print("No chunks were generated. Nothing to save.")
+            sections = count_text_bytes(iter_document_sections(file_content, file_extension, s3_key),
+                                        stage_report, lambda section: section[0])
+            chunks = iter_chunks(sections, {**source_metadata, "source": source_key})
+
+        # Parsing, chunking, embedding and upserting are one stream, only a few batches of chunks are in memory.
+        # Always sync, so a document that now yields fewer chunks drops the old ones
+        sync_result = save_chunks_to_chroma(track_stream_stages(chunks, stage_report), account_unique_id, source_key)
+        stage_report["stages"]["embedded"] = sync_result["embedded_at"]
+        stage_report["stages"]["indexed"] = sync_result["indexed_at"]
+        stage_report["embedded_chunk_count"] = sync_result["embedded_chunk_count"]
+        stage_report["chunks_per_second"] = sync_result["chunks_per_second"]
+        stage_report["embedding_cache_hits"] = sync_result["embedding_cache_hits"]
+        report_ingestion_stages(db_file_id, stage_report)
         return {"statusCode": 200, "body": "File processed successfully."}
     except Exception as e:
         print(f"FATAL ERROR processing {s3_key}: {e}")
+        report_ingestion_stages(db_file_id, {**stage_report, "error_message": str(e)[:1024]})
         raise e
 
 # === HELPER FUNCTIONS ===
 
-def save_chunks_to_chroma(chunks: list[Document], account_unique_id: str):
-    """Connects to remote ChromaDB and saves chunks."""
+class DocumentParseError(Exception):
+    """
+    Parsing didn't complete. The run fails before the sync, so the chunks indexed
+    for the source stay as they are instead of being deleted as stale.
+    """
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def count_text_bytes(items: Iterable, stage_report: dict, text_of) -> Iterator:
+    """Passes the items through, adding up the size of their text in the stage report."""
+    stage_report["text_bytes"] = 0
+    for item in items:
+        stage_report["text_bytes"] += len(text_of(item).encode('utf-8'))
+        yield item
+
+
+def track_stream_stages(chunks: Iterable[Document], stage_report: dict) -> Iterator[Document]:
+    """Passes the chunks through and records parsing and chunking as finished once the stream ends."""
+    chunk_count = 0
+    for chunk in chunks:
+        chunk_count += 1
+        yield chunk
+    stage_report["stages"]["parsed"] = stage_report["stages"]["chunked"] = utc_now_iso()
+    stage_report["chunk_count"] = chunk_count
+    print(f"Split document into {chunk_count} chunks.")
+
+
+def report_ingestion_stages(db_file_id: Optional[int], stage_report: dict):
+    """Send the stages reached for a file to the API. Never raises, reporting must not fail the ingestion."""
+    if not db_file_id or not INGESTION_CALLBACK_URL or not INTERNAL_API_KEY:
+        return
+    request = urllib.request.Request(
+        INGESTION_CALLBACK_URL,
+        data=json.dumps({"db_file_id": db_file_id, **stage_report}).encode('utf-8'),
+        headers={"Content-Type": "application/json", "X-Internal-API-Key": INTERNAL_API_KEY},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+    except Exception as e:
+        print(f"Warning: could not report ingestion stages for db_file_id {db_file_id}: {e}")
+
+
+def get_token_encoder():
+    try:
+        return tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def embed_with_retry(texts: list[str]) -> list[list[float]]:
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        try:
+            response = openai_client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            if attempt == EMBEDDING_MAX_RETRIES or not is_retryable_embedding_error(e):
+                raise
+            delay = retry_delay_seconds(attempt, e)
+            print(f"Embedding request for {len(texts)} inputs failed ({e}), retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_and_upsert(collection, embedding_function, ids: list[str], documents: list[str], metadatas: list[dict]) -> dict:
+    """
+    Upserts the documents to Chroma in batches of CHROMA_UPSERT_BATCH_SIZE.
+
+    Embeddings are looked up in the content-addressed embedding cache first. Text
+    the cache hasn't seen is embedded once per distinct text, in token-packed
+    batches EMBEDDING_CONCURRENCY requests at a time, and stored in the cache.
+    Only a few batches of embeddings are held in memory at once.
+    """
+    hash_values = [text_hash(document) for document in documents]
+    indexes_by_hash = {}
+    for index, hash_value in enumerate(hash_values):
+        indexes_by_hash.setdefault(hash_value, []).append(index)
+
+    embedding_cache = get_embedding_cache()
+    cached_embeddings, cache_hits = lookup_cached_embeddings(embedding_cache, EMBEDDING_MODEL, indexes_by_hash)
+
+    # One representative chunk per unseen text, duplicates reuse its embedding
+    texts_to_embed = [indexes[0] for hash_value, indexes in indexes_by_hash.items() if hash_value not in cached_embeddings]
+    encoder = get_token_encoder()
+    token_counts = [len(encoder.encode(documents[index], disallowed_special=())) for index in texts_to_embed]
+    token_count_by_index = dict(zip(texts_to_embed, token_counts))
+    batches = [[texts_to_embed[position] for position in batch] for batch in pack_embedding_batches(token_counts)]
+
+    def embed_batch(batch: list[int]) -> list[list[float]]:
+        texts = [documents[index] for index in batch]
+        if len(batch) == 1 and token_count_by_index[batch[0]] > EMBEDDING_MAX_INPUT_TOKENS:
+            embeddings = embedding_function(texts)
+        else:
+            embeddings = embed_with_retry(texts)
+        if embedding_cache:
+            try:
+                embedding_cache.put_many(EMBEDDING_MODEL, {hash_values[index]: embedding for index, embedding in zip(batch, embeddings)})
+            except Exception as e:
+                print(f"Warning: could not store {len(batch)} embeddings in the cache: {e}")
+        return embeddings
+
+    upsert_buffer = []
+
+    def add_to_upserts(hash_value: str, embedding: list[float]):
+        upsert_buffer.extend((index, embedding) for index in indexes_by_hash[hash_value])
+
+    def flush_upserts(final: bool = False):
+        while len(upsert_buffer) >= CHROMA_UPSERT_BATCH_SIZE or (final and upsert_buffer):
+            upsert_batch = upsert_buffer[:CHROMA_UPSERT_BATCH_SIZE]
+            del upsert_buffer[:CHROMA_UPSERT_BATCH_SIZE]
+            collection.upsert(
+                ids=[ids[index] for index, _ in upsert_batch],
+                embeddings=[embedding for _, embedding in upsert_batch],
+                documents=[documents[index] for index, _ in upsert_batch],
+                metadatas=[metadatas[index] for index, _ in upsert_batch]
+            )
+
+    started = time.monotonic()
+    for hash_value, embedding in cached_embeddings.items():
+        add_to_upserts(hash_value, embedding)
+        flush_upserts()
+    cached_embeddings = None
+
+    with ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY) as executor:
+        in_flight = deque()
+
+        def collect_oldest():
+            batch, future = in_flight.popleft()
+            for index, embedding in zip(batch, future.result()):
+                add_to_upserts(hash_values[index], embedding)
+            flush_upserts()
+
+        for batch in batches:
+            in_flight.append((batch, executor.submit(embed_batch, batch)))
+            # Bounded window, results are consumed in submission order
+            if len(in_flight) >= EMBEDDING_CONCURRENCY * 2:
+                collect_oldest()
+        while in_flight:
+            collect_oldest()
+        embedding_seconds = time.monotonic() - started
+        embedded_at = utc_now_iso()
+    flush_upserts(final=True)
+
+    elapsed_seconds = time.monotonic() - started
+    chunks_per_second = round(len(documents) / elapsed_seconds, 2) if elapsed_seconds > 0 else None
+    cache_hit_rate = round(cache_hits / len(documents), 4) if documents else None
+    print(f"Upserted {len(documents)} chunks in {elapsed_seconds:.2f}s ({chunks_per_second} chunks/s): "
+          f"{cache_hits} from the embedding cache (hit rate {cache_hit_rate}), {len(texts_to_embed)} texts "
+          f"({sum(token_counts)} tokens) embedded in {len(batches)} batches in {embedding_seconds:.2f}s")
+    return {"embedded_at": embedded_at, "chunks_per_second": chunks_per_second,
+            "embedding_cache_hits": cache_hits, "embedding_cache_hit_rate": cache_hit_rate}
+
+
+def save_chunks_to_chroma(chunks: Iterable[Document], account_unique_id: str, source_key: str):
+    """
+    Connects to remote ChromaDB and syncs the chunks of one source.
+
+    Chunks are consumed as a stream, in batches of PIPELINE_BATCH_SIZE that are
+    parsed ahead by a producer thread, at most PIPELINE_PREFETCH_BATCHES batches
+    ahead of embedding. Chunk ids are deterministic, so only new or changed
+    chunks are embedded and upserted, and chunks the source no longer produces
+    are deleted once the stream ends. The collection is never dropped and a
+    retried run doesn't duplicate chunks.
+    Returns when embedding and indexing finished, how many chunks were embedded,
+    how many of those came from the embedding cache, and at what rate.
+    """
     CHROMA_ENDPOINT = os.environ['CHROMA_ENDPOINT']
     print(f"Connecting to ChromaDB at {CHROMA_ENDPOINT}...")
     chroma_client = chromadb.HttpClient(
@@ -97,16 +306,16 @@ def save_chunks_to_chroma(chunks: list[Document], account_unique_id: str):
         embedding_function=embedding_function
     )
     print(f"Using Chroma collection: {collection.name} with ID: {collection.id}")
-    num_chunks = len(chunks)
-    if num_chunks == 0:
-        return
-    collection.add(
-        ids=[str(uuid.uuid4()) for _ in range(num_chunks)],
-        documents=[chunk.page_content for chunk in chunks],
-        metadatas=[chunk.metadata for chunk in chunks]
+
+    embedded_at = utc_now_iso()
+    sync_result = sync_source_chunks(
+        collection, chunks, source_key,
+        lambda **new_chunks: embed_and_upsert(collection, embedding_function, **new_chunks)
     )
-    print(f"Successfully added {num_chunks} chunks to Chroma collection.")
     gc.collect()
+    return {"embedded_at": sync_result["embedded_at"] or embedded_at, "indexed_at": utc_now_iso(),
+            "embedded_chunk_count": sync_result["embedded_chunk_count"], "chunks_per_second": sync_result["chunks_per_second"],
+            "embedding_cache_hits": sync_result["embedding_cache_hits"]}
 
 
 def download_from_s3(bucket, key):
@@ -117,137 +326,124 @@ def download_from_s3(bucket, key):
     return file_content, file_extension
 
 
-def parse_file_content(file_content: bytes, file_extension: str, s3_key: str) -> Optional[str]:
+def iter_document_sections(file_content: bytes, file_extension: str, s3_key: str) -> Iterator[tuple[str, bool]]:
     """
     Parses the file content based on its extension.
     Supports PDF, DOCX, TXT, MD, and DOC formats.
+    Yields the text in (text, starts_page) sections that concatenated form the
+    document, starts_page marks the start of a PDF page.
     """
     print(f"Parsing {s3_key} with extension: {file_extension}")
     if file_extension == ".pdf":
-        return hybrid_parse_pdf(file_content, s3_key)
+        for page_index, page_text in enumerate(iter_pdf_pages(file_content, s3_key)):
+            if page_index:
+                yield PAGE_SEPARATOR, False
+            yield page_text, True
     elif file_extension == ".docx":
         doc = DocxDocument(io.BytesIO(file_content))
-        return "\n".join([para.text for para in doc.paragraphs])
+        for paragraph_index, para in enumerate(doc.paragraphs):
+            yield ("\n" if paragraph_index else "") + para.text, False
     elif file_extension == ".txt":
-        return file_content.decode('utf-8')
+        # Decoded a slice at a time, a character split across slices is completed by the decoder
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for slice_start in range(0, len(file_content), TEXT_SECTION_BYTES):
+            yield decoder.decode(file_content[slice_start:slice_start + TEXT_SECTION_BYTES]), False
+        yield decoder.decode(b"", final=True), False
     elif file_extension == ".md":
-        return markdown.markdown(file_content.decode('utf-8'))
+        yield markdown.markdown(file_content.decode('utf-8')), False
     elif file_extension == ".doc":
         temp_file_path = f"/tmp/{uuid.uuid4()}.doc"
         with open(temp_file_path, "wb") as f:
             f.write(file_content)
-        return pypandoc.convert_file(temp_file_path, 'plain')
+        yield pypandoc.convert_file(temp_file_path, 'plain'), False
     else:
         raise ValueError(f"Unsupported file format: {file_extension}")
     
 
 # NEW helper function specifically for PDFs
-def hybrid_parse_pdf(file_content: bytes, s3_key: str) -> Optional[str]:
+def iter_pdf_pages(file_content: bytes, s3_key: str) -> Iterator[str]:
     """
-    Parses a PDF. First tries a fast text extraction. If that fails or returns
-    no text, it falls back to OCR with AWS Textract.
+    Parses a PDF a window of PDF_STREAM_WINDOW_PAGES pages at a time. Each window
+    gets a fast text extraction, pages in parallel with the configured backend,
+    then its pages without a text layer (scans) are OCR'd with asynchronous AWS
+    Textract jobs and merged back in page order. Yields the page texts.
     """
-    text = ""
-    
-    # --- STAGE 1: Try the fast, standard method first ---
-    print(f"[{s3_key}] Attempting standard text extraction...")
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        for page in pdf_reader.pages:
-            text += page.extract_text() or "" # Add 'or ""' to handle None return
+        backend = resolve_backend()
+        page_count = count_pdf_pages(file_content, backend)
     except Exception as e:
-        print(f"[{s3_key}] Standard PDF parsing failed: {e}. Will proceed with OCR.")
-        text = "" # Ensure text is empty if PyPDF2 fails
+        print(f"[{s3_key}] Standard PDF parsing failed: {e}. Will OCR the whole document.")
+        try:
+            page_texts = hybrid_extract_pages(file_content, None, textract_client, s3_client, OCR_STAGING_BUCKET)
+        except Exception as e:
+            raise DocumentParseError(f"[{s3_key}] AWS Textract OCR failed: {e}") from e
+        yield from page_texts
+        return
 
-    # --- STAGE 2: If no text, use OCR as a fallback ---
-    # We check if the stripped text is empty. A scanned PDF might return just whitespace.
-    if not text.strip():
-        print(f"[{s3_key}] No text found with standard method. Falling back to AWS Textract for OCR.")
+    print(f"[{s3_key}] Extracting {page_count} pages with {backend}...")
+    started = time.monotonic()
+    character_count = 0
+    for first_page in range(0, page_count, PDF_STREAM_WINDOW_PAGES):
+        last_page = min(first_page + PDF_STREAM_WINDOW_PAGES, page_count)
         try:
-            # For synchronous operations on single/multi-page PDFs
-            response = textract_client.detect_document_text(
-                Document={'Bytes': file_content}
-            )
-            # Reconstruct the text from Textract's response
-            text = ""
-            for item in response["Blocks"]:
-                if item["BlockType"] == "LINE":
-                    text += item["Text"] + "\n"
+            page_texts = extract_page_texts(file_content, backend=backend, first_page=first_page, last_page=last_page)
+        except Exception as e:
+            # The pages then count as textless, so they go through OCR
+            print(f"[{s3_key}] Standard PDF parsing failed for pages {first_page + 1}-{last_page}: {e}.")
+            page_texts = [""] * (last_page - first_page)
+        try:
+            page_texts = hybrid_extract_pages(file_content, page_texts, textract_client, s3_client, OCR_STAGING_BUCKET,
+                                              page_offset=first_page)
         except Exception as e:
-            print(f"[{s3_key}] FATAL: AWS Textract OCR failed: {e}")
-            return None # OCR failed, so we can't process this file
-            
-    print(f"[{s3_key}] Successfully parsed PDF. Extracted ~{len(text)} characters.")
-    return text
+            raise DocumentParseError(f"[{s3_key}] AWS Textract OCR failed for pages {first_page + 1}-{last_page}: {e}") from e
+        character_count += sum(len(page_text) for page_text in page_texts)
+        yield from page_texts
 
+    elapsed_seconds = time.monotonic() - started
+    if not character_count:
+        # Raised while the sync is still consuming the stream, so the indexed chunks are kept
+        raise DocumentParseError(f"[{s3_key}] No text could be extracted from the PDF, not even with OCR.")
+    print(f"[{s3_key}] Parsed {page_count} pages in {elapsed_seconds:.2f}s. Extracted ~{character_count} characters.")
 
-def split_text(documents: list[Document]):
+
+def iter_chunks(sections: Iterable[tuple[str, bool]], metadata: dict) -> Iterator[Document]:
+    """
+    Splits the document sections into chunks as they arrive. Chunks carry their
+    start_index in the document and, for PDFs, the 1-based page they start on
+    ("page") and end on ("page_end").
+    """
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
         length_function=len,
         add_start_index=True,
     )
-    chunks = text_splitter.split_documents(documents)
-    print(f"Split document into {len(chunks)} chunks.")
-    return chunks
 
+    def split(text: str) -> list[tuple[str, int]]:
+        return [(document.page_content, document.metadata["start_index"]) for document in text_splitter.create_documents([text])]
 
-def parse_excel_to_chunks(file_content: bytes, s3_key: str, s3_pdf_file_key: str) -> list[Document]:
+    for chunk_text, start_index, page, page_end in split_sections(sections, split):
+        chunk_metadata = {**metadata, "start_index": start_index}
+        if page is not None:
+            chunk_metadata["page"] = page
+            chunk_metadata["page_end"] = page_end
+        yield Document(page_content=chunk_text, metadata=chunk_metadata)
+
+
+def iter_excel_documents(file_content: bytes, file_extension: str, s3_key: str, s3_pdf_file_key: str) -> Iterator[Document]:
     """
-    Parses an Excel file and converts each row into a LangChain Document object.
-    Each row becomes a separate chunk with its own metadata.
+    Parses an Excel file and converts its rows into LangChain Document objects.
+    Sheets are streamed and formatted in row blocks, each row (or group of
+    EXCEL_ROWS_PER_CHUNK consecutive rows) becomes a chunk with its own metadata.
 
     :param file_content: The byte content of the .xls or .xlsx file.
+    :param file_extension: '.xlsx' is streamed in read-only mode, '.xls' is read a sheet at a time.
     :param s3_key: The S3 key of the source file for metadata.
-    :return: A list of LangChain Document objects.
+    :return: LangChain Document objects, in sheet and row order.
     """
-    print(f"Parsing Excel file {s3_key} with pandas...")
-    all_chunks = []
-    
+    print(f"Parsing Excel file {s3_key}...")
     try:
-        # Use ExcelFile to be able to access all sheets
-        xls = pd.ExcelFile(io.BytesIO(file_content))
+        for text, metadata in iter_excel_chunks(file_content, file_extension, s3_key, s3_pdf_file_key):
+            yield Document(page_content=text, metadata=metadata)
     except Exception as e:
-        print(f"Pandas could not read the Excel file {s3_key}. It might be corrupt or password-protected. Error: {e}")
-        return []
-
-    for sheet_name in xls.sheet_names:
-        print(f"Processing sheet: '{sheet_name}'")
-        df = pd.read_excel(xls, sheet_name=sheet_name)
-        
-        # Filter out completely empty rows
-        df.dropna(how='all', inplace=True)
-        if df.empty:
-            continue
-
-        # Iterate over each row in the DataFrame
-        for index, row in df.iterrows():
-            # Convert the row to a descriptive string format
-            # e.g., "Column1: Value1, Column2: Value2, ..."
-            row_text_parts = []
-            for col, val in row.items():
-                if pd.notna(val) and str(val).strip(): # Ensure value is not null/empty
-                    row_text_parts.append(f"{col}: {val}")
-            
-            row_text = ", ".join(row_text_parts)
-
-            # Skip if the row ended up being empty after processing
-            if not row_text:
-                continue
-
-            # Create rich metadata for each row
-            row_metadata = {
-                "excel_source": s3_key,
-                "source": s3_pdf_file_key,
-                "sheet_name": sheet_name,
-                # Add 2 to the index: +1 because index is 0-based, +1 for the header row
-                "row_number": index + 2 
-            }
-            
-            # Create a LangChain Document for this single row
-            chunk = Document(page_content=row_text, metadata=row_metadata)
-            all_chunks.append(chunk)
-
-    print(f"Generated {len(all_chunks)} chunks directly from Excel file {s3_key}.")
-    return all_chunks
\ No newline at end of file
+        raise DocumentParseError(f"Could not read the Excel file {s3_key}. It might be corrupt or password-protected. Error: {e}") from e
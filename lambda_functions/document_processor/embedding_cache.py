@@ -0,0 +1,147 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import boto3
+import numpy as np
+from botocore.exceptions import ClientError
+
+
+# s3 in Lambda, sqlite for local runs, none to always call the embeddings API
+EMBEDDING_CACHE_BACKEND = os.environ.get('EMBEDDING_CACHE_BACKEND', 's3').lower()
+EMBEDDING_CACHE_BUCKET = os.environ.get('EMBEDDING_CACHE_BUCKET', os.environ.get('AWS_STORAGE_BUCKET_NAME'))
+EMBEDDING_CACHE_PREFIX = os.environ.get('EMBEDDING_CACHE_PREFIX', 'embedding-cache')
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH', '/tmp/embedding-cache.sqlite3')
+# Concurrent S3 GET / PUT requests per lookup or store
+EMBEDDING_CACHE_S3_CONCURRENCY = int(os.environ.get('EMBEDDING_CACHE_S3_CONCURRENCY', 32))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def encode_embedding(embedding: list[float]) -> bytes:
+    """Little-endian float32, 4 bytes per dimension"""
+    return np.asarray(embedding, dtype='<f4').tobytes()
+
+
+def decode_embedding(blob: bytes) -> list[float]:
+    return np.frombuffer(blob, dtype='<f4').tolist()
+
+
+class S3EmbeddingCache:
+    """
+    One object per (model, text hash), so any invocation, and any account, reuses an
+    embedding once it has been computed. Missing keys are plain cache misses.
+    """
+    def __init__(self, bucket: str = EMBEDDING_CACHE_BUCKET, prefix: str = EMBEDDING_CACHE_PREFIX,
+                 concurrency: int = EMBEDDING_CACHE_S3_CONCURRENCY, s3_client=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.concurrency = concurrency
+        self.s3_client = s3_client or boto3.client('s3')
+
+    def _key(self, model: str, hash_value: str) -> str:
+        return f"{self.prefix}/{model}/{hash_value[:2]}/{hash_value}.f32"
+
+    def _get(self, model: str, hash_value: str) -> Optional[list[float]]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(model, hash_value))
+            return decode_embedding(response['Body'].read())
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+                print(f"Warning: embedding cache lookup failed for {hash_value}: {e}")
+            return None
+
+    def _put(self, model: str, hash_value: str, embedding: list[float]):
+        try:
+            self.s3_client.put_object(Bucket=self.bucket, Key=self._key(model, hash_value), Body=encode_embedding(embedding),
+                                      ContentType='application/octet-stream')
+        except ClientError as e:
+            print(f"Warning: could not store embedding {hash_value} in the cache: {e}")
+
+    def get_many(self, model: str, hash_values: list[str]) -> dict[str, list[float]]:
+        if not hash_values:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            embeddings = executor.map(lambda hash_value: self._get(model, hash_value), hash_values)
+            return {hash_value: embedding for hash_value, embedding in zip(hash_values, embeddings) if embedding is not None}
+
+    def put_many(self, model: str, embeddings: dict[str, list[float]]):
+        if not embeddings:
+            return
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(lambda item: self._put(model, *item), embeddings.items()))
+
+
+class SQLiteEmbeddingCache:
+    """
+    Local single-file cache for development, the same blobs as the S3 cache
+    """
+    # SQLite's default limit on bound parameters is 999
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, embedding BLOB NOT NULL, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+
+    def get_many(self, model: str, hash_values: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for batch_start in range(0, len(hash_values), self.LOOKUP_BATCH_SIZE):
+                batch = hash_values[batch_start:batch_start + self.LOOKUP_BATCH_SIZE]
+                rows = self._connection.execute(
+                    f"SELECT text_hash, embedding FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+                found.update((hash_value, decode_embedding(blob)) for hash_value, blob in rows)
+        return found
+
+    def put_many(self, model: str, embeddings: dict[str, list[float]]):
+        if not embeddings:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, embedding) VALUES (?, ?, ?)",
+                [(model, hash_value, encode_embedding(embedding)) for hash_value, embedding in embeddings.items()]
+            )
+
+
+def lookup_cached_embeddings(embedding_cache, model: str, indexes_by_hash: dict[str, list[int]]) -> tuple[dict[str, list[float]], int]:
+    """
+    The cached embeddings of the given text hashes, and the number of chunks they
+    cover (a text repeated in several chunks is a hit for each). A failed lookup
+    is treated as all misses.
+    """
+    if not embedding_cache:
+        return {}, 0
+    try:
+        cached_embeddings = embedding_cache.get_many(model, list(indexes_by_hash))
+    except Exception as e:
+        print(f"Warning: embedding cache lookup failed, embedding everything: {e}")
+        return {}, 0
+    return cached_embeddings, sum(len(indexes_by_hash[hash_value]) for hash_value in cached_embeddings)
+
+
+_embedding_cache = None
+
+
+def get_embedding_cache():
+    """
+    The configured embedding cache, created once per Lambda container. None when disabled.
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        if EMBEDDING_CACHE_BACKEND == 'sqlite':
+            _embedding_cache = SQLiteEmbeddingCache()
+        elif EMBEDDING_CACHE_BACKEND == 's3' and EMBEDDING_CACHE_BUCKET:
+            _embedding_cache = S3EmbeddingCache()
+    return _embedding_cache
@@ -0,0 +1,57 @@
+import os
+import random
+import openai
+
+
+# OpenAI caps one embeddings request at 2048 inputs and 300k tokens, batches stay under both
+EMBEDDING_MAX_BATCH_TOKENS = int(os.environ.get('EMBEDDING_MAX_BATCH_TOKENS', 250000))
+EMBEDDING_MAX_BATCH_INPUTS = int(os.environ.get('EMBEDDING_MAX_BATCH_INPUTS', 2048))
+# Longer inputs go through LangChain, which splits and averages them like before
+EMBEDDING_MAX_INPUT_TOKENS = int(os.environ.get('EMBEDDING_MAX_INPUT_TOKENS', 8191))
+EMBEDDING_RETRY_BASE_SECONDS = float(os.environ.get('EMBEDDING_RETRY_BASE_SECONDS', 1))
+EMBEDDING_RETRY_MAX_SECONDS = float(os.environ.get('EMBEDDING_RETRY_MAX_SECONDS', 60))
+
+
+def pack_embedding_batches(token_counts: list[int], max_batch_tokens: int = EMBEDDING_MAX_BATCH_TOKENS,
+                           max_batch_inputs: int = EMBEDDING_MAX_BATCH_INPUTS,
+                           max_input_tokens: int = EMBEDDING_MAX_INPUT_TOKENS) -> list[list[int]]:
+    """
+    Packs input indexes, in order, into batches under the per-request token and input limits.
+    An input longer than the model's context gets a batch of its own.
+    """
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for index, token_count in enumerate(token_counts):
+        oversized = token_count > max_input_tokens
+        if current_batch and (oversized or current_tokens + token_count > max_batch_tokens or len(current_batch) >= max_batch_inputs):
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        if oversized:
+            batches.append([index])
+            continue
+        current_batch.append(index)
+        current_tokens += token_count
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def is_retryable_embedding_error(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying."""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def retry_delay_seconds(attempt: int, error: Exception) -> float:
+    """The provider's Retry-After when it sends one, otherwise exponential backoff with full jitter."""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        if retry_after:
+            return min(float(retry_after), EMBEDDING_RETRY_MAX_SECONDS)
+    except ValueError:
+        pass
+    return random.uniform(0, min(EMBEDDING_RETRY_BASE_SECONDS * 2 ** attempt, EMBEDDING_RETRY_MAX_SECONDS))
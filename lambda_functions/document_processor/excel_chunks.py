@@ -0,0 +1,149 @@
+import os
+import io
+from typing import Iterator
+import numpy as np
+import pandas as pd
+
+
+# Rows formatted together, memory per sheet stays at one block whatever the sheet's size
+EXCEL_ROW_BLOCK_SIZE = int(os.environ.get('EXCEL_ROW_BLOCK_SIZE', 5000))
+# Consecutive rows per chunk, 1 keeps one chunk per row
+EXCEL_ROWS_PER_CHUNK = int(os.environ.get('EXCEL_ROWS_PER_CHUNK', 1))
+# A grouped chunk is closed early once its text reaches this length
+EXCEL_MAX_CHUNK_CHARS = int(os.environ.get('EXCEL_MAX_CHUNK_CHARS', 4000))
+
+ROW_SEPARATOR = "\n"
+
+
+def column_names(header_values: tuple, width: int) -> list[str]:
+    """
+    Column names like pandas gives them: blank headers become "Unnamed: <n>",
+    repeated headers get a ".1", ".2", ... suffix.
+    """
+    names = []
+    seen = {}
+    for position in range(width):
+        value = header_values[position] if position < len(header_values) else None
+        name = str(value).strip() if value is not None and str(value).strip() else f"Unnamed: {position}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def format_row_block(columns: list[str], rows: list[tuple]) -> list[str]:
+    """
+    "Column: value, Column: value" text for every row of the block, skipping empty
+    cells. Works a column at a time over the whole block instead of cell by cell.
+    """
+    width = len(columns)
+    # object dtype keeps the cell values as they are, e.g. datetimes aren't reformatted
+    frame = pd.DataFrame([tuple(row[:width]) + (None,) * (width - len(row)) for row in rows],
+                         columns=range(width), dtype=object)
+    texts = pd.Series("", index=frame.index, dtype=object)
+    for position, column in enumerate(columns):
+        values = frame[position]
+        strings = values.astype(str)
+        present = values.notna() & strings.str.strip().ne("")
+        if not present.any():
+            continue
+        separators = np.where(texts.ne(""), ", ", "")
+        texts = texts.where(~present, texts + separators + f"{column}: " + strings)
+    return texts.tolist()
+
+
+def iter_sheet_rows_openpyxl(file_content: bytes) -> Iterator[tuple[str, Iterator[tuple]]]:
+    """
+    (sheet name, row values) for every sheet of an .xlsx, streamed in read-only mode
+    """
+    import openpyxl
+    workbook = openpyxl.load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            # Some writers store wrong dimensions, which would cut rows off in read-only mode
+            worksheet.reset_dimensions()
+            yield worksheet.title, worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_rows_pandas(file_content: bytes) -> Iterator[tuple[str, Iterator[tuple]]]:
+    """
+    (sheet name, row values) for formats openpyxl can't stream (.xls), one sheet in memory at a time
+    """
+    xls = pd.ExcelFile(io.BytesIO(file_content))
+    for sheet_name in xls.sheet_names:
+        frame = pd.read_excel(xls, sheet_name=sheet_name, header=None, dtype=object)
+        rows = (tuple(None if pd.isna(value) else value for value in row) for row in frame.itertuples(index=False))
+        yield sheet_name, rows
+
+
+def iter_row_blocks(rows: Iterator[tuple], block_size: int) -> Iterator[tuple[list[str], int, list[tuple]]]:
+    """
+    (columns, first row number, rows) blocks of a sheet. The first non-empty row is
+    the header, row numbers are the sheet's own (1-based, header included).
+    """
+    columns = None
+    block = []
+    first_row_number = None
+    for row_number, row in enumerate(rows, start=1):
+        if columns is None:
+            if any(value is not None and str(value).strip() for value in row):
+                columns = column_names(row, len(row))
+            continue
+        if len(row) > len(columns):
+            # Cells past the header, pandas names these too
+            if block:
+                yield columns, first_row_number, block
+                block = []
+            columns = column_names(tuple(columns) + (None,) * (len(row) - len(columns)), len(row))
+        if not block:
+            first_row_number = row_number
+        block.append(row)
+        if len(block) >= block_size:
+            yield columns, first_row_number, block
+            block = []
+    if block:
+        yield columns, first_row_number, block
+
+
+def iter_excel_chunks(file_content: bytes, file_extension: str, excel_source: str, source: str,
+                      rows_per_chunk: int = EXCEL_ROWS_PER_CHUNK, max_chunk_chars: int = EXCEL_MAX_CHUNK_CHARS,
+                      block_size: int = EXCEL_ROW_BLOCK_SIZE) -> Iterator[tuple[str, dict]]:
+    """
+    (text, metadata) chunks of a workbook, every non-empty row once. With
+    rows_per_chunk > 1, consecutive rows of a sheet share a chunk, one row per
+    line, and row_number_end is the chunk's last row.
+    """
+    iter_sheets = iter_sheet_rows_openpyxl if file_extension == '.xlsx' else iter_sheet_rows_pandas
+    rows_per_chunk = max(1, rows_per_chunk)
+
+    for sheet_name, rows in iter_sheets(file_content):
+        print(f"Processing sheet: '{sheet_name}'")
+        group_texts = []
+        group_rows = []
+        group_chars = 0
+
+        def close_group() -> tuple[str, dict]:
+            metadata = {"excel_source": excel_source, "source": source, "sheet_name": sheet_name,
+                        "row_number": group_rows[0]}
+            if rows_per_chunk > 1:
+                metadata["row_number_end"] = group_rows[-1]
+            return ROW_SEPARATOR.join(group_texts), metadata
+
+        for columns, first_row_number, block in iter_row_blocks(rows, block_size):
+            for offset, row_text in enumerate(format_row_block(columns, block)):
+                if not row_text:
+                    continue
+                group_texts.append(row_text)
+                group_rows.append(first_row_number + offset)
+                group_chars += len(row_text)
+                if len(group_texts) >= rows_per_chunk or group_chars >= max_chunk_chars:
+                    yield close_group()
+                    group_texts, group_rows, group_chars = [], [], 0
+        if group_texts:
+            yield close_group()
+
@@ -0,0 +1,184 @@
+import os
+import io
+import multiprocessing
+from typing import Optional
+
+
+# pdfium (pypdfium2) is the fast default, pypdf / PyPDF2 are pure Python fallbacks
+PDF_EXTRACTION_BACKEND = os.environ.get('PDF_EXTRACTION_BACKEND', 'pdfium').lower()
+# Worker processes extracting page ranges, defaults to the vCPUs the Lambda has
+PDF_EXTRACTION_WORKERS = int(os.environ.get('PDF_EXTRACTION_WORKERS', os.cpu_count() or 1))
+# Smaller documents are extracted in-process, forking isn't worth it for them
+PDF_PAGES_PER_WORKER_MIN = int(os.environ.get('PDF_PAGES_PER_WORKER_MIN', 100))
+# Pages extracted (and OCR'd) together when a PDF is streamed, bounds the text held in memory.
+# The default gives every worker at least PDF_PAGES_PER_WORKER_MIN pages, a smaller window uses fewer workers.
+PDF_STREAM_WINDOW_PAGES = int(os.environ.get('PDF_STREAM_WINDOW_PAGES',
+                                             max(1, PDF_EXTRACTION_WORKERS) * PDF_PAGES_PER_WORKER_MIN))
+
+# Pages are joined with this separator, page offsets account for it
+PAGE_SEPARATOR = "\n"
+
+
+def extract_pages_pdfium(pdf_bytes: bytes, first_page: int, last_page: int) -> list[str]:
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(pdf_bytes)
+    try:
+        page_texts = []
+        for page_index in range(first_page, last_page):
+            page = pdf[page_index]
+            text_page = page.get_textpage()
+            page_texts.append(text_page.get_text_bounded())
+            text_page.close()
+            page.close()
+        return page_texts
+    finally:
+        pdf.close()
+
+
+def extract_pages_pypdf(pdf_bytes: bytes, first_page: int, last_page: int) -> list[str]:
+    import pypdf
+    pdf_reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    return [pdf_reader.pages[page_index].extract_text() or "" for page_index in range(first_page, last_page)]
+
+
+def extract_pages_pypdf2(pdf_bytes: bytes, first_page: int, last_page: int) -> list[str]:
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    return [pdf_reader.pages[page_index].extract_text() or "" for page_index in range(first_page, last_page)]
+
+
+def count_pages_pdfium(pdf_bytes: bytes) -> int:
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(pdf_bytes)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def count_pages_pypdf(pdf_bytes: bytes) -> int:
+    import pypdf
+    return len(pypdf.PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def count_pages_pypdf2(pdf_bytes: bytes) -> int:
+    import PyPDF2
+    return len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+# name -> (module that must be importable, page counter, page range extractor)
+PDF_EXTRACTION_BACKENDS = {
+    'pdfium': ('pypdfium2', count_pages_pdfium, extract_pages_pdfium),
+    'pypdf': ('pypdf', count_pages_pypdf, extract_pages_pypdf),
+    'pypdf2': ('PyPDF2', count_pages_pypdf2, extract_pages_pypdf2),
+}
+
+
+def available_backends() -> list[str]:
+    available = []
+    for name, (module_name, _, _) in PDF_EXTRACTION_BACKENDS.items():
+        try:
+            __import__(module_name)
+            available.append(name)
+        except ImportError:
+            continue
+    return available
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    """
+    The requested backend if it is installed, otherwise the first installed one
+    """
+    name = (name or PDF_EXTRACTION_BACKEND).lower()
+    available = available_backends()
+    if not available:
+        raise RuntimeError("No PDF extraction backend is installed.")
+    if name in available:
+        return name
+    print(f"PDF extraction backend '{name}' is not available, using '{available[0]}'.")
+    return available[0]
+
+
+def split_page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    """
+    Contiguous [first, last) page ranges, one per worker, sizes differing by at most one
+    """
+    workers = max(1, min(workers, page_count))
+    base_size, remainder = divmod(page_count, workers)
+    page_ranges = []
+    first_page = 0
+    for worker_index in range(workers):
+        last_page = first_page + base_size + (1 if worker_index < remainder else 0)
+        if last_page > first_page:
+            page_ranges.append((first_page, last_page))
+        first_page = last_page
+    return page_ranges
+
+
+def _extract_range_worker(connection, backend: str, pdf_bytes: bytes, first_page: int, last_page: int):
+    try:
+        connection.send(("ok", PDF_EXTRACTION_BACKENDS[backend][2](pdf_bytes, first_page, last_page)))
+    except Exception as e:
+        connection.send(("error", f"pages {first_page + 1}-{last_page}: {e}"))
+    finally:
+        connection.close()
+
+
+def count_pdf_pages(pdf_bytes: bytes, backend: Optional[str] = None) -> int:
+    return PDF_EXTRACTION_BACKENDS[resolve_backend(backend)][1](pdf_bytes)
+
+
+def extract_page_texts(pdf_bytes: bytes, backend: Optional[str] = None, workers: int = PDF_EXTRACTION_WORKERS,
+                       first_page: int = 0, last_page: Optional[int] = None) -> list[str]:
+    """
+    Text of every page in [first_page, last_page), in page order, all pages by default.
+
+    Large ranges are split into contiguous page ranges extracted by forked
+    worker processes. Processes talk over pipes rather than a multiprocessing
+    Pool, which needs /dev/shm and is not available in Lambda.
+
+    When a PDF is streamed this runs on the pipeline-producer thread, so the
+    workers are forked from a multi-threaded process and hold only that thread.
+    That is safe because a worker only runs the backend's extractor, already
+    imported by resolve_backend, and writes to its pipe: it takes no lock another
+    thread (e.g. the embedding client) could have held at fork time. Keep it that
+    way, a forkserver context would instead pickle the PDF bytes to every worker.
+    """
+    # Also imports the backend here, before any fork
+    backend = resolve_backend(backend)
+    _, count_pages, extract_range = PDF_EXTRACTION_BACKENDS[backend]
+    if last_page is None:
+        last_page = count_pages(pdf_bytes)
+    page_count = last_page - first_page
+    workers = min(workers, page_count // PDF_PAGES_PER_WORKER_MIN)
+    if workers <= 1:
+        return extract_range(pdf_bytes, first_page, last_page)
+
+    context = multiprocessing.get_context('fork')
+    running = []
+    for range_first_page, range_last_page in split_page_ranges(page_count, workers):
+        parent_connection, child_connection = context.Pipe(duplex=False)
+        process = context.Process(target=_extract_range_worker,
+                                  args=(child_connection, backend, pdf_bytes,
+                                        first_page + range_first_page, first_page + range_last_page))
+        process.start()
+        child_connection.close()
+        running.append((parent_connection, process))
+
+    page_texts = []
+    errors = []
+    for parent_connection, process in running:
+        try:
+            status, result = parent_connection.recv()
+        except EOFError:
+            status, result = "error", f"worker exited with code {process.exitcode}"
+        if status == "ok":
+            page_texts.extend(result)
+        else:
+            errors.append(result)
+        parent_connection.close()
+        process.join()
+    if errors:
+        raise RuntimeError(f"PDF extraction failed for {'; '.join(errors)}")
+    return page_texts
+
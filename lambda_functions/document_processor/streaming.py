@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+from bisect import bisect_right
+from typing import Callable, Iterable, Iterator, Optional
+
+
+# Chunks per pipeline batch, the unit that is embedded and upserted together
+PIPELINE_BATCH_SIZE = int(os.environ.get('PIPELINE_BATCH_SIZE', 512))
+# Batches parsed ahead of the embedding stage, parsing blocks once this many are waiting
+PIPELINE_PREFETCH_BATCHES = int(os.environ.get('PIPELINE_PREFETCH_BATCHES', 2))
+# Text buffered before it is split, the tail chunk is carried over so chunks still span sections
+SPLIT_WINDOW_CHARS = int(os.environ.get('SPLIT_WINDOW_CHARS', 20000))
+
+
+def iter_batches(items: Iterable, batch_size: int = PIPELINE_BATCH_SIZE) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_DONE = object()
+
+
+def bounded_prefetch(items: Iterable, max_buffered: int = PIPELINE_PREFETCH_BATCHES) -> Iterator:
+    """
+    Iterates items from a producer thread through a bounded queue, so producing
+    (parsing) overlaps with consuming (embedding) but never runs more than
+    max_buffered items ahead. Producer errors are raised in the consumer, and a
+    consumer that stops early stops the producer.
+    """
+    buffered = queue.Queue(maxsize=max(1, max_buffered))
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffered.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    producer = threading.Thread(target=produce, name="pipeline-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffered.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def split_sections(sections: Iterable[tuple[str, bool]], split: Callable[[str], list[tuple[str, int]]],
+                   window_chars: int = SPLIT_WINDOW_CHARS) -> Iterator[tuple[str, int, Optional[int], Optional[int]]]:
+    """
+    Splits text that arrives in sections without joining the whole document.
+
+    sections are (text, starts_page) pieces that concatenated form the document,
+    starts_page marks a piece that begins a new page. split turns text into
+    (chunk text, start index) pairs. Text is buffered up to window_chars and
+    split, every chunk but the last is emitted and splitting resumes at the last
+    chunk's start, so chunks cross section boundaries like they did before.
+    Yields (chunk text, start index in the document, first page, last page),
+    pages are None when no section started a page.
+    """
+    buffer = ""
+    buffer_start = 0
+    page_offsets = []
+    pages_before_offsets = 0
+
+    def page_at(position: int) -> Optional[int]:
+        if not page_offsets and not pages_before_offsets:
+            return None
+        return pages_before_offsets + bisect_right(page_offsets, position)
+
+    def emit(chunks: list[tuple[str, int]]) -> Iterator[tuple[str, int, Optional[int], Optional[int]]]:
+        for chunk_text, start_index in chunks:
+            start = buffer_start + max(start_index, 0)
+            yield chunk_text, start, page_at(start), page_at(start + max(len(chunk_text) - 1, 0))
+
+    for text, starts_page in sections:
+        if starts_page:
+            page_offsets.append(buffer_start + len(buffer))
+        buffer += text
+        if len(buffer) < window_chars:
+            continue
+        chunks = split(buffer)
+        if len(chunks) < 2 or chunks[-1][1] <= 0:
+            continue
+        yield from emit(chunks[:-1])
+        # Carry the last chunk over, it may continue in the next section
+        carry_start = chunks[-1][1]
+        buffer = buffer[carry_start:]
+        buffer_start += carry_start
+        # Only the page the buffer starts on, and later ones, are looked up again
+        while len(page_offsets) > 1 and page_offsets[1] <= buffer_start:
+            page_offsets.pop(0)
+            pages_before_offsets += 1
+
+    if buffer:
+        yield from emit(split(buffer))
@@ -0,0 +1,114 @@
+import os
+import sys
+import unittest
+from langchain_core.documents import Document
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunk_sync import chunk_id, sync_source_chunks
+
+
+class InMemoryCollection:
+    """Keeps chunks like a Chroma collection, with the calls the sync makes"""
+    def __init__(self):
+        self.chunks = {}
+        self.deleted_ids = []
+
+    def get(self, where: dict, include: list) -> dict:
+        return {"ids": [id_value for id_value, (_, metadata) in self.chunks.items() if metadata["source"] == where["source"]]}
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict]):
+        self.chunks.update(zip(ids, zip(documents, metadatas)))
+
+    def delete(self, ids: list[str]):
+        self.deleted_ids.extend(ids)
+        for id_value in ids:
+            del self.chunks[id_value]
+
+
+class TestChunkSync(unittest.TestCase):
+    """
+    Tests for incremental re-indexing with deterministic chunk ids
+    """
+
+    def setUp(self):
+        self.collection = InMemoryCollection()
+        self.upserted_ids = []
+
+    def upsert_chunks(self, ids: list[str], documents: list[str], metadatas: list[dict]) -> dict:
+        self.upserted_ids.extend(ids)
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+        return {"embedded_at": "2024-01-01T00:00:00+00:00", "embedding_cache_hits": 0}
+
+    def sync(self, source_key: str, texts: list[str]) -> dict:
+        chunks = [Document(page_content=text, metadata={"source": source_key}) for text in texts]
+        return sync_source_chunks(self.collection, chunks, source_key, self.upsert_chunks)
+
+    def test_chunk_id_is_deterministic(self):
+        """
+        Test the id only depends on the source, the position and the content
+        """
+        self.assertEqual(chunk_id("acc/a.pdf", 0, "text"), chunk_id("acc/a.pdf", 0, "text"))
+        self.assertEqual(len({chunk_id("acc/a.pdf", 0, "text"), chunk_id("acc/b.pdf", 0, "text"),
+                              chunk_id("acc/a.pdf", 1, "text"), chunk_id("acc/a.pdf", 0, "other")}), 4)
+
+    def test_unchanged_chunks_are_not_embedded_again(self):
+        """
+        Test a re-sync of the same chunks upserts nothing and keeps every indexed chunk
+        """
+        self.sync("acc/a.pdf", ["one", "two", "three"])
+        self.upserted_ids.clear()
+
+        result = self.sync("acc/a.pdf", ["one", "two", "three"])
+
+        self.assertEqual(self.upserted_ids, [])
+        self.assertEqual(result["embedded_chunk_count"], 0)
+        self.assertIsNone(result["embedded_at"])
+        self.assertEqual(len(self.collection.chunks), 3)
+
+    def test_changed_and_removed_chunks_are_replaced(self):
+        """
+        Test only changed chunks are upserted and the ids the source no longer produces are deleted
+        """
+        self.sync("acc/a.pdf", ["one", "two", "three"])
+        self.sync("acc/other.pdf", ["one"])
+        old_ids = [chunk_id("acc/a.pdf", index, text) for index, text in enumerate(["one", "two", "three"])]
+        self.upserted_ids.clear()
+
+        result = self.sync("acc/a.pdf", ["one", "TWO"])
+
+        self.assertEqual(self.upserted_ids, [chunk_id("acc/a.pdf", 1, "TWO")])
+        self.assertEqual(result["embedded_chunk_count"], 1)
+        self.assertEqual(sorted(self.collection.deleted_ids), sorted(old_ids[1:]))
+        self.assertEqual(sorted(document for document, _ in self.collection.chunks.values()), ["TWO", "one", "one"])
+        self.assertEqual(self.collection.chunks[chunk_id("acc/a.pdf", 1, "TWO")][1]["chunk_index"], 1)
+
+    def test_failed_stream_deletes_nothing(self):
+        """
+        Test a stream that raises part way leaves the indexed chunks untouched
+        """
+        self.sync("acc/a.pdf", ["one", "two"])
+
+        def failing_chunks():
+            yield Document(page_content="one", metadata={"source": "acc/a.pdf"})
+            raise ValueError("parse failed")
+
+        with self.assertRaises(ValueError):
+            sync_source_chunks(self.collection, failing_chunks(), "acc/a.pdf", self.upsert_chunks)
+        self.assertEqual(self.collection.deleted_ids, [])
+        self.assertEqual(len(self.collection.chunks), 2)
+
+    def test_empty_stream_deletes_nothing(self):
+        """
+        Test a source that produced no chunks keeps its indexed chunks, an empty parse is not an emptied document
+        """
+        self.sync("acc/a.pdf", ["one", "two"])
+        self.upserted_ids.clear()
+
+        result = self.sync("acc/a.pdf", [])
+
+        self.assertEqual(result["embedded_chunk_count"], 0)
+        self.assertEqual(self.upserted_ids, [])
+        self.assertEqual(self.collection.deleted_ids, [])
+        self.assertEqual(len(self.collection.chunks), 2)
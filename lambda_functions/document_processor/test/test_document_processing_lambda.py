@@ -0,0 +1,52 @@
+import io
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The handler module reads its configuration and creates its clients on import
+for name, value in {"OPENAI_API_KEY": "test", "AWS_STORAGE_BUCKET_NAME": "bucket", "AWS_DEFAULT_REGION": "us-east-1",
+                    "CHROMA_SERVER_AUTHN_CREDENTIALS": "token", "CHROMA_ENDPOINT": "chroma"}.items():
+    os.environ.setdefault(name, value)
+
+import pypdf
+import document_processing_lambda
+from document_processing_lambda import handler, DocumentParseError
+
+
+def image_only_pdf(page_count: int) -> bytes:
+    """A PDF whose pages have no text layer, like a scan"""
+    pdf_writer = pypdf.PdfWriter()
+    for _ in range(page_count):
+        pdf_writer.add_blank_page(width=612, height=792)
+    output = io.BytesIO()
+    pdf_writer.write(output)
+    return output.getvalue()
+
+
+class TestDocumentProcessingHandler(unittest.TestCase):
+    """
+    Tests for the document processor handler end to end, with S3, Textract and Chroma replaced
+    """
+
+    def test_pdf_without_any_text_keeps_indexed_chunks(self):
+        """
+        Test an image-only PDF whose OCR finds nothing fails the run and leaves the source's chunks in place
+        """
+        collection = MagicMock()
+        collection.get.return_value = {"ids": ["indexed-chunk-1", "indexed-chunk-2"]}
+        event = {"s3_bucket": "bucket", "s3_key": "acc/scan.pdf", "s3_pdf_file_key": "scan.pdf"}
+
+        with patch("document_processing_lambda.download_from_s3", return_value=(image_only_pdf(2), ".pdf")), \
+                patch("textract_ocr.detect_document_text", return_value={}) as detect_document_text, \
+                patch("document_processing_lambda.chromadb.HttpClient") as http_client:
+            http_client.return_value.get_or_create_collection.return_value = collection
+            with self.assertRaises(DocumentParseError):
+                handler(event, None)
+
+        detect_document_text.assert_called_once()
+        collection.upsert.assert_not_called()
+        collection.delete.assert_not_called()
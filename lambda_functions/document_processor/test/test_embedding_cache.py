@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_cache import SQLiteEmbeddingCache, lookup_cached_embeddings, text_hash
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """
+    Tests for the content-addressed embedding cache
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = SQLiteEmbeddingCache(os.path.join(self.temp_dir.name, "embeddings.sqlite3"))
+
+    def tearDown(self):
+        self.cache._connection.close()
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """
+        Test stored embeddings come back as float32 values, per model, and only for hashes that were stored
+        """
+        self.cache.put_many("model-a", {text_hash("one"): [0.5, -1.25], text_hash("two"): [2.0, 0.0]})
+        self.cache.put_many("model-a", {text_hash("one"): [9.0, 9.0]})
+
+        found = self.cache.get_many("model-a", [text_hash("one"), text_hash("missing"), text_hash("two")])
+        self.assertEqual(found, {text_hash("one"): [0.5, -1.25], text_hash("two"): [2.0, 0.0]})
+        self.assertEqual(self.cache.get_many("model-b", [text_hash("one")]), {})
+        self.assertEqual(self.cache.get_many("model-a", []), {})
+
+    def test_lookup_past_the_parameter_limit(self):
+        """
+        Test lookups for more hashes than SQLite binds at once are split and still find every hit
+        """
+        hash_values = [text_hash(str(number)) for number in range(SQLiteEmbeddingCache.LOOKUP_BATCH_SIZE * 2 + 1)]
+        self.cache.put_many("model-a", {hash_value: [1.0] for hash_value in hash_values[::2]})
+        self.assertEqual(set(self.cache.get_many("model-a", hash_values)), set(hash_values[::2]))
+
+    def test_hits_are_counted_per_chunk(self):
+        """
+        Test a cached text repeated in several chunks counts a hit for each, and misses count nothing
+        """
+        self.cache.put_many("model-a", {text_hash("header"): [1.0]})
+        indexes_by_hash = {text_hash("header"): [0, 2, 5], text_hash("body"): [1]}
+
+        cached_embeddings, cache_hits = lookup_cached_embeddings(self.cache, "model-a", indexes_by_hash)
+
+        self.assertEqual(cached_embeddings, {text_hash("header"): [1.0]})
+        self.assertEqual(cache_hits, 3)
+
+    def test_disabled_or_failing_cache_is_all_misses(self):
+        """
+        Test no cache, or a cache whose lookup fails, gives no embeddings and no hits
+        """
+        indexes_by_hash = {text_hash("header"): [0]}
+        failing_cache = MagicMock()
+        failing_cache.get_many.side_effect = ConnectionError("cache down")
+        self.assertEqual(lookup_cached_embeddings(None, "model-a", indexes_by_hash), ({}, 0))
+        self.assertEqual(lookup_cached_embeddings(failing_cache, "model-a", indexes_by_hash), ({}, 0))
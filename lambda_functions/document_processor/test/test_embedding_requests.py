@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import openai
+from embedding_requests import pack_embedding_batches, is_retryable_embedding_error, retry_delay_seconds
+
+
+def api_error(error_class, status_code: int, headers: dict = None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return error_class("failed", response=response, body=None)
+
+
+class TestEmbeddingRequests(unittest.TestCase):
+    """
+    Tests for packing embedding requests and deciding how they are retried
+    """
+
+    def test_batches_stay_under_token_and_input_limits(self):
+        """
+        Test inputs keep their order and a batch is closed before it would pass either limit
+        """
+        batches = pack_embedding_batches([40, 30, 50, 10, 10, 10], max_batch_tokens=100, max_batch_inputs=3, max_input_tokens=100)
+        self.assertEqual(batches, [[0, 1], [2, 3, 4], [5]])
+        self.assertEqual(pack_embedding_batches([]), [])
+
+    def test_oversized_input_gets_its_own_batch(self):
+        """
+        Test an input longer than the model's context is sent alone and the batches around it stay packed
+        """
+        batches = pack_embedding_batches([10, 500, 10, 10], max_batch_tokens=100, max_batch_inputs=10, max_input_tokens=200)
+        self.assertEqual(batches, [[0], [1], [2, 3]])
+
+    def test_retryable_errors(self):
+        """
+        Test rate limits, server errors and connection problems are retried and client errors are not
+        """
+        request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+        self.assertTrue(is_retryable_embedding_error(api_error(openai.RateLimitError, 429)))
+        self.assertTrue(is_retryable_embedding_error(api_error(openai.InternalServerError, 503)))
+        self.assertTrue(is_retryable_embedding_error(api_error(openai.APIStatusError, 502)))
+        self.assertTrue(is_retryable_embedding_error(openai.APITimeoutError(request=request)))
+        self.assertTrue(is_retryable_embedding_error(openai.APIConnectionError(request=request)))
+        self.assertFalse(is_retryable_embedding_error(api_error(openai.BadRequestError, 400)))
+        self.assertFalse(is_retryable_embedding_error(api_error(openai.AuthenticationError, 401)))
+        self.assertFalse(is_retryable_embedding_error(ValueError("not an API error")))
+
+    def test_retry_after_is_honoured_and_capped(self):
+        """
+        Test the provider's Retry-After is used as the delay, capped at the retry maximum
+        """
+        with patch("embedding_requests.EMBEDDING_RETRY_MAX_SECONDS", 60):
+            self.assertEqual(retry_delay_seconds(0, api_error(openai.RateLimitError, 429, {"retry-after": "7"})), 7)
+            self.assertEqual(retry_delay_seconds(0, api_error(openai.RateLimitError, 429, {"retry-after": "600"})), 60)
+
+    def test_backoff_without_retry_after(self):
+        """
+        Test the delay is drawn from an exponentially growing, capped window
+        """
+        with patch("embedding_requests.EMBEDDING_RETRY_BASE_SECONDS", 1), \
+                patch("embedding_requests.EMBEDDING_RETRY_MAX_SECONDS", 10), \
+                patch("embedding_requests.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual(retry_delay_seconds(0, api_error(openai.InternalServerError, 500)), 1)
+            self.assertEqual(retry_delay_seconds(2, api_error(openai.InternalServerError, 500)), 4)
+            self.assertEqual(retry_delay_seconds(8, api_error(openai.RateLimitError, 429, {"retry-after": "soon"})), 10)
+            self.assertEqual(retry_delay_seconds(1, ValueError("no response")), 2)
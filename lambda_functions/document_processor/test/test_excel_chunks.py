@@ -0,0 +1,84 @@
+import io
+import os
+import sys
+import datetime
+import unittest
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+from excel_chunks import column_names, format_row_block, iter_excel_chunks
+
+
+def workbook_bytes(sheets: dict) -> bytes:
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_name, rows in sheets.items():
+        worksheet = workbook.create_sheet(sheet_name)
+        for row in rows:
+            worksheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+class TestExcelChunks(unittest.TestCase):
+    """
+    Tests for streaming Excel rows into chunks
+    """
+
+    def setUp(self):
+        self.content = workbook_bytes({
+            "Orders": [
+                ["Name", "Amount", None, "Name"],
+                ["Widget", 3, None, "  "],
+                [None, None, None, None],
+                ["Gadget", 2.5, "rush", "second name"],
+                [None, None, datetime.datetime(2024, 1, 3), None],
+            ],
+            "Blank": [["Only a header"]],
+        })
+
+    def test_one_chunk_per_row(self):
+        """
+        Test rows are formatted like before, empty cells and rows are skipped and rows keep their sheet row number
+        """
+        chunks = list(iter_excel_chunks(self.content, '.xlsx', "acc/orders.xlsx", "orders.pdf", block_size=2))
+
+        self.assertEqual([text for text, _ in chunks], [
+            "Name: Widget, Amount: 3",
+            "Name: Gadget, Amount: 2.5, Unnamed: 2: rush, Name.1: second name",
+            "Unnamed: 2: 2024-01-03 00:00:00",
+        ])
+        self.assertEqual([metadata["row_number"] for _, metadata in chunks], [2, 4, 5])
+        self.assertEqual(chunks[0][1], {"excel_source": "acc/orders.xlsx", "source": "orders.pdf",
+                                        "sheet_name": "Orders", "row_number": 2})
+
+    def test_grouped_rows(self):
+        """
+        Test consecutive rows share a chunk, one per line, and the group is closed at the character limit
+        """
+        chunks = list(iter_excel_chunks(self.content, '.xlsx', "acc/orders.xlsx", "orders.pdf", rows_per_chunk=2))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0][0], "Name: Widget, Amount: 3\nName: Gadget, Amount: 2.5, Unnamed: 2: rush, Name.1: second name")
+        self.assertEqual((chunks[0][1]["row_number"], chunks[0][1]["row_number_end"]), (2, 4))
+        self.assertEqual((chunks[1][1]["row_number"], chunks[1][1]["row_number_end"]), (5, 5))
+
+        chunks = list(iter_excel_chunks(self.content, '.xlsx', "acc/orders.xlsx", "orders.pdf",
+                                        rows_per_chunk=10, max_chunk_chars=30))
+        self.assertEqual([(metadata["row_number"], metadata["row_number_end"]) for _, metadata in chunks], [(2, 4), (5, 5)])
+
+    def test_column_names_and_ragged_rows(self):
+        """
+        Test blank and repeated headers are named like pandas, and short rows are padded
+        """
+        self.assertEqual(column_names(("A", None, "A", " "), 5), ["A", "Unnamed: 1", "A.1", "Unnamed: 3", "Unnamed: 4"])
+        self.assertEqual(format_row_block(["A", "B"], [("x",), (None, 0), ("", "  ")]), ["A: x", "B: 0", ""])
+
+    def test_unreadable_workbook(self):
+        """
+        Test a file that isn't a workbook raises before any chunk is produced
+        """
+        chunks = iter_excel_chunks(b"not a workbook", '.xlsx', "acc/broken.xlsx", "broken.pdf")
+        with self.assertRaises(Exception):
+            next(chunks)
@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_extraction
+from pdf_extraction import split_page_ranges, extract_page_texts
+
+
+def count_numbered_pages(pdf_bytes: bytes) -> int:
+    return int(pdf_bytes)
+
+
+def extract_numbered_pages(pdf_bytes: bytes, first_page: int, last_page: int) -> list[str]:
+    """A stand-in backend, the document is its page count and every page's text is its index"""
+    return [f"page {page_index}" for page_index in range(first_page, last_page)]
+
+
+def extract_failing_pages(pdf_bytes: bytes, first_page: int, last_page: int) -> list[str]:
+    if first_page > 0:
+        raise ValueError("broken page")
+    return extract_numbered_pages(pdf_bytes, first_page, last_page)
+
+
+# A module every environment has, so resolve_backend accepts the stand-ins
+TEST_BACKENDS = {
+    'numbered': ('json', count_numbered_pages, extract_numbered_pages),
+    'failing': ('json', count_numbered_pages, extract_failing_pages),
+}
+
+
+class TestPdfExtraction(unittest.TestCase):
+    """
+    Tests for splitting PDFs into page ranges and extracting them in parallel
+    """
+
+    def test_split_page_ranges(self):
+        """
+        Test ranges are contiguous, cover every page and differ in size by at most one
+        """
+        self.assertEqual(split_page_ranges(10, 3), [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(split_page_ranges(2, 5), [(0, 1), (1, 2)])
+        self.assertEqual(split_page_ranges(7, 1), [(0, 7)])
+        for page_count, workers in [(1000, 7), (13, 4), (5, 5)]:
+            page_ranges = split_page_ranges(page_count, workers)
+            self.assertEqual([page for first, last in page_ranges for page in range(first, last)], list(range(page_count)))
+            self.assertLessEqual(max(last - first for first, last in page_ranges) - min(last - first for first, last in page_ranges), 1)
+
+    def test_parallel_extraction_keeps_page_order(self):
+        """
+        Test pages extracted by several workers come back in page order, for the whole document and for a window
+        """
+        with patch.dict(pdf_extraction.PDF_EXTRACTION_BACKENDS, TEST_BACKENDS), \
+                patch("pdf_extraction.PDF_PAGES_PER_WORKER_MIN", 2):
+            self.assertEqual(extract_page_texts(b"25", backend='numbered', workers=4),
+                             [f"page {page_index}" for page_index in range(25)])
+            self.assertEqual(extract_page_texts(b"25", backend='numbered', workers=3, first_page=10, last_page=20),
+                             [f"page {page_index}" for page_index in range(10, 20)])
+
+    def test_small_ranges_are_extracted_in_process(self):
+        """
+        Test ranges below the per-worker minimum are extracted without forking
+        """
+        with patch.dict(pdf_extraction.PDF_EXTRACTION_BACKENDS, TEST_BACKENDS), \
+                patch("pdf_extraction.PDF_PAGES_PER_WORKER_MIN", 100), \
+                patch("pdf_extraction.multiprocessing.get_context") as get_context:
+            self.assertEqual(len(extract_page_texts(b"150", backend='numbered', workers=4)), 150)
+        get_context.assert_not_called()
+
+    def test_worker_failure_fails_the_extraction(self):
+        """
+        Test a page range failing in a worker fails the whole extraction with the worker's error
+        """
+        with patch.dict(pdf_extraction.PDF_EXTRACTION_BACKENDS, TEST_BACKENDS), \
+                patch("pdf_extraction.PDF_PAGES_PER_WORKER_MIN", 2):
+            with self.assertRaisesRegex(RuntimeError, "broken page"):
+                extract_page_texts(b"12", backend='failing', workers=3)
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streaming import iter_batches, bounded_prefetch, split_sections
+
+
+def fixed_size_split(size: int, overlap: int):
+    """A stand-in for the text splitter, fixed size chunks with overlap"""
+    def split(text: str) -> list[tuple[str, int]]:
+        chunks = []
+        start = 0
+        while start < len(text):
+            chunks.append((text[start:start + size], start))
+            if start + size >= len(text):
+                break
+            start += size - overlap
+        return chunks
+    return split
+
+
+class TestStreamingPipeline(unittest.TestCase):
+    """
+    Tests for the batching, backpressure and incremental splitting of the document pipeline
+    """
+
+    def test_iter_batches(self):
+        """
+        Test items are grouped in order into full batches and a shorter last one
+        """
+        self.assertEqual(list(iter_batches(range(7), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(iter_batches([], 3)), [])
+
+    def test_prefetch_is_bounded(self):
+        """
+        Test the producer never gets more than max_buffered items ahead of a slow consumer
+        """
+        produced = []
+
+        def producer():
+            for item in range(20):
+                produced.append(item)
+                yield item
+
+        consumed = []
+        lead = []
+        for item in bounded_prefetch(producer(), max_buffered=2):
+            time.sleep(0.005)
+            lead.append(len(produced) - len(consumed))
+            consumed.append(item)
+        self.assertEqual(consumed, list(range(20)))
+        # Queued items, the one being handed over and the one being produced
+        self.assertLessEqual(max(lead), 4)
+
+    def test_prefetch_errors_and_early_stop(self):
+        """
+        Test producer errors reach the consumer and a consumer that stops early stops the producer
+        """
+        def failing():
+            yield 1
+            raise ValueError("parse failed")
+
+        with self.assertRaises(ValueError):
+            list(bounded_prefetch(failing(), max_buffered=1))
+
+        threads_before = threading.active_count()
+        items = bounded_prefetch(iter(range(1000)), max_buffered=1)
+        self.assertEqual(next(items), 0)
+        items.close()
+        self.assertEqual(threading.active_count(), threads_before)
+
+    def test_split_sections_matches_whole_text(self):
+        """
+        Test chunks of streamed sections cover the document at their start offsets, cross sections and know their pages
+        """
+        pages = [f"page {page_number} " * 30 for page_number in range(1, 8)]
+
+        def sections():
+            for page_index, page_text in enumerate(pages):
+                if page_index:
+                    yield "\n", False
+                yield page_text, True
+
+        text = "\n".join(pages)
+        page_starts = [text.index(page_text) for page_text in pages]
+        chunks = list(split_sections(sections(), fixed_size_split(100, 20), window_chars=300))
+
+        self.assertEqual(chunks[0][1], 0)
+        self.assertEqual(chunks[-1][1] + len(chunks[-1][0]), len(text))
+        for chunk_text, start_index, page, page_end in chunks:
+            self.assertEqual(text[start_index:start_index + len(chunk_text)], chunk_text)
+            self.assertEqual(page, sum(1 for page_start in page_starts if page_start <= start_index))
+            self.assertEqual(page_end, sum(1 for page_start in page_starts if page_start <= start_index + len(chunk_text) - 1))
+        # Consecutive chunks overlap or touch, no text is skipped
+        for (previous_text, previous_start, _, _), (_, start_index, _, _) in zip(chunks, chunks[1:]):
+            self.assertLessEqual(start_index, previous_start + len(previous_text))
+        self.assertTrue(any(page != page_end for _, _, page, page_end in chunks))
+
+    def test_split_sections_without_pages(self):
+        """
+        Test sections that don't start pages are split across their boundary and carry no page numbers
+        """
+        chunks = list(split_sections([("abc" * 50, False), ("def" * 50, False)], fixed_size_split(100, 0), window_chars=120))
+        self.assertEqual("".join(chunk_text for chunk_text, _, _, _ in chunks), "abc" * 50 + "def" * 50)
+        self.assertTrue(all(page is None and page_end is None for _, _, page, page_end in chunks))
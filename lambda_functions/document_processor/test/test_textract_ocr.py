@@ -0,0 +1,205 @@
+import io
+import os
+import sys
+import unittest
+import itertools
+from unittest.mock import patch
+
+# The Lambda modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textract_ocr
+from textract_ocr import (find_textless_pages, merge_ocr_pages, ocr_pages, detect_document_text,
+                          hybrid_extract_pages, call_with_retry, TextractJobError)
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+
+def blank_pdf(page_widths: list[int]) -> bytes:
+    """
+    A PDF of blank "scanned" pages, each page's width identifies it
+    """
+    pdf = pypdfium2.PdfDocument.new()
+    for width in page_widths:
+        pdf.new_page(width, 800)
+    output = io.BytesIO()
+    pdf.save(output)
+    pdf.close()
+    return output.getvalue()
+
+
+class LocalS3:
+    """
+    Stand-in for the S3 calls the OCR makes
+    """
+    def __init__(self):
+        self.objects = {}
+        self.deleted = []
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+
+    def delete_object(self, Bucket, Key):
+        self.deleted.append(Key)
+        self.objects.pop((Bucket, Key), None)
+
+
+class ThrottlingError(Exception):
+    """Shaped like botocore's ClientError"""
+    def __init__(self, code: str = 'ThrottlingException'):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class LocalTextract:
+    """
+    Stand-in for asynchronous Textract text detection. It "reads" each page of the
+    submitted PDF as "scanned page <width>", reports IN_PROGRESS for the first
+    polls and pages its results like the real API.
+    """
+    def __init__(self, s3: LocalS3, in_progress_polls: int = 2, lines_per_response: int = 2, fail_widths: tuple = (),
+                 throttled_starts: int = 0):
+        self.s3 = s3
+        self.throttled_starts = throttled_starts
+        self.in_progress_polls = in_progress_polls
+        self.lines_per_response = lines_per_response
+        self.fail_widths = fail_widths
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.started_jobs = 0
+
+    def start_document_text_detection(self, DocumentLocation):
+        if self.throttled_starts:
+            self.throttled_starts -= 1
+            raise ThrottlingError()
+        s3_object = DocumentLocation['S3Object']
+        pdf = pypdfium2.PdfDocument(self.s3.objects[(s3_object['Bucket'], s3_object['Name'])])
+        widths = [round(pdf[page_index].get_width()) for page_index in range(len(pdf))]
+        pdf.close()
+        blocks = []
+        for page_number, width in enumerate(widths, start=1):
+            blocks.append({"BlockType": "PAGE", "Page": page_number})
+            blocks.append({"BlockType": "LINE", "Page": page_number, "Text": f"scanned page {width}"})
+            blocks.append({"BlockType": "LINE", "Page": page_number, "Text": "second line"})
+        job_id = f"job-{next(self.job_ids)}"
+        failed = any(width in self.fail_widths for width in widths)
+        self.jobs[job_id] = {"blocks": blocks, "polls": 0, "failed": failed}
+        self.started_jobs += 1
+        return {"JobId": job_id}
+
+    def get_document_text_detection(self, JobId, MaxResults=1000, NextToken=None):
+        job = self.jobs[JobId]
+        job["polls"] += 1
+        if job["polls"] <= self.in_progress_polls:
+            return {"JobStatus": "IN_PROGRESS"}
+        if job["failed"]:
+            return {"JobStatus": "FAILED", "StatusMessage": "Unsupported document"}
+        start = int(NextToken or 0)
+        # Every response holds a slice of the blocks, like the real API's pagination
+        end = start + self.lines_per_response
+        response = {"JobStatus": "SUCCEEDED", "Blocks": job["blocks"][start:end]}
+        if end < len(job["blocks"]):
+            response["NextToken"] = str(end)
+        return response
+
+
+FAST_POLLING = {"poll_initial_seconds": 0, "poll_max_seconds": 0}
+
+
+@unittest.skipIf(pypdfium2 is None, "pypdfium2 is required to build test PDFs")
+class TestTextractOCR(unittest.TestCase):
+    """
+    Tests for per-page OCR of scanned pages against a local Textract stand-in
+    """
+
+    def setUp(self):
+        self.s3 = LocalS3()
+        self.textract = LocalTextract(self.s3)
+
+    def test_only_textless_pages_are_ocrd_and_merged_in_order(self):
+        """
+        Test text pages are kept and scanned pages are filled in at their own positions
+        """
+        pdf_bytes = blank_pdf([600, 601, 602, 603, 604])
+        page_texts = ["A page with a real text layer on it", "", "Another page with plenty of text", "  ", "x"]
+        self.assertEqual(find_textless_pages(page_texts), [1, 3, 4])
+
+        merged_pages = hybrid_extract_pages(pdf_bytes, page_texts, self.textract, self.s3, "bucket",
+                                            pages_per_job=2, **FAST_POLLING)
+
+        self.assertEqual(merged_pages, [
+            "A page with a real text layer on it",
+            "scanned page 601\nsecond line",
+            "Another page with plenty of text",
+            "scanned page 603\nsecond line",
+            "scanned page 604\nsecond line",
+        ])
+        # Two jobs for three pages, staging objects are cleaned up
+        self.assertEqual(self.textract.started_jobs, 2)
+        self.assertEqual(self.s3.objects, {})
+        self.assertEqual(len(self.s3.deleted), 2)
+
+    def test_unreadable_pdf_is_ocrd_whole(self):
+        """
+        Test a PDF the extractors couldn't read goes through OCR as one multi-page job
+        """
+        pdf_bytes = blank_pdf([610, 611, 612])
+        pages = hybrid_extract_pages(pdf_bytes, None, self.textract, self.s3, "bucket", pages_per_job=2, **FAST_POLLING)
+        self.assertEqual([page.splitlines()[0] for page in pages], ["scanned page 610", "scanned page 611", "scanned page 612"])
+
+    def test_failed_job_fails_the_document(self):
+        """
+        Test a failed job raises once the other jobs are done, so a partially OCR'd document is never merged
+        """
+        textract = LocalTextract(self.s3, in_progress_polls=0, fail_widths=(621,))
+        pdf_bytes = blank_pdf([620, 621, 622])
+        with self.assertRaises(TextractJobError) as context:
+            ocr_pages(pdf_bytes, [0, 1, 2], textract, self.s3, "bucket", pages_per_job=1, **FAST_POLLING)
+        self.assertIn("pages 2-2", str(context.exception))
+        self.assertEqual(textract.started_jobs, 3)
+        self.assertEqual(self.s3.objects, {})
+
+    def test_merge_keeps_longer_extracted_text(self):
+        """
+        Test OCR never replaces longer extracted text
+        """
+        self.assertEqual(merge_ocr_pages(["", "a much longer extracted text than the OCR gave"], {0: "ocr", 1: "ocr"}),
+                         ["ocr", "a much longer extracted text than the OCR gave"])
+
+    def test_throttling_is_retried(self):
+        """
+        Test throttled calls are retried with backoff and other errors are raised straight away
+        """
+        textract = LocalTextract(self.s3, in_progress_polls=0, throttled_starts=2)
+        with patch.object(textract_ocr, "OCR_RETRY_BASE_SECONDS", 0):
+            pages = hybrid_extract_pages(blank_pdf([640]), [""], textract, self.s3, "bucket", **FAST_POLLING)
+        self.assertEqual(pages, ["scanned page 640\nsecond line"])
+
+        calls = []
+
+        def invalid_request(**kwargs):
+            calls.append(kwargs)
+            raise ThrottlingError('InvalidParameterException')
+
+        with self.assertRaises(ThrottlingError):
+            call_with_retry(invalid_request, JobId="job")
+        self.assertEqual(len(calls), 1)
+
+        with patch.object(textract_ocr, "OCR_RETRY_BASE_SECONDS", 0):
+            with self.assertRaises(ThrottlingError):
+                call_with_retry(LocalTextract(self.s3, throttled_starts=10).start_document_text_detection,
+                                max_retries=3, DocumentLocation={})
+
+    def test_job_timeout(self):
+        """
+        Test polling gives up once the job runs past the timeout
+        """
+        textract = LocalTextract(self.s3, in_progress_polls=1000)
+        pdf_bytes = blank_pdf([630])
+        with self.assertRaises(TextractJobError):
+            detect_document_text(pdf_bytes, textract, self.s3, "bucket", timeout_seconds=0.05,
+                                 poll_initial_seconds=0.01, poll_max_seconds=0.01)
+        self.assertEqual(self.s3.objects, {})
@@ -0,0 +1,220 @@
+import os
+import io
+import time
+import uuid
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+# Pages with less extracted text than this are treated as scanned and sent to OCR
+OCR_MIN_PAGE_CHARS = int(os.environ.get('OCR_MIN_PAGE_CHARS', 20))
+# Scanned pages per Textract job, and how many jobs run at once
+OCR_PAGES_PER_JOB = int(os.environ.get('OCR_PAGES_PER_JOB', 50))
+OCR_JOB_CONCURRENCY = int(os.environ.get('OCR_JOB_CONCURRENCY', 4))
+OCR_POLL_INITIAL_SECONDS = float(os.environ.get('OCR_POLL_INITIAL_SECONDS', 1))
+OCR_POLL_MAX_SECONDS = float(os.environ.get('OCR_POLL_MAX_SECONDS', 5))
+# Must leave room inside the Lambda timeout for embedding
+OCR_JOB_TIMEOUT_SECONDS = float(os.environ.get('OCR_JOB_TIMEOUT_SECONDS', 600))
+# Throttled (and transient) Textract errors are retried with exponential backoff and full jitter
+OCR_MAX_RETRIES = int(os.environ.get('OCR_MAX_RETRIES', 8))
+OCR_RETRY_BASE_SECONDS = float(os.environ.get('OCR_RETRY_BASE_SECONDS', 1))
+OCR_RETRY_MAX_SECONDS = float(os.environ.get('OCR_RETRY_MAX_SECONDS', 30))
+# Asynchronous Textract reads its input from S3, page subsets are staged here and deleted afterwards
+OCR_STAGING_PREFIX = os.environ.get('OCR_STAGING_PREFIX', 'textract-staging')
+
+
+# Textract's answers when the account's request or job limits are hit, and transient server errors
+RETRYABLE_ERROR_CODES = {'ThrottlingException', 'ProvisionedThroughputExceededException',
+                          'LimitExceededException', 'InternalServerError'}
+
+
+class TextractJobError(Exception):
+    pass
+
+
+def is_retryable_textract_error(error: Exception) -> bool:
+    error_code = (getattr(error, 'response', None) or {}).get('Error', {}).get('Code')
+    return error_code in RETRYABLE_ERROR_CODES
+
+
+def call_with_retry(textract_call, max_retries: int = OCR_MAX_RETRIES, **kwargs):
+    """
+    Call a Textract API, retrying throttled and transient errors with exponential backoff and
+    full jitter. Many processor invocations share one account's Textract limits.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return textract_call(**kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable_textract_error(e):
+                raise
+            delay = random.uniform(0, min(OCR_RETRY_BASE_SECONDS * 2 ** attempt, OCR_RETRY_MAX_SECONDS))
+            print(f"Textract call throttled ({e}), retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def find_textless_pages(page_texts: list[str], min_chars: int = OCR_MIN_PAGE_CHARS) -> list[int]:
+    """
+    Indexes of the pages whose extracted text is too short to be a real text layer
+    """
+    return [page_index for page_index, page_text in enumerate(page_texts) if len(page_text.strip()) < min_chars]
+
+
+def build_page_subset_pdf(pdf_bytes: bytes, page_indexes: list[int]) -> bytes:
+    """
+    A new PDF holding only the given pages, in the given order
+    """
+    try:
+        import pypdfium2
+    except ImportError:
+        pypdfium2 = None
+
+    if pypdfium2 is not None:
+        source_pdf = pypdfium2.PdfDocument(pdf_bytes)
+        subset_pdf = pypdfium2.PdfDocument.new()
+        try:
+            subset_pdf.import_pages(source_pdf, page_indexes)
+            output = io.BytesIO()
+            subset_pdf.save(output)
+            return output.getvalue()
+        finally:
+            subset_pdf.close()
+            source_pdf.close()
+
+    import pypdf
+    pdf_reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    pdf_writer = pypdf.PdfWriter()
+    for page_index in page_indexes:
+        pdf_writer.add_page(pdf_reader.pages[page_index])
+    output = io.BytesIO()
+    pdf_writer.write(output)
+    return output.getvalue()
+
+
+def wait_for_text_detection(textract_client, job_id: str, timeout_seconds: float = OCR_JOB_TIMEOUT_SECONDS,
+                            poll_initial_seconds: float = OCR_POLL_INITIAL_SECONDS,
+                            poll_max_seconds: float = OCR_POLL_MAX_SECONDS) -> dict[int, list[str]]:
+    """
+    Poll a text detection job until it finishes, then read every result page.
+    Returns the LINE texts per page, keyed by Textract's 1-based page number.
+    """
+    deadline = time.monotonic() + timeout_seconds
+    poll_seconds = poll_initial_seconds
+    while True:
+        response = call_with_retry(textract_client.get_document_text_detection, JobId=job_id, MaxResults=1000)
+        job_status = response['JobStatus']
+        if job_status in ('SUCCEEDED', 'PARTIAL_SUCCESS'):
+            break
+        if job_status == 'FAILED':
+            raise TextractJobError(f"Textract job {job_id} failed: {response.get('StatusMessage', 'no status message')}")
+        if time.monotonic() + poll_seconds > deadline:
+            raise TextractJobError(f"Textract job {job_id} did not finish within {timeout_seconds:.0f}s")
+        time.sleep(poll_seconds)
+        poll_seconds = min(poll_seconds * 2, poll_max_seconds)
+
+    lines_by_page = {}
+    while True:
+        for block in response.get('Blocks', []):
+            if block['BlockType'] == 'LINE':
+                lines_by_page.setdefault(block.get('Page', 1), []).append(block['Text'])
+        next_token = response.get('NextToken')
+        if not next_token:
+            return lines_by_page
+        response = call_with_retry(textract_client.get_document_text_detection,
+                                   JobId=job_id, MaxResults=1000, NextToken=next_token)
+
+
+def detect_document_text(pdf_bytes: bytes, textract_client, s3_client, bucket: str, **wait_options) -> dict[int, str]:
+    """
+    OCR a (multi-page) PDF with an asynchronous Textract job.
+    Returns the text of each page keyed by its 1-based page number in this PDF.
+    """
+    staging_key = f"{OCR_STAGING_PREFIX}/{uuid.uuid4()}.pdf"
+    s3_client.put_object(Bucket=bucket, Key=staging_key, Body=pdf_bytes, ContentType='application/pdf')
+    try:
+        job_id = call_with_retry(
+            textract_client.start_document_text_detection,
+            DocumentLocation={'S3Object': {'Bucket': bucket, 'Name': staging_key}}
+        )['JobId']
+        lines_by_page = wait_for_text_detection(textract_client, job_id, **wait_options)
+    finally:
+        try:
+            s3_client.delete_object(Bucket=bucket, Key=staging_key)
+        except Exception as e:
+            print(f"Warning: could not delete OCR staging object {staging_key}: {e}")
+    return {page_number: "\n".join(lines) for page_number, lines in lines_by_page.items()}
+
+
+def ocr_pages(pdf_bytes: bytes, page_indexes: list[int], textract_client, s3_client, bucket: str,
+              pages_per_job: int = OCR_PAGES_PER_JOB, job_concurrency: int = OCR_JOB_CONCURRENCY,
+              **wait_options) -> dict[int, str]:
+    """
+    OCR only the given pages of a PDF. The pages are split into groups, each group
+    is copied into its own PDF and submitted as a Textract job, up to
+    job_concurrency jobs at a time. Returns the OCR text keyed by original page index.
+    Raises TextractJobError when any job fails, once every job has finished, a
+    partially OCR'd document must not replace the indexed one.
+    """
+    page_groups = [page_indexes[group_start:group_start + pages_per_job]
+                   for group_start in range(0, len(page_indexes), pages_per_job)]
+
+    def run_group(page_group: list[int]) -> dict[int, str]:
+        subset_pdf = build_page_subset_pdf(pdf_bytes, page_group)
+        texts_by_page_number = detect_document_text(subset_pdf, textract_client, s3_client, bucket, **wait_options)
+        # Page n of the subset is the n-th page of the group
+        return {page_index: texts_by_page_number.get(position + 1, "") for position, page_index in enumerate(page_group)}
+
+    ocr_texts = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, job_concurrency)) as executor:
+        futures = [(page_group, executor.submit(run_group, page_group)) for page_group in page_groups]
+        for page_group, future in futures:
+            try:
+                ocr_texts.update(future.result())
+            except Exception as e:
+                errors.append(f"pages {page_group[0] + 1}-{page_group[-1] + 1}: {e}")
+    if errors:
+        raise TextractJobError(f"OCR failed for {'; '.join(errors)}")
+    return ocr_texts
+
+
+def ocr_whole_document(pdf_bytes: bytes, textract_client, s3_client, bucket: str, **wait_options) -> list[str]:
+    """
+    OCR a PDF the text extractors couldn't open at all, one Textract job for every page
+    """
+    texts_by_page_number = detect_document_text(pdf_bytes, textract_client, s3_client, bucket, **wait_options)
+    page_count = max(texts_by_page_number, default=0)
+    return [texts_by_page_number.get(page_number, "") for page_number in range(1, page_count + 1)]
+
+
+def merge_ocr_pages(page_texts: list[str], ocr_texts: dict[int, str]) -> list[str]:
+    """
+    Page texts with OCR output put in place of the pages it was run for.
+    A page keeps its extracted text when OCR found nothing longer.
+    """
+    merged_pages = list(page_texts)
+    for page_index, ocr_text in ocr_texts.items():
+        if len(ocr_text.strip()) > len(merged_pages[page_index].strip()):
+            merged_pages[page_index] = ocr_text
+    return merged_pages
+
+
+def hybrid_extract_pages(pdf_bytes: bytes, page_texts: Optional[list[str]], textract_client, s3_client, bucket: str,
+                         page_offset: int = 0, **ocr_options) -> list[str]:
+    """
+    Fill in the scanned pages of a PDF with OCR. page_texts is None when the
+    extractors couldn't read the PDF, then every page goes through OCR.
+    page_texts may be a window of the document starting at page index page_offset.
+    """
+    if page_texts is None:
+        wait_options = {name: value for name, value in ocr_options.items()
+                        if name not in ('pages_per_job', 'job_concurrency')}
+        return ocr_whole_document(pdf_bytes, textract_client, s3_client, bucket, **wait_options)
+    textless_pages = find_textless_pages(page_texts)
+    if not textless_pages:
+        return page_texts
+    print(f"Running OCR for {len(textless_pages)} of {len(page_texts)} pages without a text layer.")
+    ocr_texts = ocr_pages(pdf_bytes, [page_offset + page_index for page_index in textless_pages],
+                          textract_client, s3_client, bucket, **ocr_options)
+    return merge_ocr_pages(page_texts, {page_index - page_offset: ocr_text for page_index, ocr_text in ocr_texts.items()})
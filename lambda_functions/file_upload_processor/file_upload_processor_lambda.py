@@ -127,6 +127,7 @@ def lambda_handler(event, context):
         callback_payload['status'] = 'COMPLETED'
         callback_payload['final_file_url'] = file_url
         callback_payload['final_unique_filename'] = unique_pdf_filename
+        callback_payload['converted_bytes'] = len(pdf_content_bytes)
 
     except Exception as e:
         # If anything goes wrong during download or conversion, prepare the FAILED payload
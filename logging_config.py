@@ -0,0 +1,126 @@
+import os
+import json
+import queue
+import random
+import atexit
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Environment driven settings
+# LOG_LEVEL=INFO
+# LOG_LEVELS=query_data=DEBUG,sqlalchemy.engine=WARNING
+# LOG_SAMPLE_RATES=query_data.query_source_data=0.05,chat_messages=0.1
+# LOG_FORMAT=json | text
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+# Attributes every LogRecord has, anything else was passed through `extra=`
+_RESERVED_RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+_queue_listener = None
+
+
+def parse_key_value_setting(setting: str) -> dict[str, str]:
+    """
+    Parses "a=1,b=2" style environment settings into a dict
+    """
+    parsed = {}
+    for item in setting.split(','):
+        if '=' not in item:
+            continue
+        key, value = item.split('=', 1)
+        if key.strip():
+            parsed[key.strip()] = value.strip()
+    return parsed
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats log records as single line JSON objects, including any `extra` fields
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        log_record = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS and not key.startswith('_'):
+                log_record[key] = value
+        if record.exc_info:
+            log_record["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(log_record, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of DEBUG records for the configured loggers.
+    The most specific logger name prefix wins, INFO and above are never sampled.
+    """
+    def __init__(self, sample_rates: dict[str, float]):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def get_sample_rate(self, logger_name: str) -> float:
+        best_match = None
+        for prefix in self.sample_rates:
+            if logger_name == prefix or logger_name.startswith(f"{prefix}."):
+                if best_match is None or len(prefix) > len(best_match):
+                    best_match = prefix
+        return self.sample_rates[best_match] if best_match else 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        sample_rate = self.get_sample_rate(record.name)
+        return sample_rate >= 1.0 or random.random() < sample_rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking the request when the queue is full
+    """
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def configure_logging():
+    """
+    Configure the root logger to write through a background queue listener.
+    Safe to call more than once, only the first call installs the handlers.
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if LOG_FORMAT == 'json':
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    sample_rates = {name: float(rate) for name, rate in parse_key_value_setting(LOG_SAMPLE_RATES).items()}
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root_logger = logging.getLogger()
+    root_logger.handlers = [queue_handler]
+    root_logger.setLevel(LOG_LEVEL)
+
+    for logger_name, level in parse_key_value_setting(LOG_LEVELS).items():
+        logging.getLogger(logger_name).setLevel(level.upper())
+
+    _queue_listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _queue_listener.start()
+    atexit.register(_queue_listener.stop)
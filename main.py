@@ -1,5 +1,7 @@
 import os
 import json
+import asyncio
+import logging
 import tempfile
 import stripe
 import secrets
@@ -8,25 +10,37 @@ from bs4 import BeautifulSoup
 from typing import Any, Union, Annotated, List, Optional
 from datetime import datetime, timezone
 from secrets import token_hex
+from urllib.parse import urlparse
 import shutil
 import boto3
-import convert_to_pdf
-import io
 from mailerlite_services import sync_to_mailerlite, delete_subscriber_from_mailerlite, update_active_customer_groups, update_cancelled_customer_groups
 from aws_ses_service import EmailService, get_email_service
 from datetime import timedelta
-from fastapi import FastAPI, UploadFile, Depends, File, Body, HTTPException, status, Request, Security, responses
+from fastapi import FastAPI, UploadFile, Depends, File, Body, HTTPException, status, Request, Security, responses, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import select, Session, Field
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 from pydantic import BaseModel, EmailStr, Field
-from file_management.models import SourceFile, Folder
+from file_management.models import SourceFile, Folder, IngestionJob, IngestionEvent
 from file_management.utils import save_file_to_db, update_file_in_db, delete_file_from_db, \
     fetch_html_content, extract_text_from_html, prepare_for_s3_upload, create_new_folder_in_db, \
     update_folder_in_db, delete_folder_from_db, delete_file_from_s3, get_docs_count_for_user_account, load_documents_from_s3, \
-    create_pending_file_in_db, get_processed_docs_count_for_user_account
+    create_pending_file_in_db, get_processed_docs_count_for_user_account, stream_upload_to_s3, copy_s3_object, \
+    generate_staging_s3_key, is_staging_s3_key_for_account, generate_presigned_upload, complete_presigned_upload, \
+    create_pending_files_in_db, update_files_processing_status, apply_content_hash_deduplication, delete_s3_objects, \
+    parse_range_header, build_s3_object_headers, iter_s3_body, build_not_modified_headers, etag_matches, \
+    is_not_modified_error, resolve_byte_range, cached_file_to_s3_metadata, iter_file_range, \
+    generate_presigned_source_urls, PRESIGN_QUERY_SOURCES, crawl_and_ingest_site, render_text_source_pdf, \
+    get_or_create_ingestion_job, update_ingestion_job, record_ingestion_batch, is_s3_object_shared, \
+    chunk_sources_for_file, delete_source_files, find_orphaned_chunk_sources, record_ingestion_stages, \
+    get_ingestion_job_progress, get_time_to_searchable_metrics, INGESTION_STAGES, update_files_processed_flag
+from file_management.crawler import close_http_client, CRAWL_MAX_PAGES
+from pdf_conversion_service import get_pdf_conversion_service
+from chroma_db_api import delete_chunks_for_sources, list_chunk_sources
+from file_management.file_cache import file_view_cache
 from accounts.models import Account, User, WidgetAPIKey, StripeSubscription
 from accounts.utils import create_new_account_in_db, update_account_in_db, delete_account_from_db, \
     create_new_user_in_db, update_user_in_db, delete_user_from_db, get_notification_users, get_user_by_email, \
@@ -39,8 +53,8 @@ from authentication import oauth2_scheme, Token, authenticate_user, get_password
     get_current_active_user, ACCESS_TOKEN_EXPIRE_MINUTES, get_widget_api_key_user, get_api_key_hash, get_api_key, get_internal_api_key
 from dependencies import get_session
 from chat_messages.models import ChatSession, ChatMessage
-from chat_messages.utils import create_or_identify_chat_session, create_chat_message, get_session_id_by_visitor_uuid, \
-    get_chat_messages_by_session_id, get_chat_session_count, get_questions_answered_count, create_email_message, \
+from chat_messages.utils import create_or_identify_chat_session, create_chat_message, \
+    get_or_create_chat_session_id, create_chat_turn_messages, get_chat_messages_by_session_id, get_chat_session_count, get_questions_answered_count, create_email_message, \
     get_email_message_count
 from stripe_service import process_stripe_product_created_event, process_stripe_product_updated_event, get_stripe_price_object_from_price_id, \
     process_stripe_subscription_checkout_session_completed_event, get_stripe_subscription_from_subscription_id, \
@@ -49,10 +63,16 @@ from stripe_service import process_stripe_product_created_event, process_stripe_
     get_stripe_customer_from_customer_id
 from core.models import Product, PasswordResetToken, ContactPayload
 from core.utils import create_stripe_subscription_in_db, get_db_subscription_by_subscription_id, update_stripe_subscription_in_db
-from chroma_db_api import clear_chroma_db_datastore_for_replace
 from webhook_utils import send_chat_messages_webhook_notification
+from logging_config import configure_logging
 
 
+configure_logging()
+logger = logging.getLogger(__name__)
+# Logged here rather than when db and query_source_data are imported, before logging is configured
+logger.info("Starting API", extra={"database": engine.dialect.name, "sql_echo": engine.echo,
+                                   "chat_model": query_source_data.CHAT_MODEL_NAME})
+
 # Initialize the S3 client
 s3 = boto3.client('s3')
 
@@ -63,6 +83,13 @@ stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
 lambda_client = boto3.client("lambda", region_name="us-east-1")
 
+# Maximum number of S3 writes / Lambda invocations in flight per upload request
+FILE_UPLOAD_CONCURRENCY = int(os.environ.get('FILE_UPLOAD_CONCURRENCY', 8))
+
+# Document processor invocations in flight per ingestion job, and files per batched status UPDATE
+INDEXING_DISPATCH_CONCURRENCY = int(os.environ.get('INDEXING_DISPATCH_CONCURRENCY', 16))
+INDEXING_DISPATCH_BATCH_SIZE = int(os.environ.get('INDEXING_DISPATCH_BATCH_SIZE', 100))
+
 # Front-end Env Settings
 FE_BASE_URL = os.getenv('FE_BASE_URL', 'http://localhost:3000')  # Default to localhost if not set
 
@@ -72,6 +99,16 @@ CHROMA_ENDPOINT = os.environ['CHROMA_ENDPOINT']
 
 app = FastAPI()
 
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await close_http_client()
+
+
+@app.on_event("shutdown")
+def shutdown_pdf_conversion_service():
+    get_pdf_conversion_service().shutdown()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -318,8 +355,33 @@ async def update_api_key(account_unique_id: str,
 ############################################
 
 
+def add_presigned_source_urls(response: dict[str, Any], account_unique_id: str, session: Session) -> dict[str, Any]:
+    """
+    Add short-lived presigned GET URLs for the query sources as 'source_urls',
+    so viewers can fetch the documents straight from S3.
+
+    Text-native sources are left out, their PDF may not be rendered yet so
+    viewers keep opening them through the file view endpoint.
+    """
+    query_engine_response = response.get("response")
+    if not isinstance(query_engine_response, dict) or not query_engine_response.get("sources"):
+        return response
+
+    sources = query_engine_response["sources"]
+    text_native_file_names = set(session.exec(select(SourceFile.file_name).where(
+        SourceFile.account_unique_id == account_unique_id,
+        SourceFile.text_file_name.is_not(None),
+        SourceFile.file_name.in_([source.split('/', 1)[-1] for source in sources if isinstance(source, str)])
+    )).all())
+    query_engine_response["source_urls"] = generate_presigned_source_urls(
+        [source for source in sources if isinstance(source, str) and source.split('/', 1)[-1] not in text_native_file_names],
+        account_unique_id)
+    return response
+
+
 @app.get("/api/v1/query-data/{account_unique_id}")
-async def query_data(query: str, account_unique_id: str, session: Session = Depends(get_session)) -> dict[str, Any]:
+async def query_data(query: str, account_unique_id: str, include_source_urls: Optional[bool] = None,
+                     session: Session = Depends(get_session)) -> dict[str, Any]:
     """
     Query Data
     """
@@ -327,11 +389,50 @@ async def query_data(query: str, account_unique_id: str, session: Session = Depe
         return {"error": "No query provided"}
     
     response = query_source_data.query_source_data(query, account_unique_id, session)
+    presign_sources = PRESIGN_QUERY_SOURCES if include_source_urls is None else include_source_urls
+    if presign_sources:
+        add_presigned_source_urls(response, account_unique_id, session)
     return response
 
 
 class WidgetQueryPayload(BaseModel):
     query: str
+    include_source_urls: Optional[bool] = None
+
+
+def answer_widget_query(query: str, account_unique_id: str, session: Session,
+                        include_source_urls: Optional[bool] = None) -> dict[str, Any]:
+    """
+    Answer a widget query, or notify the account users and return a fallback
+    message if the account has no active subscription.
+    """
+    active_subscription = check_active_subscription_status(account_unique_id, session)
+    if active_subscription:
+        response = query_source_data.query_source_data(query, account_unique_id, session)
+        presign_sources = PRESIGN_QUERY_SOURCES if include_source_urls is None else include_source_urls
+        if presign_sources:
+            add_presigned_source_urls(response, account_unique_id, session)
+        return response
+
+    recipients = get_notification_users(account_unique_id, session)
+    if not recipients:
+        raise HTTPException(status_code=404, detail="No notification users found for this account")
+
+    email_service = get_email_service()
+
+    try:
+        for recipient in recipients:
+            email_service.send_unsubscribed_widget_email(recipient['user_email'], 'www.yourdocsai.app/login?redirect=/accounts')
+
+    except Exception as e:
+        logger.exception(f"ERROR sending email: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+            "response": {
+                "response_text": "Unable to process your query at this time, please contact us via email."
+            }
+        }
 
 
 # Queries received from the web widget
@@ -346,101 +447,275 @@ async def process_widget_query(
 
     if not query:
         return {"error": "No query provided"}
-    active_subscription = check_active_subscription_status(account_unique_id, session)
-    if active_subscription:
-        response = query_source_data.query_source_data(query, account_unique_id, session)
+
+    response = answer_widget_query(query, account_unique_id, session, payload.include_source_urls)
+
+    return response
+
+
+class WidgetTurnPayload(BaseModel):
+    query: str
+    visitor_uuid: str
+    include_source_urls: Optional[bool] = None
+
+
+def persist_widget_turn(chat_session_id: int, query: str, response_text: str, sources: List[str]):
+    """
+    Background task writing both sides of a widget turn, using its own DB session
+    since the request session is closed once the response has been sent.
+    """
+    try:
+        with Session(engine) as background_session:
+            create_chat_turn_messages(chat_session_id, query, response_text, sources, background_session)
+    except Exception as e:
+        logger.exception(f"Error persisting widget turn for chat session {chat_session_id}: {e}")
+
+
+# Single round trip for the widget: answer the query and record the conversation
+@app.post("/api/v1/widget/turn")
+async def process_widget_turn(
+                                payload: WidgetTurnPayload,
+                                background_tasks: BackgroundTasks,
+                                auth_info: dict = Security(get_widget_api_key_user),
+                                session: Session = Depends(get_session)
+                                ):
+    """
+    Answer a widget query and persist the user and bot messages off the critical path
+    """
+    account_unique_id = auth_info["account_unique_id"]
+    query = payload.query.strip() if payload.query else None
+
+    if not query:
+        return {"error": "No query provided"}
+    if not payload.visitor_uuid:
+        raise HTTPException(status_code=400, detail="visitor_uuid is a required field")
+
+    try:
+        chat_session_id = get_or_create_chat_session_id(account_unique_id, payload.visitor_uuid, session)
+    except Exception as e:
+        logger.exception(f"Error creating or identifying chat session: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create or identify chat session")
+
+    response = answer_widget_query(query, account_unique_id, session, payload.include_source_urls)
+
+    query_engine_response = response.get("response")
+    if isinstance(query_engine_response, dict):
+        response_text = query_engine_response.get("response_text", "")
+        sources = query_engine_response.get("sources") or []
     else:
+        response_text = str(query_engine_response)
+        sources = []
 
-        recipients = get_notification_users(auth_info["account_unique_id"], session)
-        if not recipients:
-            raise HTTPException(status_code=404, detail="No notification users found for this account")
-    
-        email_service = get_email_service()
+    background_tasks.add_task(persist_widget_turn, chat_session_id, query, response_text, sources)
+
+    response["chat_session_id"] = chat_session_id
+    return response
+
+
+def build_document_processor_payload(db_file: SourceFile, account_unique_id: str) -> dict:
+    """
+    The payload the document processor lambda expects for a source file
+    """
+    # Construct S3 key (path in S3) using account_unique_id and file name
+    if db_file.text_file_name:
+        s3_key = f"{account_unique_id}/{db_file.text_file_name}"
+    elif (db_file.original_filename or '').endswith(('.xls', '.xlsx')):
+        s3_key = f"{account_unique_id}/{db_file.original_filename}"
+    else:
+        s3_key = f"{account_unique_id}/{db_file.file_name}"
+
+    lambda_payload = {
+        "s3_bucket": BUCKET_NAME,
+        "s3_key": s3_key,
+        "s3_pdf_file_key": db_file.file_name,
+        "account_unique_id": account_unique_id,
+        "db_file_id": db_file.id,
+    }
+    if db_file.text_file_name:
+        # Chunks point at the (lazily rendered) PDF so viewers open the same source
+        lambda_payload["source_key"] = f"{account_unique_id}/{db_file.file_name}"
+        lambda_payload["source_metadata"] = {"title": db_file.original_filename, "url": db_file.source_url}
+    return lambda_payload
+
+
+async def invoke_document_processor(lambda_payload: dict):
+    """
+    Invoke the document processor lambda asynchronously for one file
+    """
+    await run_in_threadpool(
+        lambda_client.invoke,
+        FunctionName="RAG-Document-Processor",
+        InvocationType="Event",
+        Payload=json.dumps(lambda_payload),
+    )
 
-        try:
-            for recipient in recipients:
-                email_service.send_unsubscribed_widget_email(recipient['user_email'], 'www.yourdocsai.app/login?redirect=/accounts')
 
+async def index_converted_file(file_id: int):
+    """
+    Background task sending one newly converted file to the document processor,
+    for accounts with auto_index_uploads. A file that fails to dispatch stays
+    unprocessed, so the next generate-chroma-db run picks it up.
+    """
+    with Session(engine) as background_session:
+        db_file = background_session.get(SourceFile, file_id)
+        if not db_file or db_file.processing_status != "COMPLETED" or db_file.already_processed_to_source_data:
+            return
+        try:
+            await invoke_document_processor(build_document_processor_payload(db_file, db_file.account_unique_id))
         except Exception as e:
-            print(f"ERROR sending email: {e}") 
-            raise HTTPException(status_code=500, detail=str(e))
+            logger.error(f"Failed to invoke document processor for file {file_id}: {e}")
+            return
+        update_files_processed_flag([file_id], background_session)
+        logger.info("Converted file sent for indexing", extra={"account_unique_id": db_file.account_unique_id, "file_id": file_id})
 
-        response = {
-                "response": {
-                    "response_text": "Unable to process your query at this time, please contact us via email."
-                }
-            }
 
-    return response
+async def run_ingestion_job(job_id: int, account_unique_id: str, replace: bool):
+    """
+    Background dispatcher for an ingestion job.
+
+    Invokes the document processor for every file still to be indexed, at most
+    INDEXING_DISPATCH_CONCURRENCY at a time, in batches of INDEXING_DISPATCH_BATCH_SIZE.
+    Each batch's processed flags and the job counters are written with batched
+    UPDATEs, so files that were not dispatched are picked up by the next run.
+    With replace every file is re-dispatched, the collection is not cleared:
+    the processor only re-embeds chunks that changed and deletes stale ones.
+    """
+    with Session(engine) as background_session:
+        try:
+            update_ingestion_job(job_id, background_session, status="RUNNING", started_at=datetime.now(timezone.utc))
+
+            documents_from_s3 = await load_documents_from_s3(account_unique_id=account_unique_id, replace=replace, session=background_session)
+            lambda_payloads = [(db_file.id, build_document_processor_payload(db_file, account_unique_id)) for db_file in documents_from_s3]
+            update_ingestion_job(job_id, background_session, total_files=len(lambda_payloads))
+
+            semaphore = asyncio.Semaphore(INDEXING_DISPATCH_CONCURRENCY)
+
+            async def dispatch(file_id: int, lambda_payload: dict) -> Optional[int]:
+                async with semaphore:
+                    try:
+                        await invoke_document_processor(lambda_payload)
+                    except Exception as e:
+                        logger.error(f"Failed to invoke document processor for {lambda_payload['s3_key']}: {e}")
+                        return None
+                return file_id
+
+            for batch_start in range(0, len(lambda_payloads), INDEXING_DISPATCH_BATCH_SIZE):
+                batch = lambda_payloads[batch_start:batch_start + INDEXING_DISPATCH_BATCH_SIZE]
+                results = await asyncio.gather(*(dispatch(file_id, lambda_payload) for file_id, lambda_payload in batch))
+                dispatched_file_ids = [file_id for file_id in results if file_id is not None]
+                record_ingestion_batch(job_id, dispatched_file_ids, len(batch) - len(dispatched_file_ids), background_session)
+
+            update_ingestion_job(job_id, background_session, status="COMPLETED", finished_at=datetime.now(timezone.utc))
+            logger.info("Ingestion job dispatched", extra={"job_id": job_id, "account_unique_id": account_unique_id,
+                                                           "total_files": len(lambda_payloads)})
+        except Exception as e:
+            logger.exception(f"Ingestion job {job_id} failed for account {account_unique_id}: {e}")
+            background_session.rollback()
+            update_ingestion_job(job_id, background_session, status="FAILED", error=str(e), finished_at=datetime.now(timezone.utc))
 
 
 @app.get("/api/v1/generate-chroma-db/{account_unique_id}")
 async def generate_chroma_db_datastore(account_unique_id: str,
                                        current_user: Annotated[User, Depends(get_current_active_user)],
+                                       background_tasks: BackgroundTasks,
                                        replace: bool = False,
                                        session: Session = Depends(get_session)) -> dict[str, Any]:
     """
     Generate Chroma DB
+
+    Queues one ingestion job and returns straight away, the document processor is
+    invoked for each file in the background. While a job is queued or running for
+    the account, the same job is returned instead of starting another one, a
+    replace request while a job that doesn't replace is active gets a 409.
     """
-    print(f"Received request to generate Chroma DB for account {account_unique_id} with replace={replace}")
-    
-    try:
-        documents_from_s3 = await load_documents_from_s3(account_unique_id=account_unique_id, replace=replace, session=session)
+    ingestion_job, created = get_or_create_ingestion_job(account_unique_id, replace, session)
+    if created:
+        background_tasks.add_task(run_ingestion_job, ingestion_job.id, account_unique_id, replace)
 
-        if replace:
-            try:
-                print("Clearing ChromaDB before replacing")
-                clear_chroma_db_datastore_for_replace(account_unique_id=account_unique_id)
-            except Exception as e:
-                error_message = f"ERROR: Failed to invoke Lambda: {e}"
-                print(error_message)
-                return {"status": "error", "message": error_message}
-        
+    return {"message": "Document processing queued" if created else "Document processing already in progress",
+            "job_id": ingestion_job.id,
+            "status": ingestion_job.status}
 
-        print(f"Loaded {len(documents_from_s3)} documents from S3 based on DB query.")
-        for db_file in documents_from_s3:
-            # Construct S3 key (path in S3) using account_unique_id and file name
-            if db_file.original_filename.endswith('.xls') or db_file.original_filename.endswith('.xlsx'):
-                s3_key = f"{account_unique_id}/{db_file.original_filename}"
-            else:
-                s3_key = f"{account_unique_id}/{db_file.file_name}"
-            print(f"Attempting to trigger Lambda for file: {s3_key}")
-
-            # The payload our Lambda expects
-            lambda_payload = {
-                "s3_bucket": BUCKET_NAME,
-                "s3_key": s3_key,
-                "s3_pdf_file_key": db_file.file_name,
-                "account_unique_id": account_unique_id,
-            }
 
-            try:
-                lambda_client.invoke(
-                    # CHANGE THIS to your new function name
-                    FunctionName="RAG-Document-Processor",
-                    InvocationType="Event",
-                    Payload=json.dumps(lambda_payload),
-                )
-                message = f"Successfully invoked Lambda for: {s3_key}. Check CloudWatch Logs for details."
-                print(message)
-                 # Mark file as processed in the database
-                db_file.already_processed_to_source_data = True
-                session.commit()
+@app.get("/api/v1/ingestion-jobs/{account_unique_id}/{job_id}")
+async def get_ingestion_job(account_unique_id: str, job_id: int,
+                            current_user: Annotated[User, Depends(get_current_active_user)],
+                            session: Session = Depends(get_session)):
+    """
+    Get Ingestion Job
+    """
+    ingestion_job = session.exec(select(IngestionJob).filter(IngestionJob.account_unique_id == account_unique_id,
+                                                             IngestionJob.id == job_id)).first()
+    if not ingestion_job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return {"response": "success", "ingestion_job": ingestion_job,
+            "progress": get_ingestion_job_progress(ingestion_job.id, session)}
 
-            except Exception as e:
-                error_message = f"ERROR: Failed to invoke Lambda: {e}"
-                print(error_message)
-                return {"status": "error", "message": error_message}
-            
-        response = {"message": "Document processing passed to Lambda"}
-
-        # response = await generate_chroma_db(account_unique_id, replace)
-        # print(f"Chroma DB generation successful: {response}")
+
+@app.get("/api/v1/ingestion-events/{account_unique_id}/{file_id}")
+async def get_file_ingestion_events(account_unique_id: str, file_id: int,
+                                    current_user: Annotated[User, Depends(get_current_active_user)],
+                                    session: Session = Depends(get_session)):
+    """
+    Get File Ingestion Events, newest first
+    """
+    ingestion_events = session.exec(select(IngestionEvent).filter(IngestionEvent.account_unique_id == account_unique_id,
+                                                                  IngestionEvent.source_file_id == file_id)
+                                    .order_by(IngestionEvent.id.desc())).all()
+    return {"response": "success", "ingestion_events": ingestion_events}
+
+
+@app.get("/api/v1/ingestion-metrics/{account_unique_id}")
+async def get_ingestion_metrics(account_unique_id: str,
+                                current_user: Annotated[User, Depends(get_current_active_user)],
+                                hours: int = 24,
+                                session: Session = Depends(get_session)):
+    """
+    Get Time To Searchable Metrics
+    """
+    return {"response": "success", "metrics": get_time_to_searchable_metrics(session, account_unique_id, hours=hours)}
+
+
+async def remove_chunks_for_sources(account_unique_id: str, chunk_sources: list[str]):
+    """
+    Remove deleted files' chunks from Chroma. Failures are only logged,
+    the orphaned chunk cleanup removes anything left behind.
+    """
+    if not chunk_sources:
+        return
+    try:
+        await run_in_threadpool(delete_chunks_for_sources, account_unique_id, chunk_sources)
     except Exception as e:
-        print(f"Error generating Chroma DB: {e}")
-        return {"error": str(e)}
-    
-    return response
+        logger.error(f"Failed to delete chunks for {len(chunk_sources)} sources in account {account_unique_id}: {e}")
+
+
+async def run_orphaned_chunk_cleanup(account_unique_id: str):
+    """
+    Background job purging chunks whose source no longer exists as a SourceFile
+    """
+    try:
+        # Chunks are listed before the files are read, so a file created meanwhile is never treated as orphaned
+        indexed_sources = await run_in_threadpool(list_chunk_sources, account_unique_id)
+        with Session(engine) as background_session:
+            orphaned_sources = find_orphaned_chunk_sources(account_unique_id, indexed_sources, background_session)
+        if orphaned_sources:
+            await run_in_threadpool(delete_chunks_for_sources, account_unique_id, orphaned_sources)
+        logger.info("Orphaned chunk cleanup finished", extra={"account_unique_id": account_unique_id,
+                                                              "indexed_sources": len(indexed_sources),
+                                                              "orphaned_sources": len(orphaned_sources)})
+    except Exception as e:
+        logger.exception(f"Orphaned chunk cleanup failed for account {account_unique_id}: {e}")
+
+
+@app.post("/api/v1/cleanup-orphaned-chunks/{account_unique_id}")
+async def cleanup_orphaned_chunks(account_unique_id: str,
+                                  current_user: Annotated[User, Depends(get_current_active_user)],
+                                  background_tasks: BackgroundTasks) -> dict[str, Any]:
+    """
+    Cleanup Orphaned Chunks
+    """
+    background_tasks.add_task(run_orphaned_chunk_cleanup, account_unique_id)
+    return {"message": "Orphaned chunk cleanup queued"}
 
 
 @app.get("/api/v1/clear-chroma-db/{account_unique_id}")
@@ -490,7 +765,7 @@ async def widget_contact_us(
     """
     Contact Us
     """
-    print(f"Received email for session {payload.sessionId} from visitor {payload.visitorUuid} for account {auth_info['account_unique_id']}")
+    logger.info("Received contact us message", extra={"account_unique_id": auth_info['account_unique_id'], "visitor_uuid": payload.visitorUuid})
     if not payload.name or not payload.email or not payload.message:
         raise HTTPException(status_code=400, detail="Name, email, and message are required fields")
     
@@ -498,22 +773,13 @@ async def widget_contact_us(
     if not recipients:
         raise HTTPException(status_code=404, detail="No notification users found for this account")
     
-    chat_session_id = get_session_id_by_visitor_uuid(
+    chat_session_id = get_or_create_chat_session_id(
         account_unique_id=auth_info["account_unique_id"],
         visitor_uuid=payload.visitorUuid,
         session=session
     )
-
-    if not chat_session_id:
-        print(f"No chat session found for visitor UUID {payload.visitorUuid} in account {auth_info['account_unique_id']}.")
-        chat_session_id = create_or_identify_chat_session(
-            account_unique_id=auth_info["account_unique_id"],
-            visitor_uuid=payload.visitorUuid,
-            session=session
-        ).id
     
     webhook_url = get_account_webhook_url(account_unique_id=auth_info["account_unique_id"], session=session)
-    print("Webhook URL Found: ", webhook_url)
 
     if webhook_url:
         await send_chat_messages_webhook_notification(
@@ -525,7 +791,6 @@ async def widget_contact_us(
         )
     
     email_message = create_email_message(chat_session_id, payload.message, session)
-    print('email_message: ', email_message)
 
     chat_messages = get_chat_messages_by_session_id(
         chat_session_id=chat_session_id,
@@ -549,7 +814,6 @@ async def widget_contact_us(
     transcript_text_lines = []
 
     if chat_messages:
-        print(f"Found {len(chat_messages)} chat messages. Formatting transcript...")
         # Use a list comprehension to format each message object into a string
         for msg in chat_messages:
             # Format timestamp for readability, e.g., "2025-06-11 06:58"
@@ -574,7 +838,7 @@ async def widget_contact_us(
         text_body += "\n\n--- Chat Transcript ---\n" + "\n".join(transcript_text_lines)
 
     email_service = get_email_service()
-    print(f"Sending contact us email to {len(recipients)} recipients for account {auth_info['account_unique_id']}")
+    logger.info("Sending contact us email", extra={"account_unique_id": auth_info['account_unique_id'], "recipient_count": len(recipients)})
     try:
         for recipient in recipients:
             # 4. Call the new, cleaner email service method
@@ -586,7 +850,7 @@ async def widget_contact_us(
             )
     except Exception as e:
         # Log the actual exception for better debugging
-        print(f"ERROR sending email: {e}") 
+        logger.exception(f"ERROR sending email: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
     return {"message": "Contact Us", "account_unique_id": auth_info["account_unique_id"]}
@@ -639,6 +903,79 @@ async def send_ses_email(payload: SESEmail,
 # File Management Routes
 ############################################
 
+async def invoke_file_upload_processor(db_file_id: int, original_filename: str, staging_s3_key: str, account_unique_id: str):
+    """
+    Hands a raw upload in the staging prefix over to the file upload processor lambda
+    """
+    # If excel, save a permanent copy of the original file in s3
+    if original_filename.lower().endswith(('.xls', '.xlsx')):
+        # Server-side copy, the bytes are not uploaded a second time
+        permanent_s3_key = f"{account_unique_id}/{original_filename}"
+        await copy_s3_object(staging_s3_key, permanent_s3_key)
+
+    # Prepare the payload for the Lambda function. Pass the DB record ID.
+    lambda_payload = {
+        "db_file_id": db_file_id, # This is our job ID
+        "staging_bucket": BUCKET_NAME,
+        "staging_s3_key": staging_s3_key,
+        "original_filename": original_filename,
+        "account_unique_id": account_unique_id,
+    }
+
+    # Invoke the Lambda function asynchronously
+    await run_in_threadpool(
+        lambda_client.invoke,
+        FunctionName="Rag-File-Upload-Processor",
+        InvocationType='Event',
+        Payload=json.dumps(lambda_payload)
+    )
+
+
+async def start_file_upload_processing(staged_files: list[dict], account_unique_id: str, session: Session) -> list[dict]:
+    """
+    Marks a batch of staged uploads as PROCESSING and invokes the file upload processor
+    for each of them concurrently. Files that already failed, or fail to dispatch, are
+    marked FAILED, deduplicated files are passed through untouched.
+    Returns one job entry per file.
+    """
+    ready_files = [staged_file for staged_file in staged_files if staged_file["status"] == "STAGED"]
+    staged_at = datetime.now(timezone.utc)
+    record_ingestion_stages([ready_file["db_file_id"] for ready_file in ready_files], session, stages={"staged": staged_at},
+                            counts={ready_file["db_file_id"]: {"original_bytes": ready_file.get("size")} for ready_file in ready_files})
+    # Deduplicated files reuse the converted PDF, and are searchable straight away when the original is indexed
+    duplicate_files = [staged_file for staged_file in staged_files if staged_file["status"] == "DEDUPLICATED"]
+    record_ingestion_stages([duplicate_file["db_file_id"] for duplicate_file in duplicate_files if duplicate_file["duplicate_indexed"]],
+                            session, stages={"staged": staged_at, "converted": staged_at, "indexed": staged_at})
+    record_ingestion_stages([duplicate_file["db_file_id"] for duplicate_file in duplicate_files if not duplicate_file["duplicate_indexed"]],
+                            session, stages={"staged": staged_at, "converted": staged_at})
+
+    # Status must be PROCESSING before invoking, so a fast callback can't be overwritten
+    update_files_processing_status([ready_file["db_file_id"] for ready_file in ready_files], "PROCESSING", session)
+
+    semaphore = asyncio.Semaphore(FILE_UPLOAD_CONCURRENCY)
+
+    async def dispatch(staged_file: dict) -> dict:
+        async with semaphore:
+            try:
+                await invoke_file_upload_processor(staged_file["db_file_id"], staged_file["original_filename"],
+                                                   staged_file["staging_s3_key"], account_unique_id)
+            except Exception as e:
+                logger.exception(f"Failed to trigger processing for {staged_file['original_filename']}: {e}")
+                return {**staged_file, "status": "FAILED", "error": "Could not start file processing."}
+        return {**staged_file, "status": "PROCESSING"}
+
+    dispatched_files = {dispatched["db_file_id"]: dispatched for dispatched in await asyncio.gather(*(dispatch(ready_file) for ready_file in ready_files))}
+    processing_jobs = [dispatched_files.get(staged_file["db_file_id"], staged_file) for staged_file in staged_files]
+
+    failed_file_ids = [job["db_file_id"] for job in processing_jobs if job["status"] == "FAILED"]
+    update_files_processing_status(failed_file_ids, "FAILED", session, processing_error="Could not start file processing.")
+    record_ingestion_stages(failed_file_ids, session, error="Could not start file processing.")
+
+    for job in processing_jobs:
+        job.pop("staging_s3_key", None)
+    return processing_jobs
+
+
 @app.post("/api/v1/files/{account_unique_id}/{folder_id}", status_code=202)
 async def upload_files(
         account_unique_id: str,
@@ -648,81 +985,197 @@ async def upload_files(
         session: Session = Depends(get_session)
     ):
     """
-    Amended file upload function, passing the filetype processing to a lambda function
+    Amended file upload function, passing the filetype processing to a lambda function.
+    All files are staged in S3 concurrently, failures are reported per file.
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
-    processing_jobs = []
-    for original_file in files:
-        try:
-            # 1. Create a "pending" record in the database FIRST.
-            pending_db_file = create_pending_file_in_db(
-                original_filename=original_file.filename,
-                account_unique_id=account_unique_id,
-                folder_id=folder_id,
-                session=session
-            )
+    # 1. Create "pending" records for every file in one transaction FIRST.
+    pending_files = create_pending_files_in_db(
+        original_filenames=[original_file.filename for original_file in files],
+        account_unique_id=account_unique_id,
+        folder_id=folder_id,
+        session=session
+    )
 
-            # 2. Generate the S3 key for the *original* file in the staging bucket.
-            staging_s3_key = f"{account_unique_id}/raw/{token_hex(16)}-{original_file.filename}"
+    semaphore = asyncio.Semaphore(FILE_UPLOAD_CONCURRENCY)
 
-            # 3. Upload the raw file to the staging S3 bucket
-            file_content = await original_file.read()
-            s3.put_object(
-                Bucket=BUCKET_NAME,
-                Key=staging_s3_key,
-                Body=file_content
-            )
+    async def stage_file(original_file: UploadFile, pending_file: dict) -> dict:
+        # 2. Generate the S3 key for the *original* file in the staging bucket.
+        staging_s3_key = generate_staging_s3_key(account_unique_id, original_file.filename)
+        async with semaphore:
+            try:
+                # 3. Stream the raw file to the staging S3 bucket in fixed-size parts
+                staged_upload = await stream_upload_to_s3(original_file, staging_s3_key)
+            except Exception as e:
+                logger.exception(f"Failed to upload {original_file.filename} to S3: {e}")
+                return {**pending_file, "status": "FAILED", "error": "Could not upload file to storage."}
+        return {
+            **pending_file,
+            "status": "STAGED",
+            "staging_s3_key": staging_s3_key,
+            "size": staged_upload["size"],
+            "content_hash": staged_upload["content_hash"]
+        }
 
-            # 3.1 If excel, save a permanent copy of the original file in s3
-            if original_file.filename.lower().endswith(('.xls', '.xlsx')):
-                # Save a permanent copy of the original file in S3
-                permanent_s3_key = f"{account_unique_id}/{original_file.filename}"
-                s3.put_object(
-                    Bucket=BUCKET_NAME,
-                    Key=permanent_s3_key,
-                    Body=file_content
-                )
+    staged_files = await asyncio.gather(*(stage_file(original_file, pending_file)
+                                          for original_file, pending_file in zip(files, pending_files)))
 
-            # 4. Prepare the payload for the Lambda function. Pass the DB record ID.
-            lambda_payload = {
-                "db_file_id": pending_db_file.id, # This is our job ID
-                "staging_bucket": BUCKET_NAME,
-                "staging_s3_key": staging_s3_key,
-                "original_filename": original_file.filename,
-                "account_unique_id": account_unique_id,
-            }
-            
-            # Mark status as processing now that we are invoking lambda
-            pending_db_file.processing_status = "PROCESSING"
+    # 4. Files the account already has reuse the existing PDF and chunks instead of being converted again
+    staged_files = apply_content_hash_deduplication(staged_files, account_unique_id, session)
+    duplicate_staging_keys = [staged_file["staging_s3_key"] for staged_file in staged_files if staged_file["status"] == "DEDUPLICATED"]
+    if duplicate_staging_keys:
+        await delete_s3_objects(duplicate_staging_keys)
+
+    # 5. Mark as processing and invoke the Lambda functions
+    processing_jobs = await start_file_upload_processing(staged_files, account_unique_id, session)
+
+    new_docs_count = get_docs_count_for_user_account(account_unique_id, session)
+    accepted_count = sum(1 for job in processing_jobs if job["status"] == "PROCESSING")
+    deduplicated_count = sum(1 for job in processing_jobs if job["status"] == "DEDUPLICATED")
+    failed_count = len(processing_jobs) - accepted_count - deduplicated_count
+
+    return {
+        "response": "success" if accepted_count or deduplicated_count else "error",
+        "message": f"{accepted_count} file(s) accepted for processing, {deduplicated_count} already uploaded.",
+        "uploaded_files": processing_jobs,
+        "deduplicated_count": deduplicated_count,
+        "failed_count": failed_count,
+        "new_docs_count": new_docs_count
+    }
+
+
+class PresignedUploadFile(BaseModel):
+    filename: str
+    size: int = Field(..., ge=0)
+    content_type: Optional[str] = None
+
+
+class PresignedUploadRequest(BaseModel):
+    files: List[PresignedUploadFile]
+
+
+@app.post("/api/v1/files/uploads/presign/{account_unique_id}/{folder_id}")
+async def create_presigned_uploads(
+        account_unique_id: str,
+        folder_id: int,
+        request_data: PresignedUploadRequest,
+        current_user: Annotated[User, Depends(get_current_active_user)],
+        session: Session = Depends(get_session)
+    ):
+    """
+    Step 1 of a direct-to-S3 upload: create pending file records and return
+    presigned URLs the client uploads the raw files to.
+    """
+    if not request_data.files:
+        raise HTTPException(status_code=400, detail="No files provided")
+
+    uploads = []
+    for upload_file in request_data.files:
+        pending_db_file = create_pending_file_in_db(
+            original_filename=upload_file.filename,
+            account_unique_id=account_unique_id,
+            folder_id=folder_id,
+            session=session
+        )
+        staging_s3_key = generate_staging_s3_key(account_unique_id, upload_file.filename)
+        try:
+            presigned_upload = await run_in_threadpool(
+                generate_presigned_upload, staging_s3_key, upload_file.size, upload_file.content_type
+            )
+        except Exception as e:
+            logger.error(f"Failed to presign upload: {e}", extra={"account_unique_id": account_unique_id, "file_name": upload_file.filename})
+            pending_db_file.processing_status = "FAILED"
+            pending_db_file.processing_error = "Could not create upload URL"
             session.add(pending_db_file)
             session.commit()
+            raise HTTPException(status_code=500, detail="Could not create upload URL.")
 
-            new_docs_count = get_docs_count_for_user_account(account_unique_id, session)
+        uploads.append({
+            "db_file_id": pending_db_file.id,
+            "original_filename": upload_file.filename,
+            **presigned_upload
+        })
 
-            # 5. Invoke the Lambda function asynchronously
-            lambda_client.invoke(
-                FunctionName="Rag-File-Upload-Processor",
-                InvocationType='Event',
-                Payload=json.dumps(lambda_payload)
-            )
-            
-            processing_jobs.append({
-                "db_file_id": pending_db_file.id, 
-                "original_filename": original_file.filename, 
-                "status": "PROCESSING"
-            })
+    return {"response": "success", "uploads": uploads}
+
+
+class UploadedPart(BaseModel):
+    PartNumber: int
+    ETag: str
+
+
+class CompletedUpload(BaseModel):
+    db_file_id: int
+    staging_s3_key: str
+    upload_id: Optional[str] = None
+    parts: Optional[List[UploadedPart]] = None
+
+
+class CompleteUploadsRequest(BaseModel):
+    files: List[CompletedUpload]
+
+
+@app.post("/api/v1/files/uploads/complete/{account_unique_id}", status_code=202)
+async def complete_presigned_uploads(
+        account_unique_id: str,
+        request_data: CompleteUploadsRequest,
+        current_user: Annotated[User, Depends(get_current_active_user)],
+        session: Session = Depends(get_session)
+    ):
+    """
+    Step 2 of a direct-to-S3 upload: confirm the raw files are in the staging
+    prefix and trigger the file upload processor for each of them.
+    """
+    if not request_data.files:
+        raise HTTPException(status_code=400, detail="No files provided")
+
+    requested_file_ids = [completed_upload.db_file_id for completed_upload in request_data.files]
+    db_files = {db_file.id: db_file for db_file in session.exec(select(SourceFile).where(SourceFile.id.in_(requested_file_ids))).all()}
+
+    original_filenames = {}
+    for completed_upload in request_data.files:
+        db_file = db_files.get(completed_upload.db_file_id)
+        if not db_file or db_file.account_unique_id != account_unique_id:
+            raise HTTPException(status_code=404, detail={"error": "File not found", "file_id": completed_upload.db_file_id})
+        if db_file.processing_status != "PENDING":
+            raise HTTPException(status_code=409, detail={"error": "File upload already completed", "file_id": db_file.id})
+        if not is_staging_s3_key_for_account(completed_upload.staging_s3_key, account_unique_id, db_file.original_filename):
+            raise HTTPException(status_code=400, detail={"error": "Invalid staging key", "file_id": db_file.id})
+        original_filenames[db_file.id] = db_file.original_filename
+
+    semaphore = asyncio.Semaphore(FILE_UPLOAD_CONCURRENCY)
+
+    async def confirm_upload(completed_upload: CompletedUpload) -> dict:
+        staged_file = {
+            "db_file_id": completed_upload.db_file_id,
+            "original_filename": original_filenames[completed_upload.db_file_id],
+            "staging_s3_key": completed_upload.staging_s3_key,
+        }
+        async with semaphore:
+            try:
+                staged_object = await complete_presigned_upload(
+                    completed_upload.staging_s3_key,
+                    upload_id=completed_upload.upload_id,
+                    parts=[part.model_dump() for part in completed_upload.parts or []]
+                )
+            except Exception as e:
+                logger.exception(f"Failed to complete upload for {staged_file['original_filename']}: {e}")
+                return {**staged_file, "status": "FAILED", "error": "Uploaded file could not be found in storage."}
+        return {**staged_file, "status": "STAGED", "size": staged_object.get("ContentLength")}
+
+    staged_files = await asyncio.gather(*(confirm_upload(completed_upload) for completed_upload in request_data.files))
+    processing_jobs = await start_file_upload_processing(staged_files, account_unique_id, session)
+    accepted_count = sum(1 for job in processing_jobs if job["status"] == "PROCESSING")
+
+    new_docs_count = get_docs_count_for_user_account(account_unique_id, session)
 
-        except Exception as e:
-            # You might want to delete the pending_db_file here or mark it as failed immediately
-            print(f"Failed to trigger processing for {original_file.filename}: {e}")
-            raise HTTPException(status_code=500, detail="Could not start file processing.")
-            
     return {
-        "response": "success",
-        "message": f"{len(processing_jobs)} file(s) accepted for processing.",
+        "response": "success" if accepted_count else "error",
+        "message": f"{accepted_count} file(s) accepted for processing.",
         "uploaded_files": processing_jobs,
+        "failed_count": len(processing_jobs) - accepted_count,
         "new_docs_count": new_docs_count
     }
 
@@ -734,10 +1187,12 @@ class FileProcessingCallback(BaseModel):
     final_file_url: Optional[str] = None
     final_unique_filename: Optional[str] = None
     error_message: Optional[str] = None
+    converted_bytes: Optional[int] = None
 
 @app.post("/api/v1/internal/files/callback", status_code=200, include_in_schema=False)
 async def file_processing_callback(
         payload: FileProcessingCallback,
+        background_tasks: BackgroundTasks,
         session: Session = Depends(get_session),
         api_key: str = Depends(get_internal_api_key) # Secure the endpoint
     ):
@@ -764,9 +1219,50 @@ async def file_processing_callback(
     session.add(db_file)
     session.commit()
 
+    if payload.status == "COMPLETED":
+        record_ingestion_stages([db_file.id], session, stages={"converted": datetime.now(timezone.utc)},
+                                counts={db_file.id: {"converted_bytes": payload.converted_bytes}})
+        account = get_account_by_account_unique_id(db_file.account_unique_id, session)
+        if account and account.auto_index_uploads:
+            background_tasks.add_task(index_converted_file, db_file.id)
+    else:
+        record_ingestion_stages([db_file.id], session, error=payload.error_message or "File conversion failed.")
+
     return {"message": "callback received and processed"}
 
 
+class IngestionStageReport(BaseModel):
+    db_file_id: int
+    stages: dict[str, datetime] = {}
+    text_bytes: Optional[int] = None
+    chunk_count: Optional[int] = None
+    embedded_chunk_count: Optional[int] = None
+    chunks_per_second: Optional[float] = None
+    embedding_cache_hits: Optional[int] = None
+    error_message: Optional[str] = None
+
+@app.post("/api/v1/internal/ingestion/callback", status_code=200, include_in_schema=False)
+async def ingestion_stage_callback(
+        payload: IngestionStageReport,
+        session: Session = Depends(get_session),
+        api_key: str = Depends(get_internal_api_key)
+    ):
+    """
+    Receives the stages the document processor lambda completed for a file
+    """
+    unknown_stages = set(payload.stages) - set(INGESTION_STAGES)
+    if unknown_stages:
+        raise HTTPException(status_code=422, detail={"error": "Unknown ingestion stages", "stages": sorted(unknown_stages)})
+    if not session.get(SourceFile, payload.db_file_id):
+        raise HTTPException(status_code=404, detail="File record not found for the given ID.")
+
+    counts = payload.model_dump(include={"text_bytes", "chunk_count", "embedded_chunk_count", "chunks_per_second",
+                                          "embedding_cache_hits"})
+    record_ingestion_stages([payload.db_file_id], session, stages=payload.stages,
+                            counts={payload.db_file_id: counts}, error=payload.error_message)
+    return {"message": "ingestion stages recorded"}
+
+
 @app.get("/api/v1/files/{account_unique_id}")
 async def get_files(account_unique_id: str,
                     current_user: Annotated[User, Depends(get_current_active_user)],
@@ -863,9 +1359,12 @@ async def delete_file(account_unique_id: str, file_id: int,
         return {"error": "File not found",
                 "file_id": file_id}
     
+    # Deduplicated files share their chunks, they are only removed with the last file using them
+    chunk_sources = [] if is_s3_object_shared(file, session) else chunk_sources_for_file(file)
     s3_response = await delete_file_from_s3(account_unique_id, file, session)
     if s3_response == True:
         response = delete_file_from_db(account_unique_id, file_id, session)
+        await remove_chunks_for_sources(account_unique_id, chunk_sources)
         new_docs_count = get_docs_count_for_user_account(account_unique_id, session)
         return {'response': 'success',
                 'file_id': response['file_id'], 'new_docs_count': new_docs_count}
@@ -883,57 +1382,117 @@ async def stream_file_from_s3(request: Request, account_unique_id: str, file_ide
                    session: Session = Depends(get_session)):
     """
     Get File By S3 key identifier
+
+    Text-native sources have no PDF until they are first viewed, a missing PDF
+    for one of those is rendered and then served.
     """
+    try:
+        return await serve_file_view(request, account_unique_id, file_identifier)
+    except HTTPException as e:
+        if e.status_code != 404 or not await render_text_source_pdf(account_unique_id, file_identifier, session):
+            raise
+    return await serve_file_view(request, account_unique_id, file_identifier)
 
-        # Construct the S3 key
-    s3_key = f"{account_unique_id}/{file_identifier}"
-    print(f"Request method: {request.method} for S3 Key: {s3_key}")
 
-    print(f"Attempting to fetch S3 object: Bucket='{BUCKET_NAME}', Key='{s3_key}'")
+async def serve_file_view(request: Request, account_unique_id: str, file_identifier: str):
+    """
+    Streams the object from S3 in chunks rather than loading it into memory, and
+    honours single Range requests with 206 responses so PDF viewers can load pages
+    progressively. If-None-Match is answered with 304 Not Modified, and recently
+    viewed objects are served from the local disk cache when it is configured.
+    """
+    # Construct the S3 key
+    s3_key = f"{account_unique_id}/{file_identifier}"
+    s3_range = parse_range_header(request.headers.get("range"))
+    if_none_match = request.headers.get("if-none-match")
+    logger.debug("Fetching S3 object", extra={"method": request.method, "s3_key": s3_key, "range": s3_range})
+
+    cached_file = file_view_cache.get(s3_key) if file_view_cache else None
+    if cached_file:
+        cached_metadata = cached_file_to_s3_metadata(cached_file)
+        if etag_matches(if_none_match, cached_file.get('etag')):
+            return responses.Response(status_code=304, headers=build_not_modified_headers(
+                cached_metadata['ETag'], cached_metadata['LastModified']))
+        if request.method == "HEAD":
+            response_headers = build_s3_object_headers(cached_metadata, file_identifier, cached_file['content_type'])
+            return responses.Response(status_code=200, media_type=cached_file['content_type'], headers=response_headers)
+        try:
+            byte_range = resolve_byte_range(s3_range, cached_file['size'])
+        except ValueError:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable.",
+                                headers={"Content-Range": f"bytes */{cached_file['size']}"})
+        response_headers = build_s3_object_headers(cached_file_to_s3_metadata(cached_file, byte_range),
+                                                   file_identifier, cached_file['content_type'])
+        return StreamingResponse(
+            iter_file_range(cached_file['path'], byte_range),
+            status_code=206 if byte_range else 200,
+            media_type=cached_file['content_type'],
+            headers=response_headers
+        )
 
     try:
         if request.method == "HEAD":
-            s3_metadata = s3.head_object(Bucket=BUCKET_NAME, Key=s3_key)
+            head_object_params = {"Bucket": BUCKET_NAME, "Key": s3_key}
+            if if_none_match:
+                head_object_params["IfNoneMatch"] = if_none_match
+            s3_metadata = await run_in_threadpool(s3.head_object, **head_object_params)
             content_type = s3_metadata.get('ContentType', 'application/pdf')
-            content_length = s3_metadata.get('ContentLength', 0)
 
             if not content_type.lower().startswith('application/pdf'):
                 content_type = 'application/pdf'
 
-            response_headers = {
-                "Content-Disposition": f"inline; filename=\"{file_identifier}\"",
-                "Content-Type": content_type,
-                "Content-Length": str(content_length) # Good to include for HEAD
-            }
-            return StreamingResponse(io.BytesIO(b''), media_type=content_type, headers=response_headers)
+            response_headers = build_s3_object_headers(s3_metadata, file_identifier, content_type)
+            return responses.Response(status_code=200, media_type=content_type, headers=response_headers)
 
-        # For GET request, proceed as before
-        s3_object = s3.get_object(Bucket=BUCKET_NAME, Key=s3_key)
-        file_content_bytes = s3_object['Body'].read()
+        get_object_params = {"Bucket": BUCKET_NAME, "Key": s3_key}
+        if s3_range:
+            get_object_params["Range"] = s3_range
+        if if_none_match:
+            get_object_params["IfNoneMatch"] = if_none_match
+        s3_object = await run_in_threadpool(s3.get_object, **get_object_params)
         content_type = s3_object.get('ContentType', 'application/pdf')
         if not content_type.lower().startswith('application/pdf'):
             content_type = 'application/pdf'
 
-        response_headers = {
-            "Content-Disposition": f"inline; filename=\"{file_identifier}\"",
-            "Content-Type": content_type
-            # Content-Length will be added automatically by StreamingResponse for GET
-        }
+        # Whole-object reads are written through to the local cache while they stream
+        cache_writer = None
+        if file_view_cache and not s3_object.get('ContentRange') and file_view_cache.can_store(s3_object.get('ContentLength')):
+            cache_writer = file_view_cache.open_writer(s3_key, {
+                "etag": s3_object.get('ETag'),
+                "last_modified": s3_object['LastModified'].isoformat() if s3_object.get('LastModified') else None,
+                "content_type": content_type,
+                "size": s3_object['ContentLength'],
+            })
+
+        response_headers = build_s3_object_headers(s3_object, file_identifier, content_type)
+        status_code = 206 if s3_object.get('ContentRange') else 200
         return StreamingResponse(
-            io.BytesIO(file_content_bytes),
+            iter_s3_body(s3_object['Body'], cache_writer=cache_writer),
+            status_code=status_code,
             media_type=content_type,
             headers=response_headers
         )
 
     except s3.exceptions.NoSuchKey:
-        print(f"S3 Error: NoSuchKey for Key='{s3_key}'")
+        logger.warning(f"S3 Error: NoSuchKey for Key='{s3_key}'")
         raise HTTPException(status_code=404, detail=f"File '{file_identifier}' not found.")
     except Exception as e: # Catch other Boto3 errors that might indicate permission issues etc.
+        if is_not_modified_error(e):
+            return responses.Response(status_code=304, headers=build_not_modified_headers(
+                e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('etag')))
+        error_code = e.response.get('Error', {}).get('Code') if hasattr(e, 'response') else None
+        # head_object reports a missing key as a bare 404
+        if error_code in ('404', 'NotFound'):
+            raise HTTPException(status_code=404, detail=f"File '{file_identifier}' not found.")
+        if error_code == 'InvalidRange':
+            object_size = e.response.get('Error', {}).get('ActualObjectSize')
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable.",
+                                headers={"Content-Range": f"bytes */{object_size}"} if object_size else None)
         # Specifically for head_object, a 403 from S3 might come as ClientError
-        if hasattr(e, 'response') and 'Error' in e.response and e.response['Error']['Code'] == '403':
-            print(f"S3 Permission Error (403) for Key='{s3_key}': {e}")
+        if error_code in ('403', 'AccessDenied'):
+            logger.error(f"S3 Permission Error (403) for Key='{s3_key}': {e}")
             raise HTTPException(status_code=403, detail="Access denied to the file in storage.")
-        print(f"S3 Error processing Key='{s3_key}': {e}")
+        logger.exception(f"S3 Error processing Key='{s3_key}': {e}")
         raise HTTPException(status_code=500, detail=f"Error accessing file: {str(e)}")
 
 
@@ -967,11 +1526,57 @@ async def get_text_from_url(request: URLRequest, account_unique_id: str, folder_
         extracted_text['title'], # Pass the title for filename generation
         account_unique_id,
         folder_id,
-        session
+        session,
+        source_url=url
     )
     
     print(f"Received request to get text from URL: {request.url}, processed as PDF: {s3_upload_result.get('file_name_on_s3')}")
-    return {"response": "success", "url": request.url, "s3_details": s3_upload_result}
+    return {"response": "success", "url": request.url, "s3_details": s3_upload_result,
+            "extraction": extracted_text['stats']}
+
+
+class CrawlRequest(BaseModel):
+    """
+    Crawl Request, url is the site root or a sitemap
+    """
+    url: str
+    max_pages: Optional[int] = None
+
+
+async def run_website_crawl(root_url: str, account_unique_id: str, folder_id: int, max_pages: int):
+    """
+    Background task running a crawl with its own DB session
+    """
+    try:
+        with Session(engine) as background_session:
+            await crawl_and_ingest_site(
+                root_url, account_unique_id, folder_id, max_pages, background_session,
+                remove_chunk_sources=lambda chunk_sources: remove_chunks_for_sources(account_unique_id, chunk_sources)
+            )
+    except Exception as e:
+        logger.exception(f"Website crawl of {root_url} failed for account {account_unique_id}: {e}")
+
+
+@app.post("/api/v1/crawl-website/{account_unique_id}/{folder_id}")
+async def crawl_website(request: CrawlRequest, account_unique_id: str, folder_id: int,
+                        background_tasks: BackgroundTasks,
+                        current_user: Annotated[User, Depends(get_current_active_user)],
+                        session: Session = Depends(get_session)):
+    """
+    Crawl a website or sitemap into the folder.
+
+    Pages are fetched and ingested in the background. Re-crawling the same site
+    only converts pages whose content changed since the last crawl.
+    """
+    if urlparse(request.url).scheme not in ('http', 'https'):
+        raise HTTPException(status_code=400, detail="url must be an http or https URL")
+    folder = session.exec(select(Folder).filter(Folder.account_unique_id == account_unique_id, Folder.id == folder_id)).first()
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    max_pages = min(request.max_pages or CRAWL_MAX_PAGES, CRAWL_MAX_PAGES)
+    background_tasks.add_task(run_website_crawl, request.url, account_unique_id, folder_id, max_pages)
+    return {"response": "crawl started", "url": request.url, "max_pages": max_pages}
 
 
 @app.get("/api/v1/folders/{account_unique_id}")
@@ -1064,10 +1669,21 @@ async def edit_folder(account_unique_id: str, folder_id: int, updated_folder: Fo
 @app.delete("/api/v1/folder/{folder_id}")
 async def delete_folder(folder_id: int,
                          current_user: Annotated[User, Depends(get_current_active_user)],
+                         delete_files: bool = False,
                          session: Session = Depends(get_session)):
     """
     Delete Folder
+
+    With delete_files the folder's files are deleted too, along with their S3
+    objects and chunks. Otherwise the files are kept and just leave the folder.
     """
+    if delete_files:
+        folder = session.get(Folder, folder_id)
+        if folder:
+            folder_files = session.exec(select(SourceFile).where(SourceFile.folder_id == folder_id)).all()
+            chunk_sources = await delete_source_files(folder_files, session)
+            await remove_chunks_for_sources(folder.account_unique_id, chunk_sources)
+
     response = delete_folder_from_db(folder_id, session)
     if response.get('error'):
         return {"error": response['error'],
@@ -1307,7 +1923,6 @@ async def process_widget_message(
                                     session: Session = Depends(get_session)
                                     ):
     account_unique_id = auth_info["account_unique_id"]
-    print(f"Received chat message from widget for account {account_unique_id}: {payload.message_text}")
     # Validate the chat message here
     if not payload.message_text or not payload.chat_session_id or not payload.visitor_uuid:
         raise HTTPException(status_code=400, detail="chat_session_id, visitor_uuid, and message_text are required fields")
@@ -1318,19 +1933,18 @@ async def process_widget_message(
         raise HTTPException(status_code=400, detail="Invalid chat_session_id or visitor_uuid format")
     
     # Process the chat message
-    print(f"Processing chat message: {payload.message_text} from {payload.sender_type}")
     try:
         chat_session = create_or_identify_chat_session(account_unique_id, payload.visitor_uuid, session)
     except Exception as e:
-        print(f"Error creating or identifying chat session: {e}")
+        logger.exception(f"Error creating or identifying chat session: {e}")
         raise HTTPException(status_code=500, detail="Failed to create or identify chat session")
 
     try:
         chat_message = create_chat_message(chat_session.id, payload.message_text, payload.sender_type, payload.sources, session)
     except Exception as e:
-        print(f"Error creating chat message: {e}")
+        logger.exception(f"Error creating chat message: {e}")
         raise HTTPException(status_code=500, detail="Failed to create chat message")
-    print(f"Chat message processed successfully: {chat_message.message_text} from {chat_message.sender_type}")
+    logger.debug("Chat message processed", extra={"account_unique_id": account_unique_id, "sender_type": chat_message.sender_type})
 
 
 @app.get("/api/v1/chat-sessions/{account_unique_id}")
@@ -0,0 +1,47 @@
+"""add unique (account_unique_id, visitor_uuid) to ChatSession
+
+Revision ID: c3d8e1f4a7b2
+Revises: 9710743376dc
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8e1f4a7b2'
+down_revision: Union[str, None] = '9710743376dc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Merge any duplicate sessions created by concurrent requests before adding the constraint.
+    # Messages are re-pointed at the oldest session for the visitor, then the duplicates are removed.
+    for table_name in ('chatmessage', 'emailmessage'):
+        op.execute(f"""
+            UPDATE {table_name} SET chat_session_id = (
+                SELECT MIN(keeper.id) FROM chatsession keeper
+                JOIN chatsession dup
+                  ON dup.account_unique_id = keeper.account_unique_id
+                 AND dup.visitor_uuid = keeper.visitor_uuid
+                WHERE dup.id = {table_name}.chat_session_id
+            )
+        """)
+    op.execute("""
+        DELETE FROM chatsession WHERE id NOT IN (
+            SELECT MIN(id) FROM chatsession GROUP BY account_unique_id, visitor_uuid
+        )
+    """)
+
+    with op.batch_alter_table('chatsession', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_chatsession_account_visitor', ['account_unique_id', 'visitor_uuid'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('chatsession', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_chatsession_account_visitor', type_='unique')
@@ -0,0 +1,125 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+
+
+logger = logging.getLogger(__name__)
+
+# Rendering runs in worker processes so WeasyPrint never blocks the API event loop
+PDF_CONVERSION_WORKERS = int(os.environ.get('PDF_CONVERSION_WORKERS', os.cpu_count() or 2))
+# Conversions allowed in flight (running or waiting for a worker) before new ones wait for a slot
+PDF_CONVERSION_MAX_QUEUE = int(os.environ.get('PDF_CONVERSION_MAX_QUEUE', 32))
+PDF_CONVERSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('PDF_CONVERSION_QUEUE_TIMEOUT_SECONDS', 10))
+PDF_CONVERSION_TIMEOUT_SECONDS = float(os.environ.get('PDF_CONVERSION_TIMEOUT_SECONDS', 60))
+
+
+def render_text_to_pdf(text_content: str) -> bytes:
+    """
+    Runs in a worker process, WeasyPrint is only imported there.
+    Failures are re-raised as RuntimeError: the HTTPException convert_to_pdf raises
+    can't be unpickled in the parent, which would break the whole pool.
+    """
+    import convert_to_pdf
+    try:
+        return convert_to_pdf.convert_text_to_pdf(text_content)
+    except Exception as e:
+        raise RuntimeError(f"PDF rendering failed: {getattr(e, 'detail', e)}") from None
+
+
+# A dependency provider function
+_pdf_conversion_service_singleton = None
+
+def get_pdf_conversion_service():
+    global _pdf_conversion_service_singleton
+    if _pdf_conversion_service_singleton is None:
+        _pdf_conversion_service_singleton = PDFConversionService()
+    return _pdf_conversion_service_singleton
+
+
+class PDFConversionService:
+    """
+    Process pool backed PDF rendering for the API tier.
+
+    At most max_queue conversions are accepted at once, a caller waiting longer
+    than queue_timeout for a slot gets a 503. A conversion taking longer than
+    timeout gets a 504, its slot is only released once the worker is done with it.
+    """
+    def __init__(self, max_workers: int = PDF_CONVERSION_WORKERS, max_queue: int = PDF_CONVERSION_MAX_QUEUE,
+                 queue_timeout: float = PDF_CONVERSION_QUEUE_TIMEOUT_SECONDS,
+                 timeout: float = PDF_CONVERSION_TIMEOUT_SECONDS):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self._executor = None
+        self._slots = None
+        self._slots_loop = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn rather than fork, forking a process that already runs threads (uvicorn, boto3) can deadlock
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _discard_executor(self):
+        """Shut a (broken) pool down without waiting, the next conversion starts a fresh one"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_queue)
+            self._slots_loop = loop
+        return self._slots
+
+    async def run(self, func, *args):
+        """
+        Run a picklable function in the pool, bounded by the queue and timeouts
+        """
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("PDF conversion queue is full", extra={"max_queue": self.max_queue})
+            raise HTTPException(status_code=503, detail="PDF conversion is busy, please try again shortly.")
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool as e:
+            slots.release()
+            logger.error(f"PDF conversion worker pool broke: {e}")
+            self._discard_executor()
+            raise HTTPException(status_code=500, detail="Failed to convert text to PDF.")
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.error("PDF conversion timed out", extra={"timeout": self.timeout})
+            raise HTTPException(status_code=504, detail="PDF conversion timed out.")
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory), start a fresh pool for the next conversion
+            logger.error(f"PDF conversion worker pool broke: {e}")
+            self._discard_executor()
+            raise HTTPException(status_code=500, detail="Failed to convert text to PDF.")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error during PDF conversion: {e}")
+            raise HTTPException(status_code=500, detail="Failed to convert text to PDF.")
+
+    async def convert_text_to_pdf(self, text_content: str) -> bytes:
+        return await self.run(render_text_to_pdf, text_content)
+
+    def shutdown(self):
+        self._discard_executor()
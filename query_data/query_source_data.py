@@ -1,5 +1,6 @@
 import argparse
 import os
+import logging
 import requests
 # from dataclasses import dataclass
 from sqlmodel import select, Session
@@ -17,9 +18,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 openai.api_key = os.environ['OPENAI_API_KEY']
 CHAT_MODEL_NAME = os.environ.get('OPENAI_CHAT_MODEL', 'gpt-3.5-turbo')
-print(f"Using OpenAI chat model: {CHAT_MODEL_NAME}")
 
 CHROMA_PATH = "chroma"
 ENVIRONMENT = os.environ.get('ENVIRONMENT')
@@ -131,7 +133,7 @@ def prepare_db_and_perform_query(query, account_unique_id, session: Session):
     statement = select(Account).filter(Account.account_unique_id == account_unique_id)
     result = session.exec(statement)
     account = result.first()
-    print(f"account: {account}")
+    logger.debug("Loaded account query settings", extra={"account_unique_id": account_unique_id})
     relevance_score = account.relevance_score
     k_value = account.k_value
 
@@ -169,12 +171,13 @@ def query_source_data(query: str, account_unique_id: str, session: Session):
             # Update the 'sources' in the query_engine_response dictionary
             query_engine_response['sources'] = unique_sources
         else:
-            print("Sources list is empty, no de-duplication needed.")
+            logger.debug("Sources list is empty, no de-duplication needed.")
             
     else:
         # This handles cases where query_engine_response is not a dict, 
         # 'sources' key is missing, or 'sources' is not a list.
-        print(f"Warning: 'sources' key not found, not a list, or response is not a dict. Skipping de-duplication. query_engine_response: {query_engine_response}")
+        logger.warning("'sources' key not found, not a list, or response is not a dict. Skipping de-duplication.",
+                       extra={"account_unique_id": account_unique_id, "response_type": type(query_engine_response).__name__})
 
     # Return the final structure with the query and the (potentially modified) response
     return {
@@ -200,12 +203,9 @@ def prepare_db(account_unique_id):
             "name": (f"collection-{account_unique_id}"),
             }
         db = requests.post(f'{CHROMA_ENDPOINT}/collections/{collection_id}/get', headers=headers, json=data)
-        print(f"db: {db}")
         # Assuming 'db' is the response object
-        if db.status_code == 200:
-            print(f"Type of db_data: {type(db)}")
-        else:
-            print(f"Failed to retrieve data: {db.status_code} - {db.text}")
+        if db.status_code != 200:
+            logger.error("Failed to retrieve collection data", extra={"status_code": db.status_code, "account_unique_id": account_unique_id})
     return db
 
 
@@ -213,9 +213,7 @@ def search_db(db, query, relevance_score, k_value, account_unique_id):
     """
     Search the DB
     """
-    print(f"Relevant score: {relevance_score}")
-    print(f"k value: {k_value}")
-    print(f"Type of db: {type(db)}")
+    logger.debug("Searching DB", extra={"account_unique_id": account_unique_id, "relevance_score": relevance_score, "k_value": k_value})
     
     embedding_function = ChromaEmbeddingFunction()
     
@@ -228,7 +226,6 @@ def search_db(db, query, relevance_score, k_value, account_unique_id):
         client = chromadb.HttpClient(host='https://fastapi-rag-chroma.onrender.com', port=8000, headers=headers)
         db_data = db.json()  # Extract the JSON data from the response
         collection_name = f'collection-{account_unique_id}'
-        print(f"Collection name: {collection_name}")
         collection = client.get_collection(name=collection_name, embedding_function=embedding_function)
 
         # Use the query method to perform the search
@@ -238,8 +235,13 @@ def search_db(db, query, relevance_score, k_value, account_unique_id):
             include=["metadatas", "documents", "distances"],  # Include relevant fields
         )
 
-    # Log the results to inspect the structure
-    print(f"Query results: {results}")
+    # Only a summary of the results is logged, the full payload is far too large for the hot path
+    if logger.isEnabledFor(logging.DEBUG) and isinstance(results, dict):
+        logger.debug("Query results received", extra={
+            "account_unique_id": account_unique_id,
+            "result_count": len(results.get("documents", [[]])[0]),
+            "distances": results.get("distances", [[]])[0],
+        })
 
     # Adjust based on the actual structure of results
     if isinstance(results, dict):
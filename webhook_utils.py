@@ -1,5 +1,6 @@
 import httpx
 import json
+import logging
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
@@ -7,12 +8,13 @@ from sqlmodel import Session
 from chat_messages.utils import get_chat_messages_by_session_id
 from core.models import ContactPayload, WebhookData, WebhookChatMessage
 
+logger = logging.getLogger(__name__)
+
 
 async def send_chat_messages_webhook_notification(account_unique_id: str, chat_session_id: int, payload: ContactPayload, webhook_url: str, session: Session):
     """
     Start webhook notification process
     """
-    print('send_chat_messages_webhook_notification')
     await construct_chat_messages_webhook(account_unique_id=account_unique_id,
                                     chat_session_id=chat_session_id,
                                     payload=payload,
@@ -24,7 +26,6 @@ async def construct_chat_messages_webhook(account_unique_id: str, chat_session_i
     """
     Fetches the session messages and builds json for webhook
     """
-    print('construct_chat_messages_webhook')
     chat_messages = get_chat_messages_by_session_id(
         chat_session_id=chat_session_id,
         session=session
@@ -44,8 +45,6 @@ async def construct_chat_messages_webhook(account_unique_id: str, chat_session_i
         account_unique_id=account_unique_id
     )
 
-    print('webhook_transcript: ', webhook_transcript)
-    print('webhook_payload: ', webhook_payload)
 
     await send_webhook_notification(webhook_url, webhook_payload)
 
@@ -56,11 +55,10 @@ async def send_webhook_notification(webhook_url: str, payload: WebhookData):
     """
     Sends a structured payload to a specified webhook URL.
     """
-    print('send_webhook_notification')
     if not webhook_url:
         return
 
-    print(f"Sending webhook notification to {webhook_url}")
+    logger.info("Sending webhook notification", extra={"webhook_url": webhook_url, "account_unique_id": payload.account_unique_id})
     
     # Use httpx for async HTTP requests
     async with httpx.AsyncClient() as client:
@@ -78,11 +76,11 @@ async def send_webhook_notification(webhook_url: str, payload: WebhookData):
             
             # Raise an exception for 4xx or 5xx status codes
             response.raise_for_status() 
-            print(f"Webhook sent successfully to {webhook_url}. Status: {response.status_code}")
+            logger.info("Webhook sent successfully", extra={"webhook_url": webhook_url, "status_code": response.status_code})
 
         except httpx.RequestError as e:
             # Catches connection errors, timeouts, etc.
-            print(f"ERROR: Could not send webhook to {webhook_url}. Error: {e}")
+            logger.error(f"Could not send webhook to {webhook_url}. Error: {e}")
         except Exception as e:
             # Catch other potential errors
-            print(f"ERROR: An unexpected error occurred during webhook sending. Error: {e}")
\ No newline at end of file
+            logger.exception(f"An unexpected error occurred during webhook sending. Error: {e}")
\ No newline at end of file